@@ -0,0 +1,172 @@
+"""
+Contains the asset pipeline of Block Adventure.
+
+Images are scaled to the size they are drawn at once, and the scaled image
+is cached on disk in CACHE_DIR next to the source image. The name of a
+cached image holds the digest of the source image and the target size, so
+a cached image is never used for a source or a size it was not made from.
+
+Sprites are packed into atlases: single surfaces in the pixel format of the
+display, which hand out subsurfaces for the sprites packed into them. Blits
+from a sprite to the window therefore never need to convert pixel formats.
+The subsurfaces cannot be converted once they are handed out, so a display
+mode must be set before an atlas is made.
+Sprites with per-pixel alpha are kept in separate atlases from opaque ones,
+so that opaque sprites are blitted without blending. The atlases are shared
+by all the sprites packed as the game runs, and a new one is only made when
+the last one is full.
+"""
+
+import hashlib
+import io
+import os
+from typing import Optional
+
+import pygame
+
+# The name of the directory, next to each source image, that the scaled
+# images are cached in.
+CACHE_DIR = '.cache'
+
+# The number of hex digits of the digest of a source image that a cached
+# image is keyed by.
+_DIGEST_LENGTH = 16
+
+
+def cache_path(path: str, data: bytes, size: tuple[int, int]) -> str:
+    """
+    Return the path of the cached image of the image file at <path>, whose
+    contents are <data>, scaled to <size>.
+    """
+    directory, name = os.path.split(path)
+    digest = hashlib.sha1(data).hexdigest()[:_DIGEST_LENGTH]
+    return os.path.join(directory, CACHE_DIR,
+                        f'{os.path.splitext(name)[0]}-{digest}-'
+                        f'{size[0]}x{size[1]}.png')
+
+
+def load_scaled(path: str, size: tuple[int, int]) -> pygame.Surface:
+    """
+    Return the image in the file at <path> scaled to <size>. The scaled
+    image is loaded from the disk cache if it is there, and is added to it
+    otherwise.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    cache = cache_path(path, data, size)
+
+    try:
+        return pygame.image.load(cache)
+    except (OSError, pygame.error):
+        # The image has not been cached at this size.
+        pass
+
+    image = pygame.transform.scale(pygame.image.load(io.BytesIO(data), path),
+                                   size)
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        pygame.image.save(image, cache)
+    except (OSError, pygame.error):
+        # The cache cannot be written. The image is scaled on every start.
+        pass
+
+    return image
+
+
+class Atlas:
+    """
+    A surface that sprites are packed into as they are added, in shelves
+    from the top down. Sprites are never moved once they are packed, so the
+    subsurfaces handed out for them stay valid.
+
+    == Attributes ==
+    alpha: Whether the sprites of the atlas have per-pixel alpha.
+    surface: The surface that the sprites are packed into, in the pixel
+    format of the display.
+    """
+    # Private Attributes
+    # _x: The x-coordinate at which the next sprite on the current shelf is
+    # packed.
+    # _y: The y-coordinate of the top of the current shelf.
+    # _shelf: The height of the tallest sprite on the current shelf.
+    alpha: bool
+    surface: pygame.Surface
+    _x: int
+    _y: int
+    _shelf: int
+
+    # The size of the surface of an atlas.
+    WIDTH = 256
+    HEIGHT = 256
+
+    def __init__(self, alpha: bool) -> None:
+        """
+        Initialize an empty atlas, for sprites with per-pixel alpha if
+        <alpha> is True and for opaque sprites otherwise.
+        Raise pygame.error if no display mode has been set.
+        """
+        if pygame.display.get_surface() is None:
+            raise pygame.error('a display mode must be set before an atlas '
+                               'is made')
+
+        self.alpha = alpha
+        if alpha:
+            self.surface = pygame.Surface((Atlas.WIDTH, Atlas.HEIGHT),
+                                          pygame.SRCALPHA).convert_alpha()
+        else:
+            self.surface = pygame.Surface(
+                (Atlas.WIDTH, Atlas.HEIGHT)).convert()
+        self._x = self._y = self._shelf = 0
+
+    def add(self, sprite: pygame.Surface) -> Optional[pygame.Surface]:
+        """
+        Pack <sprite> into the atlas and return the subsurface that holds
+        it. Return None, and pack nothing, if the atlas has no room left for
+        <sprite>.
+        """
+        w, h = sprite.get_size()
+        x, y, shelf = self._x, self._y, self._shelf
+        if x + w > Atlas.WIDTH:
+            x, y, shelf = 0, y + shelf, 0
+        if x + w > Atlas.WIDTH or y + h > Atlas.HEIGHT:
+            return None
+
+        rect = pygame.Rect(x, y, w, h)
+        # Copy the pixels as they are, rather than blending them with the
+        # empty atlas.
+        self.surface.blit(sprite, rect,
+                          special_flags=pygame.BLEND_RGBA_MAX if self.alpha
+                          else 0)
+        self._x, self._y, self._shelf = x + w, y, max(shelf, h)
+
+        return self.surface.subsurface(rect)
+
+
+# The atlases that sprites are packed into, with the atlas being filled
+# last, for opaque sprites and for sprites with per-pixel alpha.
+_atlases: dict[bool: list[Atlas]] = {False: [], True: []}
+
+
+def pack_sprites(sprites: list[pygame.Surface]) -> list[pygame.Surface]:
+    """
+    Pack <sprites> into the shared atlases, the ones with per-pixel alpha
+    apart from the opaque ones, and return the subsurface of every sprite in
+    the same order. A new atlas is only made when the last one is full.
+    Raise pygame.error if no display mode has been set.
+
+    == Preconditions ==
+    Every sprite fits into an empty atlas.
+    """
+    packed = [None] * len(sprites)
+    # Packing the tallest sprites first wastes the least space on shelves.
+    for i in sorted(range(len(sprites)),
+                    key=lambda i: -sprites[i].get_height()):
+        alpha = bool(sprites[i].get_flags() & pygame.SRCALPHA)
+        atlases = _atlases[alpha]
+        if atlases:
+            packed[i] = atlases[-1].add(sprites[i])
+        if packed[i] is None:
+            atlases.append(Atlas(alpha))
+            packed[i] = atlases[-1].add(sprites[i])
+
+    return packed
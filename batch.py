@@ -0,0 +1,201 @@
+"""
+Runs batches of headless simulations of Block Adventure in parallel, for
+balancing the game and fuzzing it.
+
+Usage: python batch.py [--param NAME=V1,V2,...]... [--policy NAME]...
+                       [--level FILE]... [--seeds N] [--ticks N]
+                       [--workers N] [--output FILE]
+
+Every combination of parameter values, policy, level and seed is one job.
+The jobs are spread over a pool of processes, one per core by default, and
+their outcomes are written as a single CSV table in the order of the jobs.
+Every column but ticks/s is deterministic for a given seed. The workers
+use blank sprites, since nothing they draw is ever shown.
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pygame.locals import *
+
+from benchmark import patrol_script
+from enemy import MindlessEnemy, SupervisorEnemy
+from headless import Simulation, key_script
+from level import DEFAULT_LEVEL
+from player import Player
+import sprites
+
+# The parameters that can be varied, keyed by the name used on the command
+# line, as (class, attribute) pairs.
+PARAMETERS = {
+    'MindlessEnemy.SPEED': (MindlessEnemy, 'SPEED'),
+    'SupervisorEnemy.STANDARD_SPEED': (SupervisorEnemy, 'STANDARD_SPEED'),
+    'SupervisorEnemy.CHASE_SPEED': (SupervisorEnemy, 'CHASE_SPEED'),
+    'SupervisorEnemy.PURSUIT_RANGE': (SupervisorEnemy, 'PURSUIT_RANGE'),
+    'Player.SPEED': (Player, 'SPEED'),
+}
+
+# The value of every parameter when the game is played normally.
+DEFAULTS = {name: getattr(cls, attr) for name, (cls, attr) in
+            PARAMETERS.items()}
+
+COLUMNS = ['level', 'policy', 'seed'] + list(PARAMETERS) + \
+          ['survival_ms', 'damage_taken', 'enemies_killed', 'ticks',
+           'ticks/s', 'error']
+
+
+def random_script(ticks: int, seed: int) -> dict:
+    """
+    Return a script of <ticks> ticks in which the player walks in random
+    directions for random lengths of time and attacks at random. The same
+    script is returned for the same <seed>.
+    """
+    rng = random.Random(seed)
+    presses = []
+    keys = K_UP, K_DOWN, K_LEFT, K_RIGHT
+    start = 0
+    while start < ticks:
+        length = rng.randint(10, 60)
+        presses.append((start, start + length, rng.choice(keys)))
+        if rng.random() < 0.5:
+            attack = start + rng.randrange(length)
+            presses.append((attack, attack + 1, K_SPACE))
+        start += length + rng.randint(0, 10)
+
+    return key_script(presses)
+
+
+# The input policies, keyed by name. Each returns a script for a number of
+# ticks and a seed.
+POLICIES = {
+    'idle': lambda ticks, seed: {},
+    'patrol': lambda ticks, seed: patrol_script(ticks),
+    'random': random_script,
+}
+
+
+def _enemies_killed(sim: Simulation) -> int:
+    """
+    Return the number of enemies spawned in the rooms built in <sim> that
+    are no longer alive.
+    """
+    level = sim.game_map.level
+    return sum(len(level.spawn_states(index)) - len(states)
+               for index, states in sim.game_map.enemy_states().items())
+
+
+def run_job(job: tuple[str, str, int, dict[str: float], int]) -> dict:
+    """
+    Run the job <job> and return its row of the results table. A job is a
+    level file, a policy, a seed, the values of the parameters and a number
+    of ticks. The simulation stops early if the player runs out of hp.
+    An exception raised by the game is reported in the row instead of being
+    raised.
+    """
+    level, policy, seed, params, ticks = job
+    for name, (cls, attr) in PARAMETERS.items():
+        setattr(cls, attr, params.get(name, DEFAULTS[name]))
+
+    row = {'level': os.path.basename(level), 'policy': policy, 'seed': seed}
+    row.update({name: getattr(cls, attr) for name, (cls, attr) in
+                PARAMETERS.items()})
+    row.update({'survival_ms': '', 'damage_taken': '', 'enemies_killed': '',
+                'ticks': 0, 'ticks/s': '', 'error': ''})
+
+    sprites.set_null_mode(True)
+    random.seed(seed)
+    sim = Simulation(POLICIES[policy](ticks, seed), level)
+    start = time.perf_counter()
+    try:
+        while sim.tick < ticks and sim.player.hp > 0:
+            sim.step()
+        row['survival_ms'] = round(sim.clock.ticks, 3)
+        row['damage_taken'] = sim.player.max_hp - sim.player.hp
+        row['enemies_killed'] = _enemies_killed(sim)
+    except Exception as error:
+        row['error'] = f'tick {sim.tick}: {type(error).__name__}: {error}'
+    elapsed = time.perf_counter() - start
+    sim.close()
+
+    row['ticks'] = sim.tick
+    row['ticks/s'] = round(sim.tick / elapsed, 1) if elapsed > 0 else ''
+
+    return row
+
+
+def make_jobs(params: dict[str: list[float]], policies: list[str],
+              levels: list[str], seeds: int, ticks: int) -> list[tuple]:
+    """
+    Return a job for every combination of the values in <params>, the
+    policies <policies>, the level files <levels> and the seeds
+    0 to <seeds> - 1, each <ticks> ticks long.
+    """
+    names = list(params)
+    jobs = []
+    for level, policy, values, seed in itertools.product(
+            levels, policies, itertools.product(*params.values()),
+            range(seeds)):
+        jobs.append((level, policy, seed, dict(zip(names, values)), ticks))
+
+    return jobs
+
+
+def _parse_param(text: str) -> tuple[str, list[float]]:
+    """
+    Return the name and the values of a parameter given as NAME=V1,V2,...
+    """
+    name, _, values = text.partition('=')
+    if name not in PARAMETERS:
+        raise argparse.ArgumentTypeError(
+            f'unknown parameter {name}; choose from {", ".join(PARAMETERS)}')
+    try:
+        return name, [float(value) for value in values.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid values for {name}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Run batches of headless simulations in parallel.')
+    parser.add_argument('--param', type=_parse_param, action='append',
+                        default=[], metavar='NAME=V1,V2,...',
+                        help='values of a parameter to try; one of ' +
+                             ', '.join(PARAMETERS))
+    parser.add_argument('--policy', action='append', choices=POLICIES,
+                        help='input policy to play with (default: random)')
+    parser.add_argument('--level', action='append',
+                        help='level file to play (default: the game level)')
+    parser.add_argument('--seeds', type=int, default=4,
+                        help='number of seeds to run every combination with')
+    parser.add_argument('--ticks', type=int, default=3600,
+                        help='maximum number of ticks per simulation')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='number of worker processes')
+    parser.add_argument('--output', default=None,
+                        help='file to write the results to (default: stdout)')
+    args = parser.parse_args()
+
+    jobs = make_jobs(dict(args.param), args.policy or ['random'],
+                     args.level or [DEFAULT_LEVEL], args.seeds, args.ticks)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        rows = list(executor.map(run_job, jobs))
+
+    out = sys.stdout if args.output is None else \
+        open(args.output, 'w', newline='')
+    try:
+        writer = csv.DictWriter(out, COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
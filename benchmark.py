@@ -0,0 +1,206 @@
+"""
+Benchmarks Block Adventure in a headless simulation.
+
+Usage: python benchmark.py [--ticks N] [--tiles N] [--enemies N] [--seed N]
+                           [--store] [--no-lod] [--projectiles N]
+       python benchmark.py --obstacles N
+"""
+
+import argparse
+import math
+import random
+import time
+import tracemalloc
+
+from pygame.locals import *
+
+from enemy import MindlessEnemy, SupervisorEnemy
+from headless import Simulation, key_script
+from obstacle import Obstacle
+from room import Room
+
+# The cell that the player starts in, which is always left free.
+PLAYER_CELL = (9, 16)
+
+# The speed of the projectiles in the stress room, in units per frame.
+PROJECTILE_SPEED = 4
+
+
+def build_stress_room(tiles: int, enemies: int, seed: int) -> Room:
+    """
+    Return a closed room with <tiles> obstacles and <enemies> enemies
+    scattered over it. The same room is returned for the same <seed>.
+    Half of the enemies are Supervisors.
+    """
+    rng = random.Random(seed)
+    room = Room(north=False, south=False, east=False, west=False)
+
+    # The cells inside the walls of the room.
+    num = Room.ROOM_SIZE // Obstacle.SIZE
+    cells = [(i, j) for i in range(1, num - 1) for j in range(1, num - 1)
+             if (i, j) != PLAYER_CELL]
+    rng.shuffle(cells)
+
+    tiles = min(tiles, len(cells) - 1)
+    types = Obstacle.STONE, Obstacle.BOX, Obstacle.PUDDLE
+    for i, j in cells[:tiles]:
+        room.add_obstacles(1, 1, i * Obstacle.SIZE, j * Obstacle.SIZE,
+                           rng.choice(types))
+
+    free = cells[tiles:]
+    for k in range(enemies):
+        i, j = free[k % len(free)]
+        direction = rng.choice('udlr')
+        if k % 2 == 0:
+            room.add_enemy(MindlessEnemy(x=i * Obstacle.SIZE + 2,
+                                         y=j * Obstacle.SIZE + 2,
+                                         init_direct=direction))
+        else:
+            room.add_enemy(SupervisorEnemy(x=i * Obstacle.SIZE + 1,
+                                           y=j * Obstacle.SIZE + 1,
+                                           init_direct=direction))
+
+    return room
+
+
+def patrol_script(ticks: int) -> dict:
+    """
+    Return a script of <ticks> ticks in which the player walks around in a
+    square and attacks at the end of every side.
+    """
+    presses = []
+    keys = K_UP, K_RIGHT, K_DOWN, K_LEFT
+    for n, start in enumerate(range(0, ticks, 40)):
+        presses.append((start, start + 30, keys[n % 4]))
+        presses.append((start + 30, start + 31, K_SPACE))
+
+    return key_script(presses)
+
+
+def spawn_projectiles(room: Room, count: int, rng: random.Random) -> None:
+    """
+    Spawn projectiles at random places in <room>, flying in random
+    directions, until it has <count> projectiles.
+    """
+    pool = room.get_projectiles()
+    while pool.size < count:
+        angle = rng.uniform(0, 2 * math.pi)
+        pool.spawn(rng.uniform(0, Room.ROOM_SIZE),
+                   rng.uniform(0, Room.ROOM_SIZE),
+                   PROJECTILE_SPEED * math.cos(angle),
+                   PROJECTILE_SPEED * math.sin(angle))
+
+
+def run(ticks: int, tiles: int, enemies: int, seed: int,
+        store: bool = False, lod: bool = True,
+        projectiles: int = 0) -> Simulation:
+    """
+    Return a simulation that has been run for <ticks> ticks in a stress
+    room built from <tiles>, <enemies> and <seed>. If <store> is True,
+    the enemies of the room are kept in an entity store. If <lod> is False,
+    every enemy is updated on every tick. The room is topped up to
+    <projectiles> projectiles before every tick.
+    """
+    sim = Simulation(patrol_script(ticks))
+    sim.game_map.current_room = build_stress_room(tiles, enemies, seed)
+    if not lod:
+        sim.game_map.current_room.scheduler = None
+    if store:
+        sim.game_map.current_room.use_entity_store()
+    sim.player.set_position((PLAYER_CELL[0] * Obstacle.SIZE,
+                             PLAYER_CELL[1] * Obstacle.SIZE))
+    if projectiles:
+        rng = random.Random(seed)
+        for _ in range(ticks):
+            spawn_projectiles(sim.game_map.current_room, projectiles, rng)
+            sim.step()
+    else:
+        sim.run(ticks)
+    sim.close()
+
+    return sim
+
+
+def obstacle_report(count: int) -> None:
+    """
+    Print the time and the memory taken to construct <count> obstacles.
+    """
+    types = Obstacle.STONE, Obstacle.BOX, Obstacle.PUDDLE
+
+    start = time.perf_counter()
+    obstacles = [Obstacle(types[i % 3], i % 20, i // 20) for i in range(count)]
+    elapsed = time.perf_counter() - start
+
+    del obstacles
+    tracemalloc.start()
+    obstacles = [Obstacle(types[i % 3], i % 20, i // 20) for i in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Pixel data is allocated by SDL, so it is not traced.
+    surfaces = {id(obstacle.sprite['u']): obstacle.sprite['u']
+                for obstacle in obstacles}
+    pixels = sum(surf.get_width() * surf.get_height() * surf.get_bytesize()
+                 for surf in surfaces.values())
+
+    print(f'obstacles:      {len(obstacles)}')
+    print(f'construction:   {1000 * elapsed:.1f} ms')
+    print(f'python memory:  {size / 1024:.1f} KiB')
+    print(f'pixel memory:   {pixels / 1024:.1f} KiB')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark Block Adventure in a headless simulation.')
+    parser.add_argument('--ticks', type=int, default=600,
+                        help='number of ticks to simulate')
+    parser.add_argument('--tiles', type=int, default=300,
+                        help='number of obstacles inside the room')
+    parser.add_argument('--enemies', type=int, default=50,
+                        help='number of enemies in the room')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed used to lay out the room')
+    parser.add_argument('--store', action='store_true',
+                        help='keep the enemies in an entity store')
+    parser.add_argument('--no-lod', action='store_true',
+                        help='update every enemy on every tick')
+    parser.add_argument('--projectiles', type=int, default=0,
+                        help='number of projectiles kept flying in the room')
+    parser.add_argument('--obstacles', type=int, default=None,
+                        help='only report the time and memory taken to '
+                             'construct this many obstacles')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip measuring the peak memory')
+    args = parser.parse_args()
+
+    if args.obstacles is not None:
+        obstacle_report(args.obstacles)
+        return
+
+    start = time.perf_counter()
+    sim = run(args.ticks, args.tiles, args.enemies, args.seed, args.store,
+              not args.no_lod, args.projectiles)
+    elapsed = time.perf_counter() - start
+
+    print(f'ticks:          {args.ticks}')
+    print(f'tiles:          {args.tiles}')
+    print(f'enemies:        {args.enemies}')
+    if args.projectiles:
+        print(f'projectiles:    {args.projectiles}')
+    print(f'ticks/s:        {args.ticks / elapsed:.1f}')
+    for phase, total in sim.phase_time.items():
+        print(f'{phase + ":":<15} {1000 * total / args.ticks:.3f} ms/tick')
+
+    if not args.no_memory:
+        # Tracing slows the game down, so memory is measured in a second,
+        # identical run.
+        tracemalloc.start()
+        run(args.ticks, args.tiles, args.enemies, args.seed, args.store,
+            not args.no_lod, args.projectiles)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f'peak memory:    {peak / 1024:.1f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Compiles the obstacles of a room into collision geometry. Contiguous
+obstacles of the same type are merged into as few rectangles as possible,
+so a wall of many obstacles is checked for collisions only once.
+"""
+
+from obstacle import Obstacle
+
+
+class Collider(Obstacle):
+    """
+    A rectangle covering one or more contiguous obstacles of the same type.
+    Colliders are only used for collisions. The obstacles they cover are
+    still drawn one by one.
+    """
+    __slots__ = ()
+
+    def __init__(self, colour: tuple[int, int, int], x: float, y: float,
+                 width: float, height: float) -> None:
+        """
+        Initialize a collider of size (<width>, <height>) with its top left
+        corner at (<x>, <y>).
+
+        == Preconditions ==
+        width, height > 0
+        """
+        super().__init__(colour, x, y)
+        self.size = (width, height)
+        for box in self._boxes:
+            box.size = self.size
+
+
+def _merge_runs(rects: list[list[float]]) -> list[list[float]]:
+    """
+    Return the rectangles that result from merging every rectangle in
+    <rects> with the rectangles that continue it along the x-axis. Each
+    rectangle is a list [x, y, width, height].
+
+    == Preconditions ==
+    All the rectangles in <rects> have the same height.
+    """
+    merged = []
+    for x, y, w, h in sorted(rects, key=lambda r: (r[1], r[0])):
+        last = merged[-1] if merged else None
+        if last is not None and last[1] == y and x <= last[0] + last[2]:
+            last[2] = max(last[2], x + w - last[0])
+        else:
+            merged.append([x, y, w, h])
+
+    return merged
+
+
+def _merge_columns(rects: list[list[float]]) -> list[list[float]]:
+    """
+    Return the rectangles that result from merging every rectangle in
+    <rects> with the rectangles of the same width that continue it along the
+    y-axis. Each rectangle is a list [x, y, width, height].
+    """
+    merged = []
+    # The last rectangle merged into for every (x, width)
+    open_rects = {}
+    for x, y, w, h in sorted(rects, key=lambda r: (r[1], r[0])):
+        last = open_rects.get((x, w))
+        if last is not None and y <= last[1] + last[3]:
+            last[3] = max(last[3], y + h - last[1])
+        else:
+            last = [x, y, w, h]
+            merged.append(last)
+            open_rects[(x, w)] = last
+
+    return merged
+
+
+def merge_obstacles(obstacles: list[Obstacle]) -> list[Collider]:
+    """
+    Return the colliders covering <obstacles>. Obstacles of the same type
+    that touch along an edge are first merged into horizontal runs, and
+    then runs of the same width are merged vertically.
+    """
+    tiles = {}
+    for obstacle in obstacles:
+        tiles.setdefault(obstacle.colour, []).append(
+            [obstacle.x_pos, obstacle.y_pos, obstacle.size[0],
+             obstacle.size[1]])
+
+    colliders = []
+    for colour, rects in tiles.items():
+        for x, y, w, h in _merge_columns(_merge_runs(rects)):
+            colliders.append(Collider(colour, x, y, w, h))
+
+    return colliders
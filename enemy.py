@@ -1,10 +1,16 @@
-import math
-
 from pygame.surface import Surface
-from entity import Entity
-from obstacle import Obstacle
+from entity import Entity, TAG_ENEMY, TAG_OBSTACLE, TAG_SWORD, reacts_to
 from sword import Sword
-import pygame
+from pathfinding import FlowField
+from spatial import SpatialHash
+from typing import Optional
+import timing
+from timing import Timer
+
+
+# How far a Supervisor following a flow field may be from the middle of its
+# cell before it moves back.
+LANE_TOLERANCE = 1e-6
 
 
 class Enemy(Entity):
@@ -14,17 +20,32 @@ class Enemy(Entity):
     == Attributes ==
     hp: Health points
     strength: Damage this enemy deals
+    spawn: The index of the record of the enemy among the enemies of its
+    room in the level. -1 if the enemy was not spawned from a level.
+    obstacles: The spatial index of the colliders of the room of the enemy,
+    which the enemy stops at. None if the enemy is not in a room.
 
     == Representation Invariant ==
     hp >= 0
     Obstacle.Size < x_pos, y_pos <= Room.Size - Obstacle.Size - enemy.size
     """
     # Private Attributes
-    # _invulnerability_timer: Used to keep track of an enemies period
-    # of invulnerability after being hit.
-    _invulnerability_timer: float
+    # _invulnerability_timer: The timer that ends the period of
+    # invulnerability of the enemy after being hit. None if the enemy is
+    # not invulnerable.
+    __slots__ = ('_invulnerability_timer', 'hp', 'strength', 'spawn',
+                 'obstacles')
+
+    _invulnerability_timer: Optional[Timer]
     hp: int
     strength: int
+    spawn: int
+    obstacles: Optional[SpatialHash]
+
+    TAG = TAG_ENEMY
+    # The kind of the enemy. A key of ENEMY_KINDS.
+    KIND: str
+    INVULNERABILITY_TIME = 500  # ms
 
     def __init__(self, hp: int, x: float, y: float, sprite: dict[str: Surface],
                  direction: str, strength: int, speed: float) \
@@ -40,8 +61,32 @@ class Enemy(Entity):
         """
         self.hp = hp
         self.strength = strength
+        self.spawn = -1
+        self.obstacles = None
         super().__init__(x, y, sprite, direction, speed)
-        self._invulnerability_timer = 0.0
+        self._invulnerability_timer = None
+
+    def get_state(self) -> tuple:
+        """
+        Return the mutable state of the enemy as a tuple that starts with the
+        kind of the enemy, as in ENEMY_KINDS. The period of invulnerability
+        is given as the number of milliseconds left in it.
+        """
+        return (self.KIND, self._x_pos, self._y_pos, self._direction, self.hp,
+                timing.remaining(self._invulnerability_timer))
+
+    def set_state(self, state: tuple) -> None:
+        """
+        Restore the mutable state of the enemy from <state>, as returned by
+        get_state.
+        """
+        _, x, y, self._direction, self.hp, invulnerable = state[:6]
+        self.set_position((x, y))
+        timing.cancel(self._invulnerability_timer)
+        self._invulnerability_timer = None
+        if invulnerable > 0:
+            self._invulnerability_timer = timing.schedule(
+                invulnerable, self._end_invulnerability)
 
     def is_alive(self) -> bool:
         """
@@ -49,25 +94,39 @@ class Enemy(Entity):
         """
         return self.hp > 0
 
-    def update(self, player_coord: tuple[float, float]) -> None:
+    def update(self, player_coord: tuple[float, float],
+               scale: float = 1) -> None:
         """
         Update the state of the enemy using info from the current frame.
+        <scale> is the number of frames that the update stands for, and
+        every step the enemy takes is scaled by it.
         """
         raise NotImplementedError
 
-    def react_collision(self, ent: 'Entity') -> None:
-        if isinstance(ent, Sword) and pygame.time.get_ticks() - \
-                self._invulnerability_timer >= 500:
+    def _end_invulnerability(self) -> None:
+        """
+        Make the enemy vulnerable again.
+        """
+        self._invulnerability_timer = None
 
+    @reacts_to(TAG_SWORD)
+    def _hit_by_sword(self, sword: Sword) -> None:
+        """
+        Lose a health point to <sword>, unless the enemy is invulnerable.
+        """
+        if self._invulnerability_timer is None:
             self.hp -= 1
-            self._invulnerability_timer = pygame.time.get_ticks()
+            self._invulnerability_timer = timing.schedule(
+                Enemy.INVULNERABILITY_TIME, self._end_invulnerability)
 
 
 class MindlessEnemy(Enemy):
     """
     A mindless enemy in Block Adventure.
     """
+    __slots__ = ()
 
+    KIND = 'mindless'
     SPEED = 1.2  # units per frame
 
     def __init__(self, x: float, y: float, init_direct: str) -> None:
@@ -79,8 +138,8 @@ class MindlessEnemy(Enemy):
         """
 
         from sprites import mindless_sprite
-        copy = Surface.copy(mindless_sprite)
-        sprites = {'u': copy, 'd': copy, 'r': copy, 'l': copy}
+        sprites = {'u': mindless_sprite, 'd': mindless_sprite,
+                   'r': mindless_sprite, 'l': mindless_sprite}
 
         super().__init__(1, x, y, sprites, init_direct, 1, MindlessEnemy.SPEED)
 
@@ -97,27 +156,17 @@ class MindlessEnemy(Enemy):
         else:
             self._direction = 'l'
 
-    def update(self, player_coord: tuple[float, float]) -> None:
-        self.move()
+    def update(self, player_coord: tuple[float, float],
+               scale: float = 1) -> None:
+        self.sweep(self.obstacles, self.speed * scale)
 
-    def react_collision(self, ent: 'Entity') -> None:
+    @reacts_to(TAG_OBSTACLE)
+    def _hit_obstacle(self, obstacle: Entity) -> None:
         """
-        React to a collision with <ent>.
+        Stop at the edge of <obstacle> and turn around.
         """
-        super().react_collision(ent)
-        if isinstance(ent, Obstacle):
-            if self._direction == 'u':
-                self.move(- (ent.y_pos + ent.size[1]) + self.y_pos)
-                self._turn_around()
-            elif self._direction == 'd':
-                self.move(-(self.y_pos + self.size[1]) + ent.y_pos)
-                self._turn_around()
-            elif self._direction == 'l':
-                self.move(- (ent.x_pos + ent.size[0]) + self.x_pos)
-                self._turn_around()
-            else:  # self.direction == 'r':
-                self.move(-(self.x_pos + self.size[0]) + ent.x_pos)
-                self._turn_around()
+        self.back_off(obstacle)
+        self._turn_around()
 
 
 class SupervisorEnemy(Enemy):
@@ -128,16 +177,23 @@ class SupervisorEnemy(Enemy):
     it.
     == Attributes ==
     target: The player that the Supervisor targets
+    flow_field: The flow field towards the player in the room of the
+    Supervisor. None if the Supervisor pursues the player in a straight line.
     """
     # Private Attributes:
     # _pursuing: True iff the enemy is in pursuit.
     # _distance: The distance travelled in a particular direction when
     # the enemy is not pursuing.
+    __slots__ = ('_pursuing', '_distance', 'flow_field')
+
     _pursuing: bool
     _distance: int
+    flow_field: Optional[FlowField]
 
+    KIND = 'supervisor'
     STANDARD_SPEED = 0.5
     CHASE_SPEED = 1.8
+    PURSUIT_RANGE = 150
 
     def __init__(self, x: float, y: float, init_direct: str) \
             -> None:
@@ -149,17 +205,24 @@ class SupervisorEnemy(Enemy):
                          SupervisorEnemy.STANDARD_SPEED)
         self._pursuing = False
         self._distance = 0
+        self.flow_field = None
+
+    def get_state(self) -> tuple:
+        return super().get_state() + (self._distance, self._pursuing)
 
-    def _calc_dist_to_target(self, player_coord: tuple[float, float]) -> float:
+    def set_state(self, state: tuple) -> None:
+        super().set_state(state)
+        self._distance, self._pursuing = state[6:]
+
+    def _calc_sq_dist_to_target(self, player_coord: tuple[float, float]) \
+            -> float:
         """
-        Return the distance between the Supervisor and the target.
+        Return the squared distance between the Supervisor and the target.
         """
-        x1 = player_coord[0]
-        y1 = player_coord[1]
-        x2 = self.x_pos
-        y2 = self.y_pos
+        dx = player_coord[0] - self.x_pos
+        dy = player_coord[1] - self.y_pos
 
-        return math.dist([x1, y1], [x2, y2])
+        return dx * dx + dy * dy
 
     def _turn_right(self) -> None:
         """
@@ -174,72 +237,98 @@ class SupervisorEnemy(Enemy):
         else:
             self._direction = 'u'
 
-    def standard_movement(self) -> None:
+    def standard_movement(self, scale: float = 1) -> None:
         """
         Defines the movement of the Supervisor when the player has not been
-        detected.
+        detected. Every step is scaled by <scale>.
         """
         self.speed = SupervisorEnemy.STANDARD_SPEED
         if self._distance < 100:
-            self.move()
-            self._distance += self.speed
+            # Hitting an obstacle on the way resets the distance.
+            self._distance += self.speed * scale
+            self.sweep(self.obstacles, self.speed * scale)
         else:
             self._distance = 0
             self._turn_right()
 
-    def pursuit_movement(self, player_coord: tuple[float, float]) -> None:
+    def pursuit_movement(self, player_coord: tuple[float, float],
+                         scale: float = 1) -> None:
         """
         Defines the movement of the Supervisor when the player has been
-        detected
+        detected. The Supervisor follows its flow field, if it has one, until
+        it is in the same cell as the player, and then closes in on the
+        player directly. Every step is scaled by <scale>.
         """
         self.speed = SupervisorEnemy.CHASE_SPEED
+        step = self.speed * scale
+        if self.flow_field is not None:
+            direction = self.flow_field.direction(self)
+            if direction is not None:
+                self._follow_field(direction, step)
+                return
+
         player_x = player_coord[0]
         player_y = player_coord[1]
 
-        y_speed = min(abs(player_y - self.y_pos), self.speed)
-        x_speed = min(abs(player_x - self.x_pos), self.speed)
+        y_speed = min(abs(player_y - self.y_pos), step)
+        x_speed = min(abs(player_x - self.x_pos), step)
 
         if player_y < self.y_pos:
             self._direction = 'u'
-            self.move(y_speed)
+            self.sweep(self.obstacles, y_speed)
         elif player_y > self.y_pos:
             self._direction = 'd'
-            self.move(y_speed)
+            self.sweep(self.obstacles, y_speed)
         elif player_x < self.x_pos:
             self._direction = 'l'
-            self.move()
+            self.sweep(self.obstacles, step)
         else:
             self._direction = 'r'
-            self.move(x_speed)
+            self.sweep(self.obstacles, x_speed)
+
+    def _follow_field(self, direction: str, step: float) -> None:
+        """
+        Move <step> in <direction>, as given by the flow field. The
+        Supervisor first moves to the middle of its cell across <direction>,
+        so that it does not catch on the corners of obstacles.
+        """
+        size = self.flow_field.cell_size
+        column, row = self.flow_field.cell_of(self)
+        if direction in ('l', 'r'):
+            offset = row * size + (size - self.size[1]) / 2 - self.y_pos
+            lane_direction = 'd' if offset > 0 else 'u'
+        else:
+            offset = column * size + (size - self.size[0]) / 2 - self.x_pos
+            lane_direction = 'r' if offset > 0 else 'l'
 
-    def update(self, player_coord: tuple[float, float]) -> None:
-        if self._calc_dist_to_target(player_coord) < 150:
-            self._pursuing = True
+        if abs(offset) > LANE_TOLERANCE:
+            self._direction = lane_direction
+            self.sweep(self.obstacles, min(abs(offset), step))
         else:
-            self._pursuing = False
+            self._direction = direction
+            self.sweep(self.obstacles, step)
+
+    def update(self, player_coord: tuple[float, float],
+               scale: float = 1) -> None:
+        # Comparing squared distances avoids a square root on every frame.
+        self._pursuing = self._calc_sq_dist_to_target(player_coord) < \
+            SupervisorEnemy.PURSUIT_RANGE ** 2
 
         if not self._pursuing:
-            self.standard_movement()
+            self.standard_movement(scale)
         else:
-            self.pursuit_movement(player_coord)
-
-    def react_collision(self, ent: 'Entity') -> None:
-        super().react_collision(ent)
-        if isinstance(ent, Obstacle):
-            if self._direction == 'u':
-                self.move(- (ent.y_pos + ent.size[1]) + self.y_pos)
-                self._turn_right()
-                self._distance = 0
-            elif self._direction == 'd':
-                self.move(-(self.y_pos + self.size[1]) + ent.y_pos)
-                self._turn_right()
-                self._distance = 0
-            elif self._direction == 'l':
-                self.move(- (ent.x_pos + ent.size[0]) + self.x_pos)
-                self._turn_right()
-                self._distance = 0
-            else:  # self.direction == 'r':
-                self.move(-(self.x_pos + self.size[0]) + ent.x_pos)
-                self._turn_right()
-                self._distance = 0
+            self.pursuit_movement(player_coord, scale)
+
+    @reacts_to(TAG_OBSTACLE)
+    def _hit_obstacle(self, obstacle: Entity) -> None:
+        """
+        Stop at the edge of <obstacle> and turn right.
+        """
+        self.back_off(obstacle)
+        self._turn_right()
+        self._distance = 0
+
 
+# The class of each kind of enemy.
+ENEMY_KINDS = {MindlessEnemy.KIND: MindlessEnemy,
+               SupervisorEnemy.KIND: SupervisorEnemy}
@@ -1,4 +1,41 @@
-from pygame import Surface
+from typing import TYPE_CHECKING, Callable, Optional
+
+from pygame import Rect, Surface
+
+if TYPE_CHECKING:
+    # spatial imports this module.
+    from spatial import SpatialHash
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional. Without it, many-vs-many collision checks fall back
+    # to checking one pair at a time.
+    np = None
+
+
+# The type tag of every kind of entity. The response of an entity to a
+# collision is looked up by the tag of the entity that it collided with.
+TAG_ENTITY = 0
+TAG_OBSTACLE = 1
+TAG_PLAYER = 2
+TAG_ENEMY = 3
+TAG_SWORD = 4
+TAG_PROJECTILE = 5
+TAG_DOOR = 6
+
+
+def reacts_to(*tags: int) -> Callable:
+    """
+    Register the decorated method of an Entity subclass as the response of
+    the subclass to collisions with entities with any of the tags <tags>.
+    The method is called with the entity that was collided with.
+    """
+    def register(method: Callable) -> Callable:
+        method.reacts_to = tags
+        return method
+
+    return register
 
 
 def get_opposite(direction: str) -> str:
@@ -29,12 +66,21 @@ class Entity:
     _y_pos: The y position of the entity.
     sprite: The visual representation of the entity.
     _direction: direction that the entity is facing
-    hit_box: Hit boxes for the entity.
+    hit_box: Hit boxes for the entity. Directions without a hit box of
+    their own share a single hit box fitted to the sprite.
 
     == Representation Invariants ==
     size > 0
     -direction is 'u', 'd', 'l', or 'r'
     """
+    # Private Attributes
+    # _boxes: The distinct hit boxes in hit_box.
+    # _responses: The collision response of the class for each tag, built
+    # from the methods registered with reacts_to when the class is defined.
+    # Responses are inherited, and overriding a method overrides its
+    # response.
+    __slots__ = ('size', '_x_pos', '_y_pos', '_direction', 'speed', 'sprite',
+                 'hit_box', '_boxes')
     size: (float, float)
     _x_pos: float
     _y_pos: float
@@ -42,29 +88,45 @@ class Entity:
     speed: float
     sprite: dict[str: Surface]
 
+    TAG = TAG_ENTITY
+    _responses: dict[int: Callable[['Entity', 'Entity'], None]] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        responses = {tag: getattr(cls, response.__name__)
+                     for tag, response in cls._responses.items()}
+        for attr in cls.__dict__.values():
+            for tag in getattr(attr, 'reacts_to', ()):
+                responses[tag] = attr
+        cls._responses = responses
+
     class HitBox:
         """
         A hit box for an entity.
 
         size = (width, height)
         """
+        # Private Attributes
+        # _offset: The position of the hit box relative to the position of
+        # the entity.
+        __slots__ = ('x_pos', 'y_pos', 'size', '_offset')
+
         def __init__(self, init_point: tuple[float, float],
                      ref_point: tuple[float, float],
                      size: tuple[float, float]) \
                 -> None:
             self.x_pos = init_point[0]
             self.y_pos = init_point[1]
-            self.set_point = lambda ent_x, ent_y: (ent_x + (init_point[0] -
-                                                            ref_point[0]), ent_y
-                                                         + (init_point[1] -
-                                                            ref_point[1]))
+            self._offset = (init_point[0] - ref_point[0],
+                            init_point[1] - ref_point[1])
             self.size = size
 
         def update_pos(self, ent_pos: tuple[float, float]) -> None:
             """
             Update the position of the hit box to <ent_pos>.
             """
-            self.x_pos, self.y_pos = self.set_point(ent_pos[0], ent_pos[1])
+            self.x_pos = ent_pos[0] + self._offset[0]
+            self.y_pos = ent_pos[1] + self._offset[1]
 
     hit_box: dict[str: list[HitBox]]
 
@@ -87,45 +149,22 @@ class Entity:
         self.speed = speed
         self.hit_box = {}
 
-        if hit_box_u is None:
-            # The hit box is perfectly fitted to the sprite of the entity
-            self.hit_box['u'] = Entity.HitBox(init_point=(x, y),
-                                              size=self.size,
-                                              ref_point=(x, y))
-        else:
-            self.hit_box['u'] = Entity.HitBox(init_point=hit_box_u[0],
-                                              size=hit_box_u[1],
-                                              ref_point=(x, y))
-
-        if hit_box_d is None:
-            # The hit box is perfectly fitted to the sprite of the entity
-            self.hit_box['d'] = Entity.HitBox(init_point=(x, y),
-                                              size=self.size,
-                                              ref_point=(x, y))
-        else:
-            self.hit_box['d'] = Entity.HitBox(init_point=hit_box_d[0],
-                                              size=hit_box_d[1],
-                                              ref_point=(x, y))
-
-        if hit_box_l is None:
-            # The hit box is perfectly fitted to the sprite of the entity
-            self.hit_box['l'] = Entity.HitBox(init_point=(x, y),
-                                              size=self.size,
-                                              ref_point=(x, y))
-        else:
-            self.hit_box['l'] = Entity.HitBox(init_point=hit_box_l[0],
-                                              size=hit_box_l[1],
-                                              ref_point=(x, y))
-
-        if hit_box_r is None:
-            # The hit box is perfectly fitted to the sprite of the entity
-            self.hit_box['r'] = Entity.HitBox(init_point=(x, y),
-                                              size=self.size,
-                                              ref_point=(x, y))
-        else:
-            self.hit_box['r'] = Entity.HitBox(init_point=hit_box_r[0],
-                                              size=hit_box_r[1],
-                                              ref_point=(x, y))
+        # The hit box perfectly fitted to the sprite of the entity. It is
+        # shared by every direction that is not given a hit box.
+        fitted = None
+        for d, box in ('u', hit_box_u), ('d', hit_box_d), ('l', hit_box_l), \
+                ('r', hit_box_r):
+            if box is not None:
+                self.hit_box[d] = Entity.HitBox(init_point=box[0],
+                                                size=box[1], ref_point=(x, y))
+            else:
+                if fitted is None:
+                    fitted = Entity.HitBox(init_point=(x, y), size=self.size,
+                                           ref_point=(x, y))
+                self.hit_box[d] = fitted
+
+        self._boxes = tuple({id(box): box
+                             for box in self.hit_box.values()}.values())
 
     @property
     def x_pos(self):
@@ -164,17 +203,84 @@ class Entity:
 
             return False
 
-    def draw(self, surf: Surface) -> None:
+    @staticmethod
+    def hit_box_array(ents: list['Entity']) -> 'np.ndarray':
+        """
+        Return an array with a row (x, y, width, height) for the current hit
+        box of each entity in <ents>.
+
+        == Preconditions ==
+        NumPy is installed.
+        """
+        boxes = np.empty((len(ents), 4))
+        for i, ent in enumerate(ents):
+            box = ent.hit_box[ent._direction]
+            boxes[i] = box.x_pos, box.y_pos, box.size[0], box.size[1]
+
+        return boxes
+
+    @staticmethod
+    def overlaps(boxes_a: 'np.ndarray', boxes_b: 'np.ndarray') \
+            -> 'np.ndarray':
+        """
+        Return a boolean matrix whose entry (i, j) is whether the i-th row of
+        <boxes_a> and the j-th row of <boxes_b> are touching. Each row is a
+        box (x, y, width, height), as returned by hit_box_array.
+        """
+        ax, ay, aw, ah = (boxes_a[:, k, None] for k in range(4))
+        bx, by, bw, bh = (boxes_b[None, :, k] for k in range(4))
+
+        return (ax < bx + bw) & (bx < ax + aw) & (ay < by + bh) & \
+            (by < ay + ah)
+
+    def draw(self, surf: Surface) -> Rect:
+        """
+        Draw the sprite of this entity to the surface <surf>. Return the area
+        of <surf> that was drawn to.
         """
-        Draw the sprite of this entity to the surface <surf>.
+        return surf.blit(self.sprite[self._direction],
+                         (self._x_pos, self._y_pos))
+
+    def blit_item(self) -> tuple[Surface, tuple[float, float]]:
+        """
+        Return the sprite of this entity and the position to draw it at, as
+        an item of the sequence given to Surface.blits.
         """
-        surf.blit(self.sprite[self._direction], (self._x_pos, self._y_pos))
+        return self.sprite[self._direction], (self._x_pos, self._y_pos)
 
     def react_collision(self, ent: 'Entity') -> None:
         """
-        React to a collision with <ent>
+        React to a collision with <ent>, with the response of the class to
+        the tag of <ent>. Nothing is done if there is none.
+        """
+        response = self._responses.get(ent.TAG)
+        if response is not None:
+            response(self, ent)
+
+    @staticmethod
+    def dispatch(pairs: list[tuple['Entity', 'Entity']]) -> None:
+        """
+        Make the first entity of every pair in <pairs> react to the second,
+        in order.
         """
-        raise NotImplementedError
+        for ent, other in pairs:
+            response = ent._responses.get(other.TAG)
+            if response is not None:
+                response(ent, other)
+
+    def back_off(self, ent: 'Entity') -> None:
+        """
+        Move back against the direction of the entity until it no longer
+        overlaps <ent>.
+        """
+        if self._direction == 'u':
+            self.move(self._y_pos - (ent._y_pos + ent.size[1]))
+        elif self._direction == 'd':
+            self.move(ent._y_pos - (self._y_pos + self.size[1]))
+        elif self._direction == 'l':
+            self.move(self._x_pos - (ent._x_pos + ent.size[0]))
+        else:  # self.direction == 'r':
+            self.move(ent._x_pos - (self._x_pos + self.size[0]))
 
     def move(self, speed=None, direction=None) -> None:
         """
@@ -186,27 +292,80 @@ class Entity:
             direction = self._direction
         if direction == 'u':
             self._y_pos -= speed
-            for d in 'u', 'd', 'l', 'r':
-                self.hit_box[d].y_pos -= speed
+            for box in self._boxes:
+                box.y_pos -= speed
         elif direction == 'd':
             self._y_pos += speed
-            for d in 'u', 'd', 'l', 'r':
-                self.hit_box[d].y_pos += speed
+            for box in self._boxes:
+                box.y_pos += speed
         elif direction == 'r':
             self._x_pos += speed
-            for d in 'u', 'd', 'l', 'r':
-                self.hit_box[d].x_pos += speed
+            for box in self._boxes:
+                box.x_pos += speed
         else:  # direction == 'l'
             self._x_pos -= speed
-            for d in 'u', 'd', 'l', 'r':
-                self.hit_box[d].x_pos -= speed
+            for box in self._boxes:
+                box.x_pos -= speed
+
+    def sweep(self, obstacles: Optional['SpatialHash'], speed=None) \
+            -> Optional['Entity']:
+        """
+        Move the entity like move, but stop at the edge of the first entity
+        in <obstacles> in the way and react to it, so that the entity never
+        passes through an obstacle however fast it moves. Entities that the
+        entity already overlaps are not in the way. Return the entity that
+        was hit, or None. If <obstacles> is None, the entity just moves.
+        """
+        if speed is None:
+            speed = self.speed
+        if obstacles is None or speed <= 0:
+            self.move(speed)
+            return None
+
+        box = self.hit_box[self._direction]
+        x, y = box.x_pos, box.y_pos
+        w, h = box.size
+        # The area swept by the hit box.
+        if self._direction == 'u':
+            area = x, y - speed, w, h + speed
+        elif self._direction == 'd':
+            area = x, y, w, h + speed
+        elif self._direction == 'l':
+            area = x - speed, y, w + speed, h
+        else:  # self.direction == 'r'
+            area = x, y, w + speed, h
+
+        hit, travel = None, speed
+        vertical = self._direction in ('u', 'd')
+        for obstacle in obstacles.query(*area):
+            other = obstacle.hit_box[obstacle._direction]
+            ox, oy = other.x_pos, other.y_pos
+            ow, oh = other.size
+            if vertical:
+                if not (x < ox + ow and ox < x + w):
+                    continue
+                gap = y - (oy + oh) if self._direction == 'u' else \
+                    oy - (y + h)
+            else:
+                if not (y < oy + oh and oy < y + h):
+                    continue
+                gap = x - (ox + ow) if self._direction == 'l' else \
+                    ox - (x + w)
+            if 0 <= gap < travel:
+                hit, travel = obstacle, gap
+
+        self.move(travel)
+        if hit is not None:
+            self.react_collision(hit)
+
+        return hit
 
     def set_position(self, destination: tuple[float, float]) -> None:
         """
         Change the position of the entity to <destination>
         """
         self._x_pos, self._y_pos = destination
-        for d in 'u', 'd', 'l', 'r':
-            self.hit_box[d].update_pos(destination)
+        for box in self._boxes:
+            box.update_pos(destination)
 
 
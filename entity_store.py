@@ -0,0 +1,517 @@
+"""
+Contains an array-backed store for the state of the enemies in a room.
+The enemies in a store are thin views over its arrays, so the enemies of
+a room can be moved with a few vectorized operations instead of one
+update call per enemy. NumPy is required to use a store.
+"""
+
+from typing import Optional
+
+import pygame
+
+from enemy import LANE_TOLERANCE, Enemy, SupervisorEnemy
+from entity import Entity
+from pathfinding import FlowField
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The directions, in the order in which they are encoded in a store.
+DIRECTIONS = 'udrl'
+
+# The unit movement along each axis for every encoded direction.
+_DX = (0, 0, 1, -1)
+_DY = (-1, 1, 0, 0)
+
+# The encoded direction to the right of every encoded direction.
+_RIGHT_OF = (2, 3, 1, 0)
+
+# The kinds of enemy that a store can update.
+MINDLESS = 0
+SUPERVISOR = 1
+
+
+class _Column:
+    """
+    An attribute of an enemy in a store that is kept in one of the arrays
+    of the store.
+    """
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __get__(self, ent: Optional[Enemy], owner: type):
+        if ent is None:
+            return self
+        return getattr(ent._store, self.name)[ent._slot].item()
+
+    def __set__(self, ent: Enemy, value) -> None:
+        getattr(ent._store, self.name)[ent._slot] = value
+
+
+class _DirectionColumn(_Column):
+    """
+    The direction of an enemy in a store, encoded as an index into
+    DIRECTIONS.
+    """
+    def __get__(self, ent: Optional[Enemy], owner: type):
+        if ent is None:
+            return self
+        return DIRECTIONS[ent._store.direction[ent._slot]]
+
+    def __set__(self, ent: Enemy, value: str) -> None:
+        ent._store.direction[ent._slot] = DIRECTIONS.index(value)
+
+
+class _HitBoxView:
+    """
+    A hit box of an enemy in a store. Its position is derived from the
+    position of the enemy, so it never needs to be moved.
+    """
+    def __init__(self, ent: Enemy, d: int) -> None:
+        self._ent = ent
+        self._d = d
+
+    @property
+    def x_pos(self) -> float:
+        store, slot = self._ent._store, self._ent._slot
+        return (store.x[slot] + store.box[slot, self._d, 0]).item()
+
+    @property
+    def y_pos(self) -> float:
+        store, slot = self._ent._store, self._ent._slot
+        return (store.y[slot] + store.box[slot, self._d, 1]).item()
+
+    @property
+    def size(self) -> tuple[float, float]:
+        store, slot = self._ent._store, self._ent._slot
+        return (store.box[slot, self._d, 2].item(),
+                store.box[slot, self._d, 3].item())
+
+
+def _stored_move(self, speed=None, direction=None) -> None:
+    """
+    Move the enemy. Only its position in the store needs to change.
+    """
+    if speed is None:
+        speed = self.speed
+    d = self._store.direction[self._slot] if direction is None \
+        else DIRECTIONS.index(direction)
+    self._store.x[self._slot] += _DX[d] * speed
+    self._store.y[self._slot] += _DY[d] * speed
+
+
+def _stored_set_position(self, destination: tuple[float, float]) -> None:
+    """
+    Change the position of the enemy to <destination>.
+    """
+    self._store.x[self._slot], self._store.y[self._slot] = destination
+
+
+# The attributes of an enemy that are kept in the arrays of a store.
+_STORED = {'_x_pos': _Column('x'), '_y_pos': _Column('y'),
+           '_direction': _DirectionColumn('direction'),
+           'speed': _Column('speed'), '_distance': _Column('distance'),
+           '_pursuing': _Column('pursuing')}
+
+
+def _attributes(enemy: Enemy) -> list[tuple[str, object]]:
+    """
+    Return the name and value of every attribute that is set on <enemy>.
+    """
+    attributes = []
+    for cls in type(enemy).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(enemy, name):
+                attributes.append((name, getattr(enemy, name)))
+
+    return attributes + list(getattr(enemy, '__dict__', {}).items())
+
+
+# The view class of every enemy class, created on first use.
+_view_classes = {}
+
+
+def _view_class(cls: type) -> type:
+    """
+    Return the class of the views of enemies of class <cls>.
+    """
+    if cls not in _view_classes:
+        namespace = dict(_STORED)
+        namespace['move'] = _stored_move
+        namespace['set_position'] = _stored_set_position
+        namespace['hit_box'] = property(lambda self: self._box_views)
+        _view_classes[cls] = type('Stored' + cls.__name__, (cls,), namespace)
+
+    return _view_classes[cls]
+
+
+class EntityStore:
+    """
+    Stores the state of enemies in NumPy arrays, one entry per enemy.
+
+    == Attributes ==
+    size: The number of enemies in the store.
+    enemies: The view of the enemy in each slot of the store.
+    x, y: The position of each enemy.
+    speed: The speed of each enemy.
+    direction: The direction of each enemy, as an index into DIRECTIONS.
+    kind: The kind of each enemy. Either MINDLESS or SUPERVISOR.
+    distance: The distance travelled by each Supervisor since it last
+    turned while patrolling.
+    pursuing: Whether each Supervisor is pursuing the player.
+    box: The hit box of each enemy for every direction, as a row
+    (x offset, y offset, width, height) relative to the position of the enemy.
+    extent: The size of each enemy, as a row (width, height).
+
+    == Representation Invariants ==
+    Only the first <size> entries of each array are in use.
+    len(enemies) == size
+    """
+    # Private Attributes
+    # _field: The last directions of a flow field that were encoded and
+    # their encoding. None if no flow field has been used.
+    # _templates: The speed, kind, size and hit boxes that an enemy of each
+    # view class starts with, as first added to the store. Views removed
+    # from the store are added back with them.
+    size: int
+    enemies: list[Enemy]
+    _templates: dict[type: tuple]
+
+    def __init__(self, capacity: int = 64) -> None:
+        """
+        Initialize an empty store with room for <capacity> enemies.
+        """
+        if np is None:
+            raise ImportError('NumPy is required to use an EntityStore')
+
+        self.size = 0
+        self.enemies = []
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.direction = np.zeros(capacity, dtype=np.int8)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.distance = np.zeros(capacity)
+        self.pursuing = np.zeros(capacity, dtype=bool)
+        self.box = np.zeros((capacity, 4, 4))
+        self.extent = np.zeros((capacity, 2))
+        self._field = None
+        self._templates = {}
+
+    def _grow(self) -> None:
+        """
+        Double the capacity of the store.
+        """
+        for name in ('x', 'y', 'speed', 'direction', 'kind', 'distance',
+                     'pursuing', 'box', 'extent'):
+            array = getattr(self, name)
+            grown = np.zeros((2 * len(array),) + array.shape[1:],
+                             dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def add(self, enemy: Enemy) -> Enemy:
+        """
+        Move the state of <enemy> into the store and return the view that
+        replaces it. <enemy> must not be used afterwards.
+        If <enemy> is a view that was removed from this store, it is added
+        back and returned itself, and its state must be set with set_state
+        before it is used.
+
+        == Preconditions ==
+        enemy is a MindlessEnemy or a SupervisorEnemy.
+        """
+        if self.size == len(self.x):
+            self._grow()
+
+        slot = self.size
+        if getattr(enemy, '_store', None) is self:
+            self.speed[slot], self.kind[slot], self.extent[slot], \
+                self.box[slot] = self._templates[type(enemy)]
+            self.distance[slot], self.pursuing[slot] = 0, False
+            enemy._slot = slot
+            self.enemies.append(enemy)
+            self.size += 1
+            return enemy
+
+        self.x[slot], self.y[slot] = enemy.x_pos, enemy.y_pos
+        self.speed[slot] = enemy.speed
+        self.direction[slot] = DIRECTIONS.index(enemy._direction)
+        self.kind[slot] = SUPERVISOR if isinstance(enemy, SupervisorEnemy) \
+            else MINDLESS
+        self.distance[slot] = getattr(enemy, '_distance', 0)
+        self.pursuing[slot] = getattr(enemy, '_pursuing', False)
+        self.extent[slot] = enemy.size
+        for d, direction in enumerate(DIRECTIONS):
+            box = enemy.hit_box[direction]
+            self.box[slot, d] = (box.x_pos - enemy.x_pos,
+                                 box.y_pos - enemy.y_pos,
+                                 box.size[0], box.size[1])
+
+        view = object.__new__(_view_class(type(enemy)))
+        for name, value in _attributes(enemy):
+            if name not in _STORED and name not in ('hit_box', '_boxes'):
+                setattr(view, name, value)
+        view._store = self
+        view._slot = slot
+        if view._invulnerability_timer is not None:
+            # The timer must end the invulnerability of the view.
+            view._invulnerability_timer.callback = view._end_invulnerability
+        view._box_views = {direction: _HitBoxView(view, d)
+                           for d, direction in enumerate(DIRECTIONS)}
+        if type(view) not in self._templates:
+            self._templates[type(view)] = (self.speed[slot], self.kind[slot],
+                                           self.extent[slot].copy(),
+                                           self.box[slot].copy())
+
+        self.enemies.append(view)
+        self.size += 1
+
+        return view
+
+    def remove(self, enemy: Enemy) -> None:
+        """
+        Remove the view <enemy> from the store. The last enemy in the store
+        is moved into its slot. <enemy> must not be used afterwards.
+
+        == Preconditions ==
+        enemy is in the store.
+        """
+        slot, last = enemy._slot, self.size - 1
+        if slot != last:
+            for name in ('x', 'y', 'speed', 'direction', 'kind', 'distance',
+                         'pursuing', 'box', 'extent'):
+                array = getattr(self, name)
+                array[slot] = array[last]
+            moved = self.enemies[last]
+            moved._slot = slot
+            self.enemies[slot] = moved
+
+        self.enemies.pop()
+        self.size -= 1
+
+    def remove_many(self, enemies: list[Enemy]) -> None:
+        """
+        Remove the views <enemies> from the store at once. The remaining
+        enemies keep their order and are moved down to fill the slots.
+        None of <enemies> must be used afterwards.
+
+        == Preconditions ==
+        Every enemy in <enemies> is in the store, once.
+        """
+        n = self.size
+        keep = np.ones(n, dtype=bool)
+        keep[[enemy._slot for enemy in enemies]] = False
+        size = n - len(enemies)
+        for name in ('x', 'y', 'speed', 'direction', 'kind', 'distance',
+                     'pursuing', 'box', 'extent'):
+            array = getattr(self, name)
+            array[:size] = array[:n][keep]
+
+        self.enemies = [enemy for enemy, kept in
+                        zip(self.enemies, keep.tolist()) if kept]
+        for slot, enemy in enumerate(self.enemies):
+            enemy._slot = slot
+        self.size = size
+
+    def hit_boxes(self) -> 'np.ndarray':
+        """
+        Return the current hit box of every enemy in the store, in the
+        format returned by Entity.hit_box_array.
+        """
+        n = self.size
+        return self.box[np.arange(n), self.direction[:n]] + \
+            np.column_stack((self.x[:n], self.y[:n], np.zeros(n), np.zeros(n)))
+
+    def collisions(self, others: list[Entity],
+                   boxes: Optional['np.ndarray'] = None) \
+            -> list[tuple[Enemy, Entity]]:
+        """
+        Return every pair (enemy, ent) where enemy is in the store, ent is in
+        <others>, and the two are touching. <boxes> are the hit boxes of
+        <others> as returned by Entity.hit_box_array, if already known.
+        """
+        if self.size == 0 or not others:
+            return []
+
+        if boxes is None:
+            boxes = Entity.hit_box_array(others)
+        hits = Entity.overlaps(self.hit_boxes(), boxes)
+        return [(self.enemies[i], others[j])
+                for i, j in zip(*np.nonzero(hits))]
+
+    def blit_items(self, viewport: pygame.Rect) \
+            -> list[tuple[pygame.Surface, tuple[float, float]]]:
+        """
+        Return the sprite and position of every enemy in the store that is
+        at least partly inside <viewport>, in the order of the store, as
+        items of the sequence given to Surface.blits.
+        """
+        n = self.size
+        x, y = self.x[:n], self.y[:n]
+        visible = np.nonzero((x < viewport.right) & (y < viewport.bottom) &
+                             (x + self.extent[:n, 0] > viewport.left) &
+                             (y + self.extent[:n, 1] > viewport.top))[0]
+
+        enemies = self.enemies
+        return [(enemies[i].sprite[DIRECTIONS[d]], (ex, ey))
+                for i, d, ex, ey in zip(visible.tolist(),
+                                        self.direction[visible].tolist(),
+                                        x[visible].tolist(),
+                                        y[visible].tolist())]
+
+    def _field_codes(self, flow_field: FlowField) -> 'np.ndarray':
+        """
+        Return the directions of <flow_field> encoded as indices into
+        DIRECTIONS, or -1 where the field has no direction. The encoding is
+        cached until the field is recomputed.
+        """
+        directions = flow_field.directions()
+        if self._field is None or self._field[0] is not directions:
+            codes = np.array([-1 if d is None else DIRECTIONS.index(d)
+                              for d in directions], dtype=np.int8)
+            self._field = (directions, codes)
+
+        return self._field[1]
+
+    def _follow(self, flow_field: FlowField, speed: 'np.ndarray') \
+            -> tuple['np.ndarray', 'np.ndarray']:
+        """
+        Return the direction in which every enemy would move, and how far,
+        to follow <flow_field> at <speed>, as SupervisorEnemy._follow_field
+        does. The direction is -1 for the enemies outside the field and in
+        the cell of its target.
+        """
+        n = self.size
+        x, y = self.x[:n], self.y[:n]
+        width, height = self.extent[:n, 0], self.extent[:n, 1]
+        cell = flow_field.cell_size
+
+        column = ((x + width / 2) // cell).astype(int)
+        row = ((y + height / 2) // cell).astype(int)
+        inside = (column >= 0) & (column < flow_field.columns) & \
+            (row >= 0) & (row < flow_field.rows)
+        index = np.where(inside, row * flow_field.columns + column, 0)
+        field = np.where(inside, self._field_codes(flow_field)[index], -1)
+
+        # Supervisors first move to the middle of their cell across the
+        # direction of the field.
+        horizontal = field >= 2
+        offset = np.where(horizontal, row * cell + (cell - height) / 2 - y,
+                          column * cell + (cell - width) / 2 - x)
+        centring = np.abs(offset) > LANE_TOLERANCE
+        lane = np.where(horizontal, np.where(offset > 0, 1, 0),
+                        np.where(offset > 0, 2, 3))
+        follow = np.where(centring & (field >= 0), lane, field)
+        follow_step = np.where(centring, np.minimum(np.abs(offset), speed),
+                               speed)
+
+        return follow, follow_step
+
+    def _sweep(self, step: 'np.ndarray', boxes: 'np.ndarray') \
+            -> tuple['np.ndarray', 'np.ndarray']:
+        """
+        Return how far every enemy can move <step> in its direction before
+        it reaches the first of the hit boxes <boxes> in its way, as
+        Entity.sweep does, and the index in <boxes> of the box it reaches,
+        or -1 if there is none.
+        """
+        n = self.size
+        travel, hit = step.copy(), np.full(n, -1)
+        if len(boxes) == 0:
+            return travel, hit
+
+        own = self.hit_boxes()
+        ox, oy, ow, oh = boxes.T
+        direction = self.direction[:n]
+        for d in range(4):
+            movers = np.nonzero((direction == d) & (step > 0))[0]
+            if len(movers) == 0:
+                continue
+            x, y, w, h = (own[movers, k, None] for k in range(4))
+            # Only the boxes beside the path of an enemy can be in its way.
+            if d < 2:
+                lateral = (x < ox + ow) & (ox < x + w)
+                gap = y - (oy + oh) if d == 0 else oy - (y + h)
+            else:
+                lateral = (y < oy + oh) & (oy < y + h)
+                gap = x - (ox + ow) if d == 3 else ox - (x + w)
+            gap = np.where(lateral & (gap >= 0) & (gap < step[movers, None]),
+                           gap, np.inf)
+
+            nearest = gap.argmin(axis=1)
+            distance = gap[np.arange(len(movers)), nearest]
+            blocked = distance < np.inf
+            travel[movers[blocked]] = distance[blocked]
+            hit[movers[blocked]] = nearest[blocked]
+
+        return travel, hit
+
+    def update(self, player_coord: tuple[float, float],
+               flow_field: Optional[FlowField] = None,
+               colliders: Optional[list[Entity]] = None,
+               boxes: Optional['np.ndarray'] = None) -> None:
+        """
+        Update every enemy in the store at once. This has the same effect as
+        calling the update method of each enemy. Supervisors follow
+        <flow_field> while pursuing the player, if it is given. Enemies stop
+        at the edge of the first entity in <colliders> in their way and
+        react to it. <boxes> are the hit boxes of <colliders> as returned by
+        Entity.hit_box_array, if already known.
+        """
+        n = self.size
+        x, y = self.x[:n], self.y[:n]
+        speed, direction = self.speed[:n], self.direction[:n]
+        distance = self.distance[:n]
+        player_x, player_y = player_coord
+
+        supervisor = self.kind[:n] == SUPERVISOR
+        pursuing = supervisor & ((player_x - x) ** 2 + (player_y - y) ** 2 <
+                                 SupervisorEnemy.PURSUIT_RANGE ** 2)
+        patrolling = supervisor & ~pursuing
+        self.pursuing[:n] = pursuing
+
+        # Supervisors that have patrolled far enough turn right instead of
+        # moving.
+        speed[patrolling] = SupervisorEnemy.STANDARD_SPEED
+        turning = patrolling & (distance >= 100)
+        distance[turning] = 0
+        direction[turning] = np.take(_RIGHT_OF, direction[turning])
+
+        # Pursuing Supervisors close in on the player one axis at a time.
+        speed[pursuing] = SupervisorEnemy.CHASE_SPEED
+        above, below = player_y < y, player_y > y
+        level = ~above & ~below
+        chase = np.select([above, below, level & (player_x < x)],
+                          [0, 1, 3], 2)
+        chase_step = np.where(level, np.minimum(np.abs(player_x - x), speed),
+                              np.minimum(np.abs(player_y - y), speed))
+        # A Supervisor to the right of the player moves at full speed.
+        chase_step = np.where(level & (player_x < x), speed, chase_step)
+
+        # Supervisors with a direction in the flow field follow it instead.
+        if flow_field is not None and pursuing.any():
+            follow, follow_step = self._follow(flow_field, speed)
+            following = pursuing & (follow >= 0)
+            chase = np.where(following, follow, chase)
+            chase_step = np.where(following, follow_step, chase_step)
+        direction[pursuing] = chase[pursuing]
+
+        step = np.where(pursuing, chase_step, speed)
+        step[turning] = 0
+        distance[patrolling & ~turning] += speed[patrolling & ~turning]
+
+        hit = None
+        if colliders:
+            if boxes is None:
+                boxes = Entity.hit_box_array(colliders)
+            step, hit = self._sweep(step, boxes)
+
+        x += np.take(_DX, direction) * step
+        y += np.take(_DY, direction) * step
+
+        if hit is not None:
+            for i in np.nonzero(hit >= 0)[0]:
+                self.enemies[i].react_collision(colliders[hit[i]])
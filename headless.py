@@ -0,0 +1,137 @@
+"""
+Runs Block Adventure without a window. The game is stepped with a fixed
+timestep on a simulation clock as fast as the CPU allows, and the player
+is driven by scripted input instead of the keyboard.
+"""
+
+import os
+from typing import Optional
+
+import pygame
+from pygame.locals import *
+
+import loop
+import profiler
+import timing
+from hud import HUD
+from level import DEFAULT_LEVEL
+from map import GameMap
+from player import Player
+from profiler import Profiler
+from renderer import DirtyRectRenderer
+from timing import SimClock
+
+
+def key_script(presses: list[tuple[int, int, int]]) \
+        -> dict[int: list[pygame.event.Event]]:
+    """
+    Return a script in which every key in <presses> is held down.
+    Each press is a 3-tuple of the tick on which the key is pressed, the tick
+    on which it is released and the key.
+    """
+    script = {}
+    for start, end, key in presses:
+        script.setdefault(start, []).append(
+            pygame.event.Event(KEYDOWN, key=key))
+        script.setdefault(end, []).append(pygame.event.Event(KEYUP, key=key))
+
+    return script
+
+
+class Simulation:
+    """
+    A headless simulation of Block Adventure.
+
+    == Attributes ==
+    window: The surface that the game is drawn to. It is never shown.
+    game_map: The map being played.
+    player: The player.
+    hud: The HUD of the player.
+    renderer: Draws the game to window.
+    clock: The simulation clock that all the timers in the game use.
+    tick: The number of ticks simulated so far.
+    script: The events that are handled on each tick.
+    profiler: Times the phases of every tick.
+    """
+    window: pygame.Surface
+    game_map: GameMap
+    player: Player
+    hud: HUD
+    renderer: DirtyRectRenderer
+    clock: SimClock
+    tick: int
+    script: dict[int: list[pygame.event.Event]]
+    profiler: Profiler
+
+    TICK_MS = 1000 / 60  # Milliseconds per tick
+    START = (285, 500, 3)  # The position and hp of the player at the start
+
+    def __init__(self, script: Optional[dict] = None,
+                 level: str = DEFAULT_LEVEL,
+                 start: tuple[float, float, int] = START) -> None:
+        """
+        Initialize a simulation of a new game on the level file at <level>
+        which is played according to <script>. The player starts with the
+        position and hp in <start>. The dummy video driver of SDL is used so
+        no window is opened.
+        """
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        pygame.init()
+        self.window = pygame.display.set_mode((600, 700))
+
+        self.clock = SimClock()
+        timing.set_clock(self.clock)
+
+        # Rooms are only built on demand, so that which rooms are in memory
+        # does not depend on how fast a background thread builds them.
+        self.game_map = GameMap(level, prefetch=False)
+        self.player = Player(x=start[0], y=start[1], hp=start[2])
+        self.hud = HUD(self.player)
+        self.renderer = DirtyRectRenderer(pygame.Rect(0, 600, 600, 100))
+        self.tick = 0
+        self.script = {} if script is None else script
+        self.profiler = Profiler()
+        profiler.set_profiler(self.profiler)
+
+    @property
+    def phase_time(self) -> dict[str: float]:
+        """
+        Return the total number of seconds spent in each phase of a tick
+        over the ticks simulated so far.
+        """
+        return {name: ms / 1000
+                for name, ms in self.profiler.totals().items()}
+
+    def step(self, dt: float = TICK_MS) -> None:
+        """
+        Simulate a single tick of the game lasting <dt> milliseconds. This
+        runs the same steps as the main loop of the game, in the same order.
+        """
+        self.profiler.begin_frame()
+        loop.step(self.game_map, self.player, self.window, self.hud,
+                  self.renderer, dt,
+                  lambda: self.script.get(self.tick, []), self.clock)
+        self.tick += 1
+
+    def run(self, ticks: int) -> None:
+        """
+        Simulate <ticks> ticks of the game.
+        """
+        for _ in range(ticks):
+            self.step()
+
+    def fast_forward(self, ms: float) -> None:
+        """
+        Advance the simulation clock by <ms> milliseconds without simulating
+        any ticks. Every timer that falls due on the way runs at its deadline.
+        """
+        timing.fast_forward(ms)
+
+    def close(self) -> None:
+        """
+        Stop building rooms in the background, stop using the simulation
+        clock for the timers in the game and stop timing phases.
+        """
+        self.game_map.close()
+        timing.set_clock(None)
+        profiler.set_profiler(None)
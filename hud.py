@@ -1,3 +1,4 @@
+from typing import Optional
 from player import Player
 from pygame import Surface
 import pygame
@@ -12,6 +13,13 @@ class HUD:
     font: The font used for the writing on the HUD
     player: The player the HUD corresponds to.
     """
+    # Private Attributes
+    # _shown: The (hp, max_hp) of the player currently drawn on surface.
+    # None if surface must be redrawn.
+    # _glyphs: The rendered text for every "hp / max_hp" shown so far.
+    _shown: Optional[tuple[int, int]]
+    _glyphs: dict[str: Surface]
+
     def __init__(self, player: Player):
         self.surface = Surface((600, 100))
         self.surface.fill((100, 100, 100))
@@ -23,22 +31,51 @@ class HUD:
 
         self.player = player
         self.font = pygame.font.SysFont('microsoftsansserif', 15)
+        self._shown = None
+        self._glyphs = {}
 
         # print(pygame.font.get_fonts())
 
-    def draw(self, surf: Surface) -> None:
+    def is_dirty(self) -> bool:
+        """
+        Return whether the HUD shows a different hp than the player has.
+        """
+        return self._shown != (self.player.hp, self.player.max_hp)
+
+    def invalidate(self) -> None:
+        """
+        Redraw the HUD the next time it is drawn.
+        """
+        self._shown = None
+
+    def _render_text(self, text: str) -> Surface:
+        """
+        Return <text> rendered in the font of the HUD. Each text is only
+        rendered once.
+        """
+        if text not in self._glyphs:
+            self._glyphs[text] = self.font.render(text, True, (255, 255, 255),
+                                                  (100, 100, 100))
+        return self._glyphs[text]
+
+    def draw(self, surf: Surface) -> bool:
         """
-        Draw the HUD to the screen.
+        Draw the HUD to the screen if the hp of the player has changed since
+        it was last drawn. Return whether the HUD was drawn.
         """
+        if not self.is_dirty():
+            return False
+
         pygame.draw.rect(self.surface, (0, 0, 0), (70, 30, 250, 10))
         pygame.draw.rect(self.surface, (100, 100, 100), (320, 25, 40, 15))
 
-        t = self.font.render(f'{max(self.player.hp, 0)} / {self.player.max_hp}',
-                             True, (255, 255, 255), (100, 100, 100))
+        t = self._render_text(f'{max(self.player.hp, 0)} / '
+                              f'{self.player.max_hp}')
         self.surface.blit(t, (330, 25))
         if self.player.hp > 0:
             pygame.draw.rect(self.surface, (255, 0, 0), (80, 34, 230 *
                              (self.player.hp/self.player.max_hp), 3))
         surf.blit(self.surface, (0, 600))
+        self._shown = (self.player.hp, self.player.max_hp)
 
-
+        return True
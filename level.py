@@ -0,0 +1,333 @@
+"""
+Loads the levels of Block Adventure from level files.
+
+A level file is a JSON object of the form
+    {"version": 1,
+     "start": <name of the room the player starts in>,
+     "rooms": {<room name>: <room>, ...}}
+where each room is an object with the optional keys
+    "doors": {<'N', 'S', 'E' or 'W'>: <name of the room it leads to>, ...}
+    "tiles": [<row>, ...]
+    "obstacles": [[h, v, x, y, <type>], ...]
+    "enemies": [[<kind>, x, y, <direction>], ...]
+Each row of "tiles" is a string with one character per Obstacle.SIZE cell
+of the room, using the characters in TILES. Each entry of "obstacles" is
+added with Room.add_obstacles. The types of obstacle are the keys of
+OBSTACLE_TYPES and the kinds of enemy are the keys of ENEMY_KINDS.
+
+A level file is compiled into a binary cache next to it the first time it
+is loaded. The cache is memory-mapped, and a room is only decoded from it
+when the room is built, so loading a level takes the same time no matter
+how many rooms it has.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+from enemy import ENEMY_KINDS, Enemy
+from obstacle import Obstacle
+from room import Room
+
+# The version of the level file format and of the binary cache format.
+FORMAT_VERSION = 1
+
+# The level that the game is played on.
+DEFAULT_LEVEL = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'levels', 'world.json')
+
+OBSTACLE_TYPES = {'stone': Obstacle.STONE, 'box': Obstacle.BOX,
+                  'puddle': Obstacle.PUDDLE}
+TILES = {'#': 'stone', 'B': 'box', '~': 'puddle'}
+DOORS = 'NSEW'
+DIRECTIONS = 'udrl'
+
+# The layout of the binary cache. All records are little-endian.
+# The header: magic, version, modification time and size of the level file,
+# number of rooms and index of the starting room.
+_HEADER = struct.Struct('<4sHqqII')
+_MAGIC = b'BADV'
+# The offset of each room record follows the header.
+_OFFSET = struct.Struct('<I')
+# A room: door flags, index of the room behind each door (-1 if none),
+# number of obstacle records and number of enemy records. It is followed by
+# the length of the name of the room and the name, then the records.
+_ROOM = struct.Struct('<B4iHH')
+_NAME_LENGTH = struct.Struct('<B')
+# An obstacle record: type, h, v, x, y.
+_OBSTACLE = struct.Struct('<BHHff')
+# An enemy record: kind, direction, x, y.
+_ENEMY = struct.Struct('<BBff')
+
+
+class LevelError(Exception):
+    """
+    Raised when a level file is invalid.
+    """
+    pass
+
+
+def _tile_blocks(tiles: list[str]) -> list[list]:
+    """
+    Return the obstacles described by the rows <tiles> as [h, 1, x, y, type]
+    blocks, with contiguous tiles of the same type in a row merged.
+    """
+    blocks = []
+    for j, row in enumerate(tiles):
+        i = 0
+        while i < len(row):
+            if row[i] not in TILES:
+                i += 1
+                continue
+            start = i
+            while i < len(row) and row[i] == row[start]:
+                i += 1
+            blocks.append([i - start, 1, start * Obstacle.SIZE,
+                           j * Obstacle.SIZE, TILES[row[start]]])
+
+    return blocks
+
+
+def _compile_room(name: str, room: dict, index: dict[str: int],
+                  path: str) -> bytes:
+    """
+    Return the record of the room <name> described by <room> in the level
+    file at <path>, where <index> maps the name of every room of the level
+    to its index. Raise LevelError if a door of the room leads to an unknown
+    room, and another exception if the room is malformed.
+    """
+    doors = room.get('doors', {})
+    flags, links = 0, []
+    for bit, door in enumerate(DOORS):
+        target = doors.get(door)
+        if target is not None and target not in index:
+            raise LevelError(f'{path}: door {door} of {name} leads to '
+                             f'unknown room {target}')
+        if door in doors:
+            flags |= 1 << bit
+        links.append(-1 if target is None else index[target])
+
+    obstacles = _tile_blocks(room.get('tiles', [])) + \
+        room.get('obstacles', [])
+    enemies = room.get('enemies', [])
+    encoded = name.encode()
+
+    record = [_ROOM.pack(flags, *links, len(obstacles), len(enemies)),
+              _NAME_LENGTH.pack(len(encoded)), encoded]
+    for h, v, x, y, type_obs in obstacles:
+        record.append(_OBSTACLE.pack(list(OBSTACLE_TYPES).index(type_obs),
+                                     h, v, x, y))
+    for kind, x, y, direction in enemies:
+        record.append(_ENEMY.pack(list(ENEMY_KINDS).index(kind),
+                                  DIRECTIONS.index(direction), x, y))
+
+    return b''.join(record)
+
+
+def compile_level(path: str) -> bytes:
+    """
+    Return the binary cache of the level file at <path>.
+    Raise LevelError if the level file is invalid.
+    """
+    with open(path) as f:
+        source = json.load(f)
+    stat = os.stat(path)
+
+    if source.get('version') != FORMAT_VERSION:
+        raise LevelError(f'{path}: unsupported version '
+                         f'{source.get("version")}')
+
+    try:
+        rooms, start = source['rooms'], source['start']
+    except KeyError as error:
+        raise LevelError(f'{path}: missing key {error}')
+    names = list(rooms)
+    index = {name: i for i, name in enumerate(names)}
+    if start not in index:
+        raise LevelError(f'{path}: unknown starting room {start}')
+
+    records = []
+    for name in names:
+        try:
+            record = _compile_room(name, rooms[name], index, path)
+        except (AttributeError, KeyError, TypeError, ValueError,
+                struct.error) as error:
+            raise LevelError(f'{path}: invalid entry in {name}: {error}')
+        records.append(record)
+
+    offset = _HEADER.size + _OFFSET.size * len(records)
+    offsets = []
+    for record in records:
+        offsets.append(_OFFSET.pack(offset))
+        offset += len(record)
+
+    header = _HEADER.pack(_MAGIC, FORMAT_VERSION, stat.st_mtime_ns,
+                          stat.st_size, len(names), index[start])
+
+    return b''.join([header] + offsets + records)
+
+
+def _is_current(buffer, stat: os.stat_result) -> bool:
+    """
+    Return whether the binary cache in <buffer> was compiled by this
+    version of the game from a level file with the status <stat>.
+    """
+    if len(buffer) < _HEADER.size:
+        return False
+    magic, version, mtime, size, _, _ = _HEADER.unpack_from(buffer)
+
+    return magic == _MAGIC and version == FORMAT_VERSION and \
+        mtime == stat.st_mtime_ns and size == stat.st_size
+
+
+def load_level(path: str = DEFAULT_LEVEL) -> 'Level':
+    """
+    Return the level in the level file at <path>. The binary cache of the
+    level is used if it is up to date. Otherwise the level file is compiled
+    and the cache is rewritten.
+    """
+    cache = os.path.splitext(path)[0] + '.lvl'
+    stat = os.stat(path)
+
+    try:
+        with open(cache, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if _is_current(buffer, stat):
+            return Level(buffer)
+        buffer.close()
+    except (OSError, ValueError):
+        # The cache is missing or empty.
+        pass
+
+    data = compile_level(path)
+    try:
+        with open(cache, 'wb') as f:
+            f.write(data)
+    except OSError:
+        # The cache cannot be written. The compiled level is used directly.
+        pass
+
+    return Level(data)
+
+
+class Level:
+    """
+    A compiled level of Block Adventure. Rooms are identified by their
+    index in the level.
+
+    == Attributes ==
+    room_count: The number of rooms in the level.
+    start: The index of the room in which the player starts.
+    """
+    # Private Attributes
+    # _buffer: The binary cache of the level.
+    # _spawn_states: The spawn states of the rooms, keyed by the index of the
+    # room, for the rooms whose spawn states have been needed.
+    room_count: int
+    start: int
+    _spawn_states: dict[int: list[tuple]]
+
+    def __init__(self, buffer) -> None:
+        """
+        Initialize a level from the binary cache in <buffer>. Only the header
+        of the cache is read.
+        """
+        magic, version, _, _, self.room_count, self.start = \
+            _HEADER.unpack_from(buffer)
+        if magic != _MAGIC or version != FORMAT_VERSION:
+            raise LevelError('invalid level cache')
+        self._buffer = buffer
+        self._spawn_states = {}
+
+    def _room_offset(self, index: int) -> int:
+        """
+        Return the offset of the record of room <index> in the cache.
+        """
+        return _OFFSET.unpack_from(self._buffer, _HEADER.size +
+                                   _OFFSET.size * index)[0]
+
+    def room_name(self, index: int) -> str:
+        """
+        Return the name of room <index>.
+        """
+        offset = self._room_offset(index) + _ROOM.size
+        length = _NAME_LENGTH.unpack_from(self._buffer, offset)[0]
+        offset += _NAME_LENGTH.size
+
+        return bytes(self._buffer[offset:offset + length]).decode()
+
+    def neighbours(self, index: int) -> dict[str: int]:
+        """
+        Return the index of the room behind each door of room <index>,
+        keyed by the direction of the door.
+        """
+        links = _ROOM.unpack_from(self._buffer, self._room_offset(index))[1:5]
+
+        return {door: link for door, link in zip(DOORS, links) if link >= 0}
+
+    def _read_room(self, index: int) -> tuple[int, int, int, int]:
+        """
+        Return the door flags of room <index>, the offset of its first
+        obstacle record, and its number of obstacle and enemy records.
+        """
+        offset = self._room_offset(index)
+        flags, _, _, _, _, n_obstacles, n_enemies = \
+            _ROOM.unpack_from(self._buffer, offset)
+        offset += _ROOM.size
+        offset += _NAME_LENGTH.size + \
+            _NAME_LENGTH.unpack_from(self._buffer, offset)[0]
+
+        return flags, offset, n_obstacles, n_enemies
+
+    def build_room(self, index: int, spawn: bool = True) -> Room:
+        """
+        Return a new room built from the record of room <index>. Its doors
+        are not connected to any rooms. The enemies of the room are only
+        added if <spawn> is True.
+        """
+        flags, offset, n_obstacles, _ = self._read_room(index)
+        room = Room(north=bool(flags & 1), south=bool(flags & 2),
+                    east=bool(flags & 4), west=bool(flags & 8))
+
+        types = list(OBSTACLE_TYPES.values())
+        end = offset + _OBSTACLE.size * n_obstacles
+        for type_obs, h, v, x, y in _OBSTACLE.iter_unpack(
+                self._buffer[offset:end]):
+            room.add_obstacles(h, v, x, y, types[type_obs])
+
+        if spawn:
+            for enemy in self.spawn_enemies(index):
+                room.add_enemy(enemy)
+
+        return room
+
+    def spawn_enemies(self, index: int) -> list[Enemy]:
+        """
+        Return new enemies for every enemy record of room <index>, in the
+        order in which they appear in the level file.
+        """
+        _, offset, n_obstacles, n_enemies = self._read_room(index)
+        offset += _OBSTACLE.size * n_obstacles
+        end = offset + _ENEMY.size * n_enemies
+
+        kinds = list(ENEMY_KINDS.values())
+        enemies = []
+        for spawn, (kind, direction, x, y) in enumerate(_ENEMY.iter_unpack(
+                self._buffer[offset:end])):
+            enemy = kinds[kind](x=x, y=y, init_direct=DIRECTIONS[direction])
+            enemy.spawn = spawn
+            enemies.append(enemy)
+
+        return enemies
+
+    def spawn_states(self, index: int) -> list[tuple]:
+        """
+        Return the state of every enemy of room <index> when it is spawned,
+        as returned by Enemy.get_state, in the order of spawn_enemies.
+        """
+        if index not in self._spawn_states:
+            self._spawn_states[index] = [
+                enemy.get_state() for enemy in self.spawn_enemies(index)]
+
+        return self._spawn_states[index]
@@ -0,0 +1,83 @@
+"""
+Contains a single tick of the main loop of Block Adventure. The game and the
+headless simulation both run their ticks with step, so they run the same
+steps in the same order.
+
+Every step of a tick is timed as a phase of the active profiler, if any.
+"""
+
+from typing import Callable, Iterable, Optional
+
+import pygame
+
+import profiler
+import timing
+from hud import HUD
+from map import GameMap
+from player import Player
+from profiler import Profiler
+from renderer import DirtyRectRenderer
+from timing import SimClock
+
+
+def step(game_map: GameMap, player: Player, window: pygame.Surface,
+         hud: HUD, renderer: DirtyRectRenderer, dt: float,
+         events: Callable[[], Iterable[pygame.event.Event]],
+         clock: Optional[SimClock] = None,
+         overlay: Optional[Profiler] = None) -> None:
+    """
+    Run a single tick of the game played on <game_map> by <player>, lasting
+    <dt> milliseconds, and draw it to <window> with <renderer> and <hud>.
+
+    The tick runs the due timers, changes rooms if <player> walks through a
+    door, then either advances the transition in progress or updates the
+    current room and draws the parts of <window> that changed. Then <player>
+    handles the events returned by <events>, and <clock> is advanced by
+    <dt>, if it is not None. The overlay of <overlay> is drawn over the
+    window, if it is not None.
+    """
+    with profiler.phase('timers'):
+        timing.run_due()
+
+    with profiler.phase('rooms'):
+        if game_map.transition is None:
+            door = game_map.current_room.change_room(player)
+            if door is not None:
+                game_map.change_room(door, player)
+            else:
+                game_map.prefetch(player)
+
+        # The rooms are not updated while the camera shifts.
+        transition = game_map.transition
+        if transition is not None:
+            game_map.update_transition(dt, player)
+
+    if transition is not None:
+        with profiler.phase('blits'):
+            transition.draw(window, player)
+            hud.draw(window)
+            if overlay is not None:
+                overlay.draw_overlay(window)
+        with profiler.phase('display'):
+            pygame.display.update()
+        renderer.invalidate()
+    else:
+        # Update the room, then draw the parts of the window that changed.
+        room = game_map.current_room
+        room.update(player)
+        with profiler.phase('deaths'):
+            room.handle_deaths()
+        renderer.render(window, room, player, hud)
+        if overlay is not None:
+            with profiler.phase('blits'):
+                drawn = overlay.draw_overlay(window)
+            if drawn is not None:
+                with profiler.phase('display'):
+                    pygame.display.update(drawn)
+
+    with profiler.phase('events'):
+        for event in events():
+            player.handle_events(event)
+
+    if clock is not None:
+        clock.advance(dt)
@@ -1,44 +1,113 @@
+import argparse
+import random
+import time
+
 import pygame
 
 from hud import HUD
+import loop
 from player import Player
 from pygame.locals import *
 from map import GameMap
+import profiler
+from profiler import Profiler
+from renderer import DirtyRectRenderer
+from replay import Recording
 import sys
+import timing
+from timing import SimClock
+
+# The number of milliseconds between two updates of the window caption.
+CAPTION_PERIOD = 500
+# The key that shows and hides the profiling overlay.
+OVERLAY_KEY = K_F3
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play Block Adventure.')
+    parser.add_argument('--record', metavar='FILE', default=None,
+                        help='record the session to FILE so that it can be '
+                             'replayed with replay.py')
+    parser.add_argument('--telemetry', metavar='FILE', default=None,
+                        help='write the frame times of the last frames to '
+                             'FILE on exit, as JSON if FILE ends in .json '
+                             'and as CSV otherwise')
+    args = parser.parse_args()
+
     pygame.init()
 
+    # A recorded session is timed with a simulation clock advanced by the
+    # duration of every frame, so that its replay runs the same timers.
+    recording = sim_clock = None
+    if args.record is not None:
+        seed = time.time_ns()
+        random.seed(seed)
+        sim_clock = SimClock()
+        timing.set_clock(sim_clock)
+        recording = Recording(seed=seed)
+
     window = pygame.display.set_mode((600, 700))
     window.fill((0, 0, 0))
-    g_map = GameMap()
+    # A recorded session builds rooms on demand like its replay does, so
+    # that the same rooms are in memory on every tick.
+    g_map = GameMap(prefetch=recording is None)
     player = Player(x=285, y=500, hp=3)
     hud = HUD(player)
+    renderer = DirtyRectRenderer(pygame.Rect(0, 600, 600, 100))
     clock = pygame.time.Clock()
+    frame_profiler = Profiler()
+    profiler.set_profiler(frame_profiler)
+    caption, caption_time = None, -CAPTION_PERIOD
 
-    # Main game loop
-    while True:
-        clock.tick(60)
-        pygame.display.set_caption(f"Block Adventure. FPS: "
-                                   f"{int(clock.get_fps())}")
+    running = True
 
-        hud.draw(window)
+    def poll_events() -> list[pygame.event.Event]:
+        """
+        Handle the events from the user that are not for the player, and
+        return the rest. When the window is closed, the events that follow
+        are dropped and the game ends after the current tick.
+        """
+        global running
+        events = []
+        for event in pygame.event.get():
+            if event.type == QUIT:
+                running = False
+                break
+            if recording is not None:
+                recording.record_event(event)
+            if event.type == KEYDOWN and event.key == OVERLAY_KEY:
+                frame_profiler.overlay = not frame_profiler.overlay
+                # The window is redrawn to clear the overlay.
+                renderer.invalidate()
+                continue
+            events.append(event)
 
-        # Change rooms if needed.
-        temp = g_map.current_room.change_room(player)
-        if temp is not None:
-            g_map.change_room(temp, player, window)
+        return events
 
-        # Draw the room to the window
-        g_map.current_room.draw_room(window, 0, 0, player, False)
+    # Main game loop
+    while running:
+        dt = clock.tick(60)
+        frame_profiler.begin_frame()
+        if recording is not None:
+            recording.record_tick(dt)
 
-        # Process events from user.
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-            player.handle_events(event)
+        # Setting the caption is slow on some platforms, so it is only done
+        # when it changes, and at most every CAPTION_PERIOD ms.
+        now = pygame.time.get_ticks()
+        if now - caption_time >= CAPTION_PERIOD:
+            caption_time = now
+            text = f"Block Adventure. FPS: {int(clock.get_fps())}"
+            if text != caption:
+                caption = text
+                pygame.display.set_caption(caption)
 
-        # Display the new state of the window.
-        pygame.display.update()
+        loop.step(g_map, player, window, hud, renderer, dt, poll_events,
+                  sim_clock, frame_profiler)
 
+    if recording is not None:
+        recording.finish(g_map, player)
+        recording.save(args.record)
+    if args.telemetry is not None:
+        frame_profiler.export(args.telemetry)
+    g_map.close()
+    pygame.quit()
+    sys.exit()
@@ -1,93 +1,300 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
 from room import *
 from player import Player
+from level import DEFAULT_LEVEL, OBSTACLE_TYPES, Level, load_level
+from transition import RoomTransition
 
 
 class GameMap:
     """
-    A game map for block adventure
+    A game map for block adventure. Rooms are built from the level when they
+    are first needed, and only a bounded number of them are kept in memory.
+    When a room is evicted, the state of its enemies is kept so that the room
+    can be rebuilt exactly as it was left.
 
     == Attributes ==
     current_room: The room in which the player is currently playing.
+    level: The level that the rooms of the map are built from.
+    capacity: The maximum number of rooms kept in memory.
+    transition: The change of rooms in progress. None if the player is not
+    changing rooms.
+
+    == Representation Invariants ==
+    capacity >= 2
     """
+    # Private Attributes
+    # _current: The index of the current room in the level.
+    # _rooms: The rooms in memory keyed by their index, from the least to the
+    # most recently used.
+    # _snapshots: The state of the enemies of each evicted room, as returned
+    # by Room.snapshot_enemies.
+    # _schedules: The state of the scheduler of each room that is not in
+    # memory, as returned by Room.snapshot_scheduler, to be restored when
+    # the room is built.
+    # _free: The enemies released by rooms, by kind, which are reused for
+    # the enemies added to the rooms that share it.
+    # _prefetching: The rooms being built in the background, without their
+    # enemies.
+    # _executor: Builds rooms in the background. None if rooms are never
+    # prefetched or the map has been closed.
     current_room: Room
+    level: Level
+    capacity: int
+    transition: Optional[RoomTransition]
+    _current: int
+    _rooms: OrderedDict[int: Room]
+    _snapshots: dict[int: list[tuple[int, tuple]]]
+    _schedules: dict[int: tuple]
+    _free: dict[str: list[Enemy]]
+    _prefetching: dict[int: Future]
+    _executor: Optional[ThreadPoolExecutor]
+
+    # Neighbouring rooms are prefetched when the player is this close to the
+    # door that leads to them.
+    PREFETCH_DISTANCE = 90
 
-    def __init__(self) -> None:
+    def __init__(self, path: str = DEFAULT_LEVEL, capacity: int = 5,
+                 prefetch: bool = True) -> None:
         """
-        Initialize a game map.
+        Initialize a game map from the level file at <path>, keeping at most
+        <capacity> rooms in memory. If <prefetch> is True, rooms behind doors
+        that the player approaches are built in the background. Only the
+        layout of a room is built in the background: surfaces are created
+        and timers are scheduled on the thread that uses the map.
         """
-        # The rooms included in the map
-        room1 = Room1()
-        room2 = Room2()
-        room3 = Room3()
+        self.level = load_level(path)
+        self.capacity = capacity
+        self._rooms = OrderedDict()
+        self._snapshots = {}
+        self._schedules = {}
+        self._free = {}
+        self._prefetching = {}
+        self._executor = None
+        if prefetch:
+            # The obstacles built in the background share these sprites.
+            for colour in OBSTACLE_TYPES.values():
+                Obstacle.sprites_of(colour)
+            self._executor = ThreadPoolExecutor(max_workers=1)
 
-        # The connections between the rooms
-        # Each door in every room must be assigned to a room
-        # Directions must make sense; that is, if there is a western door in
-        # room1 that leads to room2, then room2 must have an eastern door.
-        room1.set_neighbors(east=room3, west=room2, north=None, south=None)
-        room2.set_neighbors(east=room1, west=None, north=None, south=None)
-        room3.set_neighbors(east=None, west=room1, north=None, south=None)
+        self.transition = None
 
         # The room in which the player will start.
-        self.current_room = room1
+        self._current = self.level.start
+        self.current_room = self.get_room(self._current)
 
-    def change_room(self, door_dir: str, player: Player, window:
-                    pygame.Surface) -> None:
+    def _build_layout(self, index: int) -> Room:
         """
-        Change the current room to the room that corresponds to the door
-        in direction <door_dir>. Run an animation that shifts the camera to
-        the next room.
+        Return a new room <index> without enemies, with its doors connected.
+        No surface is created and no timer is scheduled, so rooms can be laid
+        out in the background.
+        """
+        room = self.level.build_room(index, spawn=False)
+        links = self.level.neighbours(index)
+        room.set_neighbors(north=links.get('N'), south=links.get('S'),
+                           east=links.get('E'), west=links.get('W'))
 
-        == Preconditions ==
-        door_dir is 'N', 'S', 'E', or 'W'
-        The door must exist in the direction above for the current room.
+        return room
+
+    def _populate(self, index: int, room: Room) -> Room:
+        """
+        Add the enemies of room <index> to its layout <room>, and return it.
+        The enemies are restored from the state kept when the room was
+        evicted, if any, and spawned from the level otherwise. Either way,
+        the enemies released by evicted rooms are reused first.
+        """
+        room.share_free_list(self._free)
+        snapshot = self._snapshots.pop(index, None)
+        if snapshot is None:
+            snapshot = list(enumerate(self.level.spawn_states(index)))
+        room.restore_enemies(snapshot)
+        room.set_scheduler_state(self._schedules.pop(index, None))
+
+        return room
+
+    def get_room(self, index: int) -> Room:
+        """
+        Return room <index>, building it if it is not in memory.
+        """
+        if index in self._rooms:
+            self._rooms.move_to_end(index)
+            return self._rooms[index]
+
+        if index in self._prefetching:
+            room = self._prefetching.pop(index).result()
+        else:
+            room = self._build_layout(index)
+
+        self._add_room(index, room)
+        return room
+
+    def _add_room(self, index: int, room: Room) -> None:
+        """
+        Evict the least recently used rooms other than the current room
+        while there are too many to keep another, then add the enemies of
+        room <index> to its layout <room> and keep it in memory. Evicting
+        first lets the new room reuse the enemies of the evicted rooms.
+        """
+        for evicted in list(self._rooms):
+            if len(self._rooms) < self.capacity:
+                break
+            if evicted != self._current:
+                old = self._rooms.pop(evicted)
+                self._snapshots[evicted] = old.snapshot_enemies()
+                schedule = old.snapshot_scheduler()
+                if schedule is not None:
+                    self._schedules[evicted] = schedule
+                old.release_enemies()
+        self._rooms[index] = self._populate(index, room)
+
+    def current_index(self) -> int:
+        """
+        Return the index of the current room in the level.
+        """
+        return self._current
+
+    def _settle_prefetches(self) -> None:
+        """
+        Wait for every room being built in the background and keep it in
+        memory.
         """
-        next_room = self.current_room.door_to_room(door_dir)
+        for index, future in list(self._prefetching.items()):
+            del self._prefetching[index]
+            self._add_room(index, future.result())
 
-        # Animation
-        l_shifted = 0
-        # The rooms shift by 3 pixels every frame.
-        inc = 3.5
+    def enemy_states(self) -> dict[int: list[tuple[int, tuple]]]:
+        """
+        Return the state of the enemies of every room that has been built,
+        as returned by Room.snapshot_enemies, keyed by the index of the room.
+        The enemies of the rooms that are not included are as spawned.
+        """
+        self._settle_prefetches()
+        states = dict(self._snapshots)
+        for index, room in self._rooms.items():
+            states[index] = room.snapshot_enemies()
+
+        return states
+
+    def scheduler_states(self) -> dict[int: tuple]:
+        """
+        Return the state of the scheduler of every room that has been built,
+        as returned by Room.snapshot_scheduler, keyed by the index of the
+        room. The schedulers of the rooms that are not included start afresh.
+        """
+        self._settle_prefetches()
+        states = dict(self._schedules)
+        for index, room in self._rooms.items():
+            state = room.snapshot_scheduler()
+            if state is not None:
+                states[index] = state
 
-        while l_shifted < Room.ROOM_SIZE:
-            l_shifted += inc
+        return states
 
-            if door_dir == 'W':
-                next_room.draw_room(window, l_shifted - Room.ROOM_SIZE, 0,
-                                    player, True)
-                player.set_position((player.x_pos + inc, player.y_pos))
+    def restore(self, current: int,
+                states: dict[int: list[tuple[int, tuple]]],
+                schedules: Optional[dict] = None) -> None:
+        """
+        Make room <current> the current room, set the enemies of every room
+        to <states>, as returned by enemy_states, and set the scheduler of
+        every room to <schedules>, as returned by scheduler_states. Rooms in
+        memory keep their objects and surfaces, but lose their projectiles.
+        The enemies and schedulers of the other rooms are restored when the
+        rooms are built.
+
+        == Preconditions ==
+        No transition is in progress.
+        """
+        if schedules is None:
+            schedules = {}
+        self._settle_prefetches()
+        self._snapshots = {index: state for index, state in states.items()
+                           if index not in self._rooms}
+        self._schedules = {index: state for index, state in schedules.items()
+                           if index not in self._rooms}
+        for index, room in self._rooms.items():
+            if index in states:
+                room.set_enemy_states(states[index])
+            else:
+                room.set_enemy_states(list(enumerate(
+                    self.level.spawn_states(index))))
+            room.set_scheduler_state(schedules.get(index))
+            if room.projectiles is not None:
+                room.projectiles.clear()
 
-                self.current_room.draw_room(window, l_shifted, 0, player,
-                                            True)
+        self._current = current
+        self.current_room = self.get_room(current)
 
-            elif door_dir == 'E':
-                next_room.draw_room(window, Room.ROOM_SIZE - l_shifted, 0,
-                                    player, True)
-                player.set_position((player.x_pos - inc, player.y_pos))
+    def is_resident(self, index: int) -> bool:
+        """
+        Return whether room <index> is in memory.
+        """
+        return index in self._rooms
 
-                self.current_room.draw_room(window, -l_shifted, 0, player,
-                                            True)
+    def prefetch(self, player: Player) -> None:
+        """
+        Start building the room behind the door that <player> is approaching
+        in the background, if it is not already in memory. Rooms that have
+        finished building are kept in memory.
+        """
+        for index, future in list(self._prefetching.items()):
+            if future.done():
+                del self._prefetching[index]
+                self._add_room(index, future.result())
 
-            elif door_dir == 'N':
-                next_room.draw_room(window, 0, l_shifted - Room.ROOM_SIZE,
-                                    player, True)
+        if self._executor is None:
+            return
 
-                player.set_position((player.x_pos, player.y_pos + inc))
+        door_dir = self.current_room.near_door(player,
+                                               GameMap.PREFETCH_DISTANCE)
+        if door_dir is None:
+            return
 
-                self.current_room.draw_room(window, 0, l_shifted, player,
-                                            True)
+        index = self.current_room.door_to_room(door_dir)
+        if index is not None and index not in self._rooms and \
+                index not in self._prefetching:
+            self._prefetching[index] = self._executor.submit(
+                self._build_layout, index)
 
-            elif door_dir == 'S':
-                next_room.draw_room(window, 0, Room.ROOM_SIZE - l_shifted,
-                                    player, True)
+    def close(self) -> None:
+        """
+        Stop building rooms in the background. Rooms that are being built are
+        discarded, and rooms are only built on demand from then on.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self._prefetching.clear()
 
-                player.set_position((player.x_pos, player.y_pos - inc))
+    def change_room(self, door_dir: str, player: Player) -> None:
+        """
+        Begin changing the current room to the room that corresponds to the
+        door in direction <door_dir>. The animation that shifts the camera to
+        the next room is run by update_transition, and the current room
+        changes when it finishes.
 
-                self.current_room.draw_room(window, 0, -l_shifted, player,
-                                            True)
+        == Preconditions ==
+        door_dir is 'N', 'S', 'E', or 'W'
+        The door must exist in the direction above for the current room.
+        No transition is in progress.
+        """
+        next_index = self.current_room.door_to_room(door_dir)
+        self.transition = RoomTransition(self.current_room,
+                                         self.get_room(next_index),
+                                         next_index, door_dir, player)
 
-            pygame.display.update()
+    def update_transition(self, dt: float, player: Player) -> None:
+        """
+        Advance the transition in progress by <dt> milliseconds. When it
+        finishes, the room being moved to becomes the current room.
 
-        # Set the current room to the next room.
-        self.current_room = next_room
+        == Preconditions ==
+        A transition is in progress.
+        """
+        self.transition.advance(dt, player)
 
+        if self.transition.is_done():
+            # Set the current room to the next room.
+            self._current = self.transition.next_index
+            self.current_room = self.transition.next_room
+            self.transition = None
@@ -1,4 +1,4 @@
-from entity import Entity
+from entity import Entity, TAG_OBSTACLE
 from pygame import Surface
 
 
@@ -7,7 +7,16 @@ class Obstacle(Entity):
     Defines an obstacle in a room. An obstacle is of a fixed size and.
     is a square. Larger obstacles are to be created by adding
     identical obstacles to the room contiguously.
+
+    == Attributes ==
+    colour: The type of the obstacle. One of the colours below.
     """
+    __slots__ = ('colour',)
+
+    colour: tuple[int, int, int]
+
+    TAG = TAG_OBSTACLE
+
     # The size of a single obstacle
     SIZE = 30
 
@@ -16,6 +25,9 @@ class Obstacle(Entity):
     BOX = (150, 75, 0)
     PUDDLE = (0, 0, 255)
 
+    # The sprites shared by all obstacles of each colour.
+    _sprites: dict[tuple[int, int, int]: dict[str: Surface]] = {}
+
     def __init__(self, colour: tuple[int, int, int], x: float, y: float) \
             -> None:
         """
@@ -24,13 +36,19 @@ class Obstacle(Entity):
         == Preconditions ==
         x, y >= 0
         """
-        sprite = Surface((Obstacle.SIZE, Obstacle.SIZE))
-        sprite.fill(colour)
-        sprites = {'u': sprite, 'd': sprite, 'l': sprite, 'r': sprite}
-        super().__init__(x, y, sprites, 'u', 0)
+        super().__init__(x, y, Obstacle.sprites_of(colour), 'u', 0)
+        self.colour = colour
 
-    def react_collision(self, ent: 'Entity') -> None:
+    @staticmethod
+    def sprites_of(colour: tuple[int, int, int]) -> dict[str: Surface]:
         """
-        An obstacle does not react to any collisions.
+        Return the sprites shared by all obstacles of <colour>, drawing them
+        if no obstacle of <colour> has been made yet.
         """
-        pass
+        if colour not in Obstacle._sprites:
+            sprite = Surface((Obstacle.SIZE, Obstacle.SIZE))
+            sprite.fill(colour)
+            Obstacle._sprites[colour] = {'u': sprite, 'd': sprite, 'l': sprite,
+                                         'r': sprite}
+
+        return Obstacle._sprites[colour]
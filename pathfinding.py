@@ -0,0 +1,155 @@
+"""
+Contains the flow field that pursuing enemies use to find their way around
+the obstacles of a room towards the player.
+"""
+
+from collections import deque
+from typing import Callable, Optional
+
+from entity import Entity, get_opposite
+
+# The directions in which the flow field can point, in the order in which
+# they are tried, and the change in (column, row) of a step in each.
+STEPS = (('u', 0, -1), ('d', 0, 1), ('l', -1, 0), ('r', 1, 0))
+
+
+class FlowField:
+    """
+    A grid over a room in which every free cell points towards the
+    neighbouring cell on a shortest path to the cell of a target. The field
+    is only recomputed when the target moves to another cell or the
+    obstacles change, and every entity reads it in constant time.
+
+    == Attributes ==
+    cell_size: The width and height of a cell.
+    columns: The number of columns of cells.
+    rows: The number of rows of cells.
+
+    == Representation Invariants ==
+    cell_size > 0
+    """
+    # Private Attributes
+    # _get_colliders: Returns the obstacles of the room.
+    # _blocked: Whether each cell, indexed by row * columns + column, is
+    # overlapped by an obstacle. None if the obstacles have changed.
+    # _target: The cell of the target, as (column, row).
+    # _directions: The direction to move in from each cell, indexed like
+    # _blocked. None for the target cell and the cells that cannot reach it.
+    # None if the field has not been computed for _target.
+    cell_size: float
+    columns: int
+    rows: int
+    _get_colliders: Callable[[], list[Entity]]
+    _blocked: Optional[list[bool]]
+    _target: Optional[tuple[int, int]]
+    _directions: Optional[list[Optional[str]]]
+
+    def __init__(self, size: float, cell_size: float,
+                 get_colliders: Callable[[], list[Entity]]) -> None:
+        """
+        Initialize a flow field over a square room of width <size> divided
+        into cells of width <cell_size>. <get_colliders> returns the
+        obstacles of the room.
+        """
+        self._get_colliders = get_colliders
+        self.cell_size = cell_size
+        self.columns = self.rows = int(size // cell_size)
+        self._blocked = None
+        self._target = None
+        self._directions = None
+
+    def invalidate(self) -> None:
+        """
+        Recompute the field the next time it is used, because the obstacles
+        have changed.
+        """
+        self._blocked = None
+        self._directions = None
+
+    def cell_of(self, ent: Entity) -> tuple[int, int]:
+        """
+        Return the cell that contains the centre of <ent>, as
+        (column, row).
+        """
+        return (int((ent.x_pos + ent.size[0] / 2) // self.cell_size),
+                int((ent.y_pos + ent.size[1] / 2) // self.cell_size))
+
+    def set_target(self, target: Entity) -> None:
+        """
+        Make the field lead to <target>. Nothing is recomputed unless
+        <target> has moved to another cell.
+        """
+        cell = self.cell_of(target)
+        if cell != self._target:
+            self._target = cell
+            self._directions = None
+
+    def _block(self) -> None:
+        """
+        Mark every cell that overlaps an obstacle as blocked.
+        """
+        self._blocked = [False] * (self.columns * self.rows)
+        size = self.cell_size
+        for collider in self._get_colliders():
+            c1 = max(int(collider.x_pos // size), 0)
+            c2 = min(int(-(-(collider.x_pos + collider.size[0]) // size)),
+                     self.columns)
+            r1 = max(int(collider.y_pos // size), 0)
+            r2 = min(int(-(-(collider.y_pos + collider.size[1]) // size)),
+                     self.rows)
+            for r in range(r1, r2):
+                for c in range(c1, c2):
+                    self._blocked[r * self.columns + c] = True
+
+    def _compute(self) -> None:
+        """
+        Compute the direction of every cell with a breadth-first search from
+        the cell of the target.
+        """
+        self._directions = [None] * (self.columns * self.rows)
+        if self._target is None:
+            return
+
+        column, row = self._target
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            return
+
+        seen = [False] * (self.columns * self.rows)
+        seen[row * self.columns + column] = True
+        queue = deque([self._target])
+        while queue:
+            column, row = queue.popleft()
+            for direction, dc, dr in STEPS:
+                c, r = column + dc, row + dr
+                i = r * self.columns + c
+                if 0 <= c < self.columns and 0 <= r < self.rows and \
+                        not seen[i] and not self._blocked[i]:
+                    seen[i] = True
+                    # Moving from (c, r) against the step leads back here.
+                    self._directions[i] = get_opposite(direction)
+                    queue.append((c, r))
+
+    def directions(self) -> list[Optional[str]]:
+        """
+        Return the direction to move in from every cell, indexed by
+        row * columns + column, computing the field first if needed.
+        """
+        if self._blocked is None:
+            self._block()
+        if self._directions is None:
+            self._compute()
+
+        return self._directions
+
+    def direction(self, ent: Entity) -> Optional[str]:
+        """
+        Return the direction in which <ent> should move to get closer to the
+        target, or None if it is in the cell of the target or cannot reach
+        it.
+        """
+        column, row = self.cell_of(ent)
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            return None
+
+        return self.directions()[row * self.columns + column]
+
@@ -1,10 +1,17 @@
-from pygame import Surface
+from pygame import Rect, Surface
 import pygame
 from pygame.locals import *
-from entity import Entity
-from obstacle import Obstacle
+from entity import Entity, TAG_ENEMY, TAG_OBSTACLE, TAG_PLAYER, \
+    TAG_PROJECTILE, reacts_to
 from enemy import Enemy
+from spatial import SpatialHash
 from sword import Sword
+from typing import TYPE_CHECKING, Optional
+import timing
+from timing import Timer
+
+if TYPE_CHECKING:
+    from projectile import Projectile
 
 
 class Player(Entity):
@@ -17,20 +24,26 @@ class Player(Entity):
     hp: Number of health points the player has.
     max_hp: The maximum number of hp the player can have.
     sword: the sword of the player.
-    time: Stores various timers.
+    timers: The pending timer of each timed state of the player, 'ATK' and
+    'invulnerability'. None if the player is not in that state.
 
     == Representation Invariants ==
     hp >= 0
     """
+    __slots__ = ('attacking', 'hp', 'sword', 'timers', 'attacked', 'max_hp')
+
     attacking: bool
     hp: int
     sword: Sword
-    time: dict[str:float]
+    timers: dict[str: Optional[Timer]]
     attacked: bool
     max_hp: int
 
+    TAG = TAG_PLAYER
     SIZE = 30
     SPEED = 2.5  # standard movement speed.
+    ATTACK_TIME = 200  # ms
+    INVULNERABILITY_TIME = 1000  # ms
 
     def __init__(self, x: float, y: float, hp: int) -> None:
         """
@@ -42,22 +55,62 @@ class Player(Entity):
         self.hp = hp
         self.sword = Sword()
         self.attacking = False
-        self.time = {'ATK': 0.0, 'invulnerability': 0.0}
+        self.timers = {'ATK': None, 'invulnerability': None}
         from sprites import player_sprites
         super().__init__(x, y, player_sprites, 'u', 0)
 
-    def update(self) -> None:
+    def update(self, obstacles: Optional[SpatialHash] = None) -> None:
         """
-        Update the player's position and attack mode.
-        The player's attack mode should last only 0.2 seconds.
+        Update the player's position, stopping at the edge of the first
+        entity in <obstacles> in the way. The attack mode of the player is
+        ended by its timer.
+        """
+        self.sweep(obstacles)
+
+    def get_state(self) -> tuple:
+        """
+        Return the mutable state of the player and its sword as a tuple. The
+        timers are given as the number of milliseconds left on them.
+        """
+        return (self._x_pos, self._y_pos, self._direction, self.speed,
+                self.hp, self.attacked, self.attacking,
+                timing.remaining(self.timers['ATK']),
+                timing.remaining(self.timers['invulnerability']),
+                self.sword.level)
+
+    def set_state(self, state: tuple) -> None:
         """
+        Restore the mutable state of the player and its sword from <state>,
+        as returned by get_state.
+        """
+        x, y, self._direction, self.speed, self.hp, self.attacked, \
+            self.attacking, attack, invulnerable, self.sword.level = state
+        self.set_position((x, y))
+        self.update_sword_position()
+
+        for name in self.timers:
+            timing.cancel(self.timers[name])
+            self.timers[name] = None
         if self.attacking:
-            # Check if the time elapsed since the attack was initiated
-            # is surpassed. If yes the player stops attacking
-            if pygame.time.get_ticks() - self.time['ATK'] >= 200:
-                self.attacking = False
+            self.timers['ATK'] = timing.schedule(attack, self._end_attack)
+        if invulnerable > 0:
+            self.timers['invulnerability'] = timing.schedule(
+                invulnerable, self._end_invulnerability)
 
-        self.move()
+    def _end_attack(self) -> None:
+        """
+        Stop attacking, either because the attack has lasted ATTACK_TIME or
+        because the player has moved.
+        """
+        timing.cancel(self.timers['ATK'])
+        self.timers['ATK'] = None
+        self.attacking = False
+
+    def _end_invulnerability(self) -> None:
+        """
+        Make the player vulnerable again.
+        """
+        self.timers['invulnerability'] = None
 
     def is_struck(self, direction_atk: str, strength_atk: int) -> None:
         """
@@ -65,12 +118,13 @@ class Player(Entity):
         knocked back in the direction opposite to the direction in which
         it was attacked (<direction_atk>).
         """
-        if pygame.time.get_ticks() - self.time['invulnerability'] >= 1000:
+        if self.timers['invulnerability'] is None:
             self.hp -= strength_atk
             # self.attacked = True
             self.speed = 0  # When attacked the player should not move
             # voluntarily.
-            self.time['invulnerability'] = pygame.time.get_ticks()
+            self.timers['invulnerability'] = timing.schedule(
+                Player.INVULNERABILITY_TIME, self._end_invulnerability)
 
     def _set_direction(self, event: pygame.event) -> None:
         """
@@ -83,19 +137,19 @@ class Player(Entity):
                 if event.key == K_RIGHT:
                     self._direction = 'r'
                     self.speed = Player.SPEED
-                    self.attacking = False
+                    self._end_attack()
                 elif event.key == K_LEFT:
                     self._direction = 'l'
                     self.speed = Player.SPEED
-                    self.attacking = False
+                    self._end_attack()
                 elif event.key == K_UP:
                     self._direction = 'u'
                     self.speed = Player.SPEED
-                    self.attacking = False
+                    self._end_attack()
                 elif event.key == K_DOWN:
                     self._direction = 'd'
                     self.speed = Player.SPEED
-                    self.attacking = False
+                    self._end_attack()
             if event.type == KEYUP:
                 if event.key == K_RIGHT:
                     if self._direction == 'r':
@@ -119,7 +173,8 @@ class Player(Entity):
             if event.key == K_SPACE:
                 if not self.attacking:
                     self.attacking = True
-                    self.time['ATK'] = pygame.time.get_ticks()
+                    self.timers['ATK'] = timing.schedule(Player.ATTACK_TIME,
+                                                         self._end_attack)
 
     def handle_events(self, event: pygame.event) -> None:
         """
@@ -128,21 +183,26 @@ class Player(Entity):
         self._set_attack(event)
         self._set_direction(event)
 
-    def react_collision(self, ent: 'Entity') -> None:
+    @reacts_to(TAG_OBSTACLE)
+    def _hit_obstacle(self, obstacle: Entity) -> None:
+        """
+        Stop at the edge of <obstacle>.
+        """
+        self.back_off(obstacle)
+
+    @reacts_to(TAG_ENEMY)
+    def _hit_enemy(self, enemy: Enemy) -> None:
         """
-        React to a collision with <ent>.
+        Be struck by <enemy>.
         """
-        if isinstance(ent, Obstacle):
-            if self._direction == 'u':
-                self.move(- (ent._y_pos + ent.size[1]) + self._y_pos)
-            elif self._direction == 'd':
-                self.move(-(self._y_pos + self.size[1]) + ent._y_pos)
-            elif self._direction == 'l':
-                self.move(- (ent._x_pos + ent.size[0]) + self._x_pos)
-            else:  # self.direction == 'r':
-                self.move(-(self._x_pos + self.size[0]) + ent._x_pos)
-        elif isinstance(ent, Enemy):
-            self.is_struck(ent._direction, ent.strength)
+        self.is_struck(enemy._direction, enemy.strength)
+
+    @reacts_to(TAG_PROJECTILE)
+    def _hit_projectile(self, projectile: 'Projectile') -> None:
+        """
+        Be struck by <projectile>.
+        """
+        self.is_struck(projectile.direction, projectile.strength)
 
     def update_sword_position(self) -> None:
         """
@@ -160,16 +220,24 @@ class Player(Entity):
         else:  # self.direction == 'l'
             self.sword.set_position((self._x_pos - 20, self._y_pos + 10))
 
-    def draw(self, surf: Surface) -> None:
+    def draw(self, surf: Surface) -> Rect:
+        """
+        Blit player_sprite to surf. Return the area of <surf> that was drawn
+        to, including the sword.
+        """
+        rects = surf.blits(self.blit_items())
+        return rects[0].unionall(rects[1:])
+
+    def blit_items(self) -> list[tuple[Surface, tuple[float, float]]]:
         """
-        Blit player_sprite to surf.
+        Return the items of the sequence given to Surface.blits that draw
+        the player, and its sword if it is attacking. The sword is drawn
+        under the player when the player faces up.
         """
         self.update_sword_position()
+        item = self.sprite[self._direction], (self._x_pos, self._y_pos)
+        if not self.attacking:
+            return [item]
         if self._direction == 'u':
-            if self.attacking:
-                self.sword.draw(surf)
-            surf.blit(self.sprite['u'], (self._x_pos, self._y_pos))
-        else:
-            surf.blit(self.sprite[self._direction], (self._x_pos, self._y_pos))
-            if self.attacking:
-                self.sword.draw(surf)
+            return [self.sword.blit_item(), item]
+        return [item, self.sword.blit_item()]
@@ -0,0 +1,250 @@
+"""
+Contains the frame profiler of Block Adventure. The profiler times each
+phase of every frame of the main loop and keeps the samples of the last
+frames in a ring buffer of fixed size, so that frame-time distributions
+can be inspected while playing, in an overlay, and exported afterwards.
+
+The phases are timed where they happen, with
+    with profiler.phase(name):
+        ...
+which costs next to nothing when no profiler is active.
+"""
+
+import contextlib
+import csv
+import json
+import time
+from typing import Optional
+
+import pygame
+
+# The phases of a frame, in the order in which they happen.
+PHASES = ('timers', 'rooms', 'player', 'collisions', 'enemies',
+          'projectiles', 'deaths', 'blits', 'display', 'events')
+
+# The columns of a sample: the time since the start of the previous frame,
+# and the time spent in each phase. All times are in milliseconds.
+COLUMNS = ('frame',) + PHASES
+
+# The percentiles shown in the overlay.
+PERCENTILES = (50, 90, 99)
+
+
+class _Phase:
+    """
+    Times a phase of a frame when used as a context manager.
+    """
+    __slots__ = ('_times', '_column', '_start')
+
+    def __init__(self, times: list[float], column: int) -> None:
+        self._times = times
+        self._column = column
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self._times[self._column] += 1000 * (time.perf_counter() -
+                                             self._start)
+
+
+class Profiler:
+    """
+    Keeps the time spent in each phase of the last <capacity> frames.
+
+    == Attributes ==
+    capacity: The number of frames kept.
+    frames: The number of frames recorded so far, including the ones that
+    are no longer kept.
+    overlay: Whether the overlay is shown.
+
+    == Representation Invariants ==
+    capacity > 0
+    """
+    # Private Attributes
+    # _samples: The ring buffer of samples, one row of COLUMNS per frame.
+    # _current: The times of the frame being recorded.
+    # _totals: The sums of the times of every frame recorded so far.
+    # _frame_start: The value of time.perf_counter() at the start of the
+    # frame being recorded. None if no frame has been started.
+    # _phases: The context manager of each phase.
+    # _font: The font of the overlay. None until the overlay is first drawn.
+    # _panel: The last rendered overlay and the value of frames when it was
+    # rendered. None if the overlay has not been rendered.
+    capacity: int
+    frames: int
+    overlay: bool
+    _samples: list[list[float]]
+    _current: list[float]
+    _totals: list[float]
+    _frame_start: Optional[float]
+    _phases: dict[str: _Phase]
+    _font: Optional[pygame.font.Font]
+    _panel: Optional[tuple[pygame.Surface, int]]
+
+    # The number of frames between two renderings of the overlay.
+    OVERLAY_PERIOD = 15
+    OVERLAY_COLOUR = (255, 255, 0)
+    OVERLAY_BACKGROUND = (0, 0, 0)
+
+    def __init__(self, capacity: int = 600) -> None:
+        """
+        Initialize a profiler that keeps the last <capacity> frames.
+
+        == Preconditions ==
+        capacity > 0
+        """
+        self.capacity = capacity
+        self.frames = 0
+        self.overlay = False
+        self._samples = [[0.0] * len(COLUMNS) for _ in range(capacity)]
+        self._current = [0.0] * len(COLUMNS)
+        self._totals = [0.0] * len(COLUMNS)
+        self._frame_start = None
+        self._phases = {name: _Phase(self._current, i)
+                        for i, name in enumerate(COLUMNS) if i > 0}
+        self._font = None
+        self._panel = None
+
+    def begin_frame(self) -> None:
+        """
+        Record the frame in progress, if any, and start a new one.
+        """
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self._current[0] = 1000 * (now - self._frame_start)
+            self._samples[self.frames % self.capacity][:] = self._current
+            self.frames += 1
+            for i in range(len(self._current)):
+                self._totals[i] += self._current[i]
+                self._current[i] = 0.0
+        self._frame_start = now
+
+    def phase(self, name: str) -> _Phase:
+        """
+        Return a context manager that adds the time spent in it to the phase
+        <name> of the current frame.
+
+        == Preconditions ==
+        name in PHASES
+        """
+        return self._phases[name]
+
+    def totals(self) -> dict[str: float]:
+        """
+        Return the total time in milliseconds spent in each phase over every
+        frame recorded so far, including the frame in progress.
+        """
+        return {name: self._totals[i] + self._current[i]
+                for i, name in enumerate(COLUMNS) if i > 0}
+
+    def samples(self) -> list[list[float]]:
+        """
+        Return the samples kept, from the oldest to the newest.
+        """
+        if self.frames <= self.capacity:
+            return [row[:] for row in self._samples[:self.frames]]
+        start = self.frames % self.capacity
+        return [row[:] for row in self._samples[start:] +
+                self._samples[:start]]
+
+    def percentiles(self, column: str,
+                    percents: tuple[int, ...] = PERCENTILES) -> list[float]:
+        """
+        Return the given <percents> percentiles of the times in <column> over
+        the samples kept, by the nearest-rank method. Return zeros if no
+        frame has been recorded.
+        """
+        i = COLUMNS.index(column)
+        values = sorted(row[i] for row in
+                        self._samples[:min(self.frames, self.capacity)])
+        if not values:
+            return [0.0 for _ in percents]
+
+        return [values[max(0, -(-p * len(values) // 100) - 1)]
+                for p in percents]
+
+    def export(self, path: str) -> None:
+        """
+        Write the samples kept to the file at <path>, as JSON if its name
+        ends in .json and as CSV otherwise.
+        """
+        samples = self.samples()
+        with open(path, 'w', newline='') as f:
+            if path.endswith('.json'):
+                json.dump({'columns': list(COLUMNS), 'samples': samples}, f)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(COLUMNS)
+                writer.writerows([round(t, 4) for t in row]
+                                 for row in samples)
+
+    def _render_panel(self) -> pygame.Surface:
+        """
+        Return the overlay rendered from the samples kept: the percentiles
+        of the frame time and of every phase.
+        """
+        if self._font is None:
+            self._font = pygame.font.SysFont('couriernew', 12)
+
+        header = 'ms          ' + ''.join(f'p{p:<7}' for p in PERCENTILES)
+        lines = [header] + [
+            f'{column:<12}' + ''.join(f'{t:<8.2f}' for t in
+                                      self.percentiles(column))
+            for column in COLUMNS]
+        rendered = [self._font.render(line, True, Profiler.OVERLAY_COLOUR,
+                                      Profiler.OVERLAY_BACKGROUND)
+                    for line in lines]
+
+        height = self._font.get_linesize()
+        panel = pygame.Surface((max(r.get_width() for r in rendered) + 8,
+                                height * len(rendered) + 8))
+        panel.fill(Profiler.OVERLAY_BACKGROUND)
+        for i, r in enumerate(rendered):
+            panel.blit(r, (4, 4 + i * height))
+
+        return panel
+
+    def draw_overlay(self, surf: pygame.Surface) -> Optional[pygame.Rect]:
+        """
+        Draw the overlay to the top left corner of <surf> if it is shown,
+        and return the area drawn to, or None. The overlay is only rendered
+        again every OVERLAY_PERIOD frames.
+        """
+        if not self.overlay:
+            return None
+        if self._panel is None or \
+                self.frames - self._panel[1] >= Profiler.OVERLAY_PERIOD:
+            self._panel = (self._render_panel(), self.frames)
+
+        return surf.blit(self._panel[0], (0, 0))
+
+
+# The profiler that phases are timed with. None if phases are not timed.
+_profiler: Optional[Profiler] = None
+
+# The context manager returned for every phase when no profiler is active.
+_UNTIMED = contextlib.nullcontext()
+
+
+def set_profiler(profiler: Optional[Profiler]) -> None:
+    """
+    Time the phases of every frame with <profiler>. If <profiler> is None,
+    phases are not timed.
+    """
+    global _profiler
+    _profiler = profiler
+
+
+def phase(name: str):
+    """
+    Return a context manager that times the phase <name> of the current
+    frame with the active profiler, if any.
+
+    == Preconditions ==
+    name in PHASES
+    """
+    if _profiler is None:
+        return _UNTIMED
+    return _profiler.phase(name)
@@ -0,0 +1,225 @@
+"""
+Contains the projectiles of Block Adventure. Projectiles are short-lived,
+so they are not Entities. The projectiles of a room live in a pool of
+preallocated arrays, and are moved and checked for collisions all at once.
+A projectile disappears when it touches an obstacle or the player, or
+leaves the room. NumPy is required to use a pool.
+"""
+
+import pygame
+
+from entity import Entity, TAG_PROJECTILE
+from sprites import PROJECTILE_SIZE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Projectile:
+    """
+    A handle to the projectile in a slot of a pool, given to the entities
+    that the projectile hits. A handle is only valid until the projectiles
+    of its pool next move.
+
+    == Attributes ==
+    slot: The slot of the projectile in its pool.
+    """
+    __slots__ = ('_pool', 'slot')
+
+    _pool: 'ProjectilePool'
+    slot: int
+
+    TAG = TAG_PROJECTILE
+
+    def __init__(self, pool: 'ProjectilePool', slot: int) -> None:
+        self._pool = pool
+        self.slot = slot
+
+    @property
+    def strength(self) -> int:
+        """
+        The damage that the projectile deals.
+        """
+        return self._pool.strength[self.slot].item()
+
+    @property
+    def direction(self) -> str:
+        """
+        The direction that the projectile travels in most, as 'u', 'd', 'l'
+        or 'r'.
+        """
+        vx = self._pool.vx[self.slot].item()
+        vy = self._pool.vy[self.slot].item()
+        if abs(vx) > abs(vy):
+            return 'r' if vx > 0 else 'l'
+        return 'd' if vy > 0 else 'u'
+
+
+class ProjectilePool:
+    """
+    A fixed number of projectile slots, kept in NumPy arrays. The live
+    projectiles are packed into the first <size> slots, so spawning and
+    despawning a projectile only copies a few numbers.
+
+    == Attributes ==
+    capacity: The number of slots in the pool.
+    size: The number of live projectiles.
+    bounds: The area that projectiles disappear outside of.
+    x, y: The position of the top left corner of each projectile.
+    vx, vy: The velocity of each projectile, in units per frame.
+    strength: The damage that each projectile deals.
+    projectiles: The handle of every slot.
+
+    == Representation Invariants ==
+    0 <= size <= capacity
+    Only the first <size> entries of each array are in use.
+    The speed of every projectile is less than Obstacle.SIZE, so that it
+    cannot pass through an obstacle within a frame.
+    """
+    # Private Attributes
+    # _sprite: The sprite shared by all the projectiles.
+    # _moved: Scratch space for the distance moved along an axis.
+    # _hits: Scratch space for whether each projectile hit something.
+    capacity: int
+    size: int
+    bounds: pygame.Rect
+    projectiles: list[Projectile]
+    _sprite: pygame.Surface
+
+    def __init__(self, capacity: int, bounds: pygame.Rect) -> None:
+        """
+        Initialize an empty pool of <capacity> projectiles that disappear
+        outside of <bounds>.
+
+        == Preconditions ==
+        capacity > 0
+        """
+        if np is None:
+            raise ImportError('NumPy is required to use a ProjectilePool')
+
+        self.capacity = capacity
+        self.size = 0
+        self.bounds = bounds
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.strength = np.zeros(capacity, dtype=np.int16)
+        self.projectiles = [Projectile(self, slot) for slot in range(capacity)]
+        self._moved = np.zeros(capacity)
+        self._hits = np.zeros(capacity, dtype=bool)
+
+        from sprites import projectile_sprite
+        self._sprite = projectile_sprite
+
+    def spawn(self, x: float, y: float, vx: float, vy: float,
+              strength: int = 1) -> bool:
+        """
+        Spawn a projectile at (<x>, <y>) that moves by (<vx>, <vy>) on every
+        frame and deals <strength> damage. Return False, and spawn nothing,
+        if the pool is full.
+        """
+        if self.size == self.capacity:
+            return False
+
+        slot = self.size
+        self.x[slot], self.y[slot] = x, y
+        self.vx[slot], self.vy[slot] = vx, vy
+        self.strength[slot] = strength
+        self.size += 1
+
+        return True
+
+    def despawn(self, slot: int) -> None:
+        """
+        Remove the projectile in <slot>. The last live projectile is moved
+        into its slot.
+
+        == Preconditions ==
+        0 <= slot < size
+        """
+        last = self.size - 1
+        if slot != last:
+            self.x[slot], self.y[slot] = self.x[last], self.y[last]
+            self.vx[slot], self.vy[slot] = self.vx[last], self.vy[last]
+            self.strength[slot] = self.strength[last]
+        self.size = last
+
+    def clear(self) -> None:
+        """
+        Remove every projectile.
+        """
+        self.size = 0
+
+    def hit_boxes(self) -> 'np.ndarray':
+        """
+        Return the hit box of every live projectile, in the format returned
+        by Entity.hit_box_array.
+        """
+        n = self.size
+        return np.column_stack((self.x[:n], self.y[:n],
+                                np.full(n, PROJECTILE_SIZE),
+                                np.full(n, PROJECTILE_SIZE)))
+
+    def update(self, boxes: 'np.ndarray', player: Entity,
+               scale: float = 1) -> None:
+        """
+        Move every projectile by its velocity, scaled by <scale>. Then remove
+        the projectiles that left the bounds of the pool or touch one of the
+        hit boxes <boxes>, as returned by Entity.hit_box_array, and make
+        <player> react to the projectiles that touch it before removing them.
+        """
+        n = self.size
+        if n == 0:
+            return
+
+        moved = self._moved[:n]
+        np.multiply(self.vx[:n], scale, out=moved)
+        self.x[:n] += moved
+        np.multiply(self.vy[:n], scale, out=moved)
+        self.y[:n] += moved
+
+        x, y = self.x[:n], self.y[:n]
+        hits = self._hits[:n]
+        bounds = self.bounds
+        np.logical_or(x + PROJECTILE_SIZE <= bounds.left,
+                      x >= bounds.right, out=hits)
+        hits |= y + PROJECTILE_SIZE <= bounds.top
+        hits |= y >= bounds.bottom
+
+        projectile_boxes = self.hit_boxes()
+        if len(boxes):
+            hits |= Entity.overlaps(projectile_boxes, boxes).any(axis=1)
+
+        struck = Entity.overlaps(projectile_boxes,
+                                 Entity.hit_box_array([player]))[:, 0]
+        for slot in np.nonzero(struck & ~hits)[0].tolist():
+            player.react_collision(self.projectiles[slot])
+        hits |= struck
+
+        # Despawning from the end keeps the slots still to be despawned in
+        # place.
+        for slot in reversed(np.nonzero(hits)[0].tolist()):
+            self.despawn(slot)
+
+    def blit_items(self, viewport: pygame.Rect) \
+            -> list[tuple[pygame.Surface, tuple[float, float]]]:
+        """
+        Return the sprite and position of every live projectile, as items of
+        the sequence given to Surface.blits. Projectiles never leave the
+        bounds of the pool, so none are culled against <viewport> unless the
+        bounds extend past it.
+        """
+        n = self.size
+        sprite = self._sprite
+        x, y = self.x[:n], self.y[:n]
+        if not viewport.contains(self.bounds):
+            visible = (x < viewport.right) & (y < viewport.bottom) & \
+                (x + PROJECTILE_SIZE > viewport.left) & \
+                (y + PROJECTILE_SIZE > viewport.top)
+            x, y = x[visible], y[visible]
+
+        return [(sprite, position)
+                for position in zip(x.tolist(), y.tolist())]
@@ -0,0 +1,88 @@
+from typing import Optional
+from hud import HUD
+from player import Player
+from room import Room
+import profiler
+import pygame
+
+
+class DirtyRectRenderer:
+    """
+    Draws the current room, its entities and the HUD to the window, but only
+    updates the parts of the window that changed since the last frame. The
+    HUD is only updated when it reports that it was redrawn, or when the
+    whole window is redrawn.
+    The static layer of the room is restored under the areas where entities
+    were drawn on the last frame before the entities are drawn again.
+
+    == Attributes ==
+    hud_rect: The area of the window covered by the HUD.
+    viewport: The area of the window covered by the room. Entities are
+    clipped to it.
+    """
+    # Private Attributes
+    # _previous: The areas of the window that entities were drawn to on the
+    # last frame.
+    # _background: The room and the version of its static layer that the
+    # window was last fully drawn with. None if the window must be fully
+    # redrawn on the next frame.
+    hud_rect: pygame.Rect
+    viewport: pygame.Rect
+    _previous: list[pygame.Rect]
+    _background: Optional[tuple[Room, int]]
+
+    def __init__(self, hud_rect: pygame.Rect) -> None:
+        """
+        Initialize a renderer for a window with a HUD in <hud_rect>.
+        """
+        self.hud_rect = hud_rect
+        self.viewport = pygame.Rect(0, 0, Room.ROOM_SIZE, Room.ROOM_SIZE)
+        self._previous = []
+        self._background = None
+
+    def invalidate(self) -> None:
+        """
+        Redraw the whole window, including the HUD, on the next frame. This
+        must be called when something other than this renderer draws to the
+        window.
+        """
+        self._background = None
+
+    def render(self, window: pygame.Surface, room: Room, player: Player,
+               hud: HUD) -> None:
+        """
+        Draw <room>, its enemies, <player> and <hud> to <window>, and update
+        the parts of the display that changed.
+
+        == Preconditions ==
+        The top left corner of <room> is at (0, 0) in <window>.
+        """
+        with profiler.phase('blits'):
+            layer = room.get_static_layer()
+            full = self._background != (room, room.static_version)
+
+            if full:
+                window.blit(layer, (0, 0))
+                # The HUD may have been drawn over since it was last drawn.
+                hud.invalidate()
+            else:
+                window.blits([(layer, rect, rect)
+                              for rect in self._previous], False)
+
+            # Entities sticking out of the room are cut off, so that they
+            # never draw over the HUD, and so that the static layer can be
+            # restored under everything they drew.
+            clip = window.get_clip()
+            window.set_clip(self.viewport)
+            drawn = window.blits(room.blit_items(player, self.viewport))
+            window.set_clip(clip)
+            hud_drawn = hud.draw(window)
+
+        with profiler.phase('display'):
+            if full:
+                pygame.display.update()
+                self._background = (room, room.static_version)
+            else:
+                pygame.display.update(self._previous + drawn +
+                                      ([self.hud_rect] if hud_drawn else []))
+        self._previous = drawn
@@ -0,0 +1,375 @@
+"""
+Records the input of a game of Block Adventure and replays it headlessly.
+
+Usage: python replay.py FILE [--profile]
+
+A recording holds everything needed to play a session again exactly: the
+level file and its digest, the random seed, the position and hp of the
+player at the start, the duration of every tick and every key press and
+release. It also holds a checksum of the state the session ended in, so
+that a replay that plays out differently is detected. It is stored in a
+binary file of the form
+    header, level path, level digest, checksum, tick durations, events
+where the header is _HEADER, the level path is a length and UTF-8 bytes,
+relative to this directory if it is inside it, and the digest is the first
+_DIGEST_SIZE bytes of the SHA-1 of the level file. The checksum is the
+first _DIGEST_SIZE bytes of the SHA-1 of a snapshot of the final state, and
+is only present if the header says so. The duration of every tick is a
+varint number of milliseconds. Every event is a varint number of ticks
+since the previous event, its type (an index into EVENT_TYPES) and its key
+as a varint.
+
+A varint stores an unsigned integer in 7-bit groups, least significant
+group first, with the top bit of every byte but the last set. Most ticks and
+most gaps between events fit in a single byte.
+
+Replays run as fast as the CPU allows, so a recorded session can be used
+to compare the cost of each phase of a tick across builds.
+"""
+
+import argparse
+import cProfile
+import hashlib
+import os
+import pstats
+import random
+import struct
+import time
+from typing import Optional
+
+import pygame
+from pygame.locals import *
+
+import snapshot
+from headless import Simulation
+from level import DEFAULT_LEVEL
+from map import GameMap
+from player import Player
+
+# The version of the recording format.
+FORMAT_VERSION = 2
+
+# The layout of the header: magic, version, seed, number of ticks, number of
+# events, position of the player, hp of the player and whether the recording
+# has a checksum.
+_HEADER = struct.Struct('<4sHqIIffH?')
+_MAGIC = b'BARP'
+_LENGTH = struct.Struct('<H')
+_DIGEST_SIZE = 8
+
+# The types of event that are recorded.
+EVENT_TYPES = (KEYDOWN, KEYUP)
+
+# The directory that relative level paths are stored relative to.
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class ReplayError(Exception):
+    """
+    Raised when a recording is invalid or cannot be replayed.
+    """
+    pass
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """
+    Append the unsigned integer <value> to <out> as a varint.
+
+    == Preconditions ==
+    value >= 0
+    """
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    """
+    Return the varint at <offset> in <data> and the offset that follows it.
+    Raise ReplayError if <data> ends in the middle of it.
+    """
+    value = shift = 0
+    while True:
+        if offset >= len(data):
+            raise ReplayError('truncated recording')
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def level_digest(path: str) -> bytes:
+    """
+    Return the digest of the level file at <path> stored in recordings.
+    """
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).digest()[:_DIGEST_SIZE]
+
+
+def state_checksum(game_map: GameMap, player: Player) -> bytes:
+    """
+    Return the checksum stored in recordings of the state of the game played
+    on <game_map> by <player>.
+    Raise snapshot.SnapshotError if a transition is in progress.
+    """
+    digest = hashlib.sha1(snapshot.save(game_map, player)).digest()
+    return digest[:_DIGEST_SIZE]
+
+
+class Recording:
+    """
+    The input of a session of Block Adventure, tick by tick.
+
+    == Attributes ==
+    level: The path of the level file that was played.
+    seed: The seed of the random number generator.
+    start: The position and hp of the player at the start.
+    durations: The number of milliseconds that each tick lasted.
+    events: The key events as (tick, type, key) tuples, in the order in
+    which they were handled.
+    checksum: The checksum of the state that the session ended in, as
+    returned by state_checksum. None if it is unknown.
+
+    == Representation Invariants ==
+    The ticks of events are non-decreasing and less than len(durations).
+    """
+    # Private Attributes
+    # _digest: The digest of the level file when it was recorded.
+    level: str
+    seed: int
+    start: tuple[float, float, int]
+    durations: list[int]
+    events: list[tuple[int, int, int]]
+    checksum: Optional[bytes]
+    _digest: bytes
+
+    def __init__(self, level: str = DEFAULT_LEVEL, seed: int = 0,
+                 start: tuple[float, float, int] = Simulation.START) -> None:
+        """
+        Initialize an empty recording of a session on the level file at
+        <level>, with the random seed <seed> and the player starting with
+        the position and hp in <start>.
+        """
+        self.level = level
+        self.seed = seed
+        self.start = start
+        self.durations = []
+        self.events = []
+        self.checksum = None
+        self._digest = level_digest(level)
+
+    def record_tick(self, dt: int) -> None:
+        """
+        Start recording a tick that lasts <dt> milliseconds.
+        """
+        self.durations.append(dt)
+
+    def record_event(self, event: pygame.event.Event) -> None:
+        """
+        Record <event> as handled on the current tick, if it is a key event.
+
+        == Preconditions ==
+        record_tick has been called at least once.
+        """
+        if event.type in EVENT_TYPES:
+            self.events.append((len(self.durations) - 1, event.type,
+                                event.key))
+
+    def finish(self, game_map: GameMap, player: Player) -> None:
+        """
+        Record the checksum of the state of the game played on <game_map> by
+        <player> at the end of the session. No checksum is recorded if a
+        transition is in progress.
+
+        == Preconditions ==
+        The last recorded tick has been played through to its end.
+        """
+        try:
+            self.checksum = state_checksum(game_map, player)
+        except snapshot.SnapshotError:
+            self.checksum = None
+
+    def script(self) -> dict[int: list[pygame.event.Event]]:
+        """
+        Return the recorded events as a script for a Simulation.
+        """
+        script = {}
+        for tick, type_event, key in self.events:
+            script.setdefault(tick, []).append(
+                pygame.event.Event(type_event, key=key))
+
+        return script
+
+    def to_bytes(self) -> bytes:
+        """
+        Return the recording in the binary recording format.
+        """
+        out = bytearray(_HEADER.pack(_MAGIC, FORMAT_VERSION, self.seed,
+                                     len(self.durations), len(self.events),
+                                     *self.start, self.checksum is not None))
+        level = os.path.abspath(self.level)
+        if os.path.commonpath([level, _ROOT]) == _ROOT:
+            level = os.path.relpath(level, _ROOT)
+        encoded = level.encode()
+        out += _LENGTH.pack(len(encoded)) + encoded + self._digest
+        if self.checksum is not None:
+            out += self.checksum
+
+        for dt in self.durations:
+            _write_varint(out, dt)
+        previous = 0
+        for tick, type_event, key in self.events:
+            _write_varint(out, tick - previous)
+            out.append(EVENT_TYPES.index(type_event))
+            _write_varint(out, key)
+            previous = tick
+
+        return bytes(out)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> 'Recording':
+        """
+        Return the recording stored in <data> in the binary recording format.
+        Raise ReplayError if <data> is not a valid recording.
+        """
+        if len(data) < _HEADER.size + _LENGTH.size:
+            raise ReplayError('truncated recording')
+        magic, version, seed, ticks, count, x, y, hp, checked = \
+            _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != FORMAT_VERSION:
+            raise ReplayError('not a recording of this version of the game')
+
+        offset = _HEADER.size
+        length = _LENGTH.unpack_from(data, offset)[0]
+        offset += _LENGTH.size
+        end = offset + length + _DIGEST_SIZE * (2 if checked else 1)
+        if end > len(data):
+            raise ReplayError('truncated recording')
+        try:
+            level = data[offset:offset + length].decode()
+        except UnicodeDecodeError:
+            raise ReplayError('invalid level path in recording')
+        offset += length
+        digest = data[offset:offset + _DIGEST_SIZE]
+        offset += _DIGEST_SIZE
+        checksum = None
+        if checked:
+            checksum = data[offset:offset + _DIGEST_SIZE]
+            offset += _DIGEST_SIZE
+
+        recording = object.__new__(Recording)
+        recording.level = os.path.join(_ROOT, level)
+        recording.seed = seed
+        recording.start = (x, y, hp)
+        recording.checksum = checksum
+        recording._digest = digest
+        recording.durations = []
+        recording.events = []
+        for _ in range(ticks):
+            dt, offset = _read_varint(data, offset)
+            recording.durations.append(dt)
+        tick = 0
+        for _ in range(count):
+            gap, offset = _read_varint(data, offset)
+            if offset >= len(data) or data[offset] >= len(EVENT_TYPES):
+                raise ReplayError('invalid event in recording')
+            type_event = EVENT_TYPES[data[offset]]
+            key, offset = _read_varint(data, offset + 1)
+            tick += gap
+            recording.events.append((tick, type_event, key))
+
+        return recording
+
+    def save(self, path: str) -> None:
+        """
+        Write the recording to the file at <path>.
+        """
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @staticmethod
+    def load(path: str) -> 'Recording':
+        """
+        Return the recording in the file at <path>.
+        Raise ReplayError if the file is not a valid recording.
+        """
+        with open(path, 'rb') as f:
+            return Recording.from_bytes(f.read())
+
+    def check_level(self) -> None:
+        """
+        Raise ReplayError if the level file has changed since the session was
+        recorded, since the session would not play out the same way.
+        """
+        try:
+            digest = level_digest(self.level)
+        except OSError:
+            raise ReplayError(f'{self.level}: level file not found')
+        if digest != self._digest:
+            raise ReplayError(f'{self.level}: level file has changed since '
+                              f'the session was recorded')
+
+
+def play(recording: Recording) -> Simulation:
+    """
+    Return a simulation that has played <recording> through to its end.
+    Raise ReplayError if the level file has changed, or if the replay ends
+    in another state than the recorded session.
+    """
+    recording.check_level()
+    random.seed(recording.seed)
+    sim = Simulation(recording.script(), recording.level, recording.start)
+    try:
+        for dt in recording.durations:
+            sim.step(dt)
+        if recording.checksum is not None:
+            try:
+                checksum = state_checksum(sim.game_map, sim.player)
+            except snapshot.SnapshotError:
+                checksum = None
+            if checksum != recording.checksum:
+                raise ReplayError('the replay diverged from the recorded '
+                                  'session')
+    finally:
+        sim.close()
+
+    return sim
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Replay a recorded session of Block Adventure headlessly.')
+    parser.add_argument('file', help='the recording to replay')
+    parser.add_argument('--profile', action='store_true',
+                        help='run the replay under cProfile and print the '
+                             'most expensive functions')
+    args = parser.parse_args()
+
+    recording = Recording.load(args.file)
+    ticks = len(recording.durations)
+
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    sim = play(recording)
+    if profiler is not None:
+        profiler.disable()
+    elapsed = time.perf_counter() - start
+
+    print(f'ticks:          {ticks}')
+    print(f'recorded:       {sum(recording.durations) / 1000:.1f} s')
+    print(f'replayed:       {elapsed:.1f} s')
+    print(f'ticks/s:        {ticks / elapsed:.1f}')
+    for phase, total in sim.phase_time.items():
+        print(f'{phase + ":":<15} {1000 * total / max(ticks, 1):.3f} ms/tick')
+
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+
+
+if __name__ == '__main__':
+    main()
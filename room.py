@@ -1,7 +1,20 @@
 from typing import Optional
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional. Without it, rooms have no entity store and no
+    # projectiles, so the hit boxes of their obstacles are never batched.
+    np = None
 from enemy import *
 from player import Player
 from obstacle import Obstacle
+from colliders import Collider, merge_obstacles
+from spatial import SpatialHash
+from entity_store import EntityStore
+from pathfinding import FlowField
+from scheduler import LODScheduler
+from projectile import ProjectilePool
+import profiler
 import pygame
 
 
@@ -10,21 +23,69 @@ class Room:
     Defines a room in Block Adventure.
 
     == Attributes ==
-    sprite: The visual representation of the room
-    door: the doors in the room and the rooms to which they lead.
+    sprite: The visual representation of the room. The floor and the
+    obstacles are pre-rendered onto it and only re-rendered when the
+    obstacles change. None until the room is first drawn.
+    static_version: The number of times sprite has been rendered.
+    flow_field: The flow field that leads the Supervisors in the room to the
+    player.
+    scheduler: Decides how often each enemy in the room is updated. None if
+    every enemy is updated on every frame. Enemies in an entity store are
+    always updated together.
+    projectiles: The projectiles in the room. None if the room has never had
+    any projectiles.
+    door: the doors in the room and the indices of the rooms to which they
+    lead.
     obstacles: The obstacles in the room
     enemies: The enemies in the room
 
     == Representation Invariants ==
     The keys of door are 'N', 'S', 'E', and 'W'
     """
-    sprite: pygame.Surface
-    door: dict[str: list[bool, Optional['Room']]]
+    # Private Attributes
+    # _static_dirty: True iff the obstacles have changed since <sprite> was
+    # last rendered.
+    # _colliders: The merged collision geometry of the obstacles. None if
+    # the obstacles have changed since it was last compiled.
+    # _obstacle_grid: Spatial index of the colliders. The enemies of the
+    # room sweep through it, so it is refilled rather than replaced when the
+    # obstacles change.
+    # _grid_dirty: True iff the obstacles have changed since _obstacle_grid
+    # was last filled.
+    # _enemy_grid: Spatial index of the enemies, updated as they move. It is
+    # not used when the enemies are in an entity store.
+    # _obstacle_boxes: The hit boxes of the colliders as an array, swept by
+    # the enemies of the entity store. None if not computed since the
+    # obstacles last changed.
+    # _store: The array-backed store that holds the state of the enemies.
+    # None if each enemy holds its own state.
+    # _free: The enemies removed from the room, by kind, which are reused
+    # for the next enemies of their kind added with restore_enemies. At most
+    # FREE_CAPACITY enemies of each kind are kept. It may be shared with
+    # other rooms.
+    _static_dirty: bool
+    _colliders: Optional[list[Collider]]
+    _obstacle_grid: SpatialHash
+    _grid_dirty: bool
+    _enemy_grid: SpatialHash
+    _obstacle_boxes: Optional['np.ndarray']
+    _store: Optional[EntityStore]
+    _free: dict[str: list[Enemy]]
+    sprite: Optional[pygame.Surface]
+    static_version: int
+    flow_field: FlowField
+    scheduler: Optional[LODScheduler]
+    projectiles: Optional[ProjectilePool]
+    door: dict[str: list[bool, Optional[int]]]
     obstacles = list[Obstacle]
     enemies = list[Enemy]
 
     FLOOR_COLOUR = (152, 118, 84)
     ROOM_SIZE = 600
+    # The number of projectiles that can be in a room at once.
+    PROJECTILE_CAPACITY = 1024
+    # The number of removed enemies of each kind kept for reuse.
+    FREE_CAPACITY = 64
 
     # Door Coordinates; (x1, x2, y1, y2)
     N_DOOR = (270, 330, 0, 0)
@@ -50,10 +111,21 @@ class Room:
 
         self.obstacles = []
         self.enemies = []
-
-        self.sprite = pygame.Surface((Room.ROOM_SIZE, Room.ROOM_SIZE))
-        # Set floor colour
-        self.sprite.fill(Room.FLOOR_COLOUR)
+        self._colliders = None
+        self._obstacle_grid = SpatialHash(Obstacle.SIZE)
+        self._grid_dirty = True
+        self._enemy_grid = SpatialHash(Obstacle.SIZE)
+        self._obstacle_boxes = None
+        self._store = None
+        self._free = {}
+        self.flow_field = FlowField(Room.ROOM_SIZE, Obstacle.SIZE,
+                                    self.get_colliders)
+        self.scheduler = LODScheduler()
+        self.projectiles = None
+
+        self.sprite = None
+        self._static_dirty = True
+        self.static_version = 0
 
         # Add the walls
         # Add the northern wall.
@@ -88,26 +160,135 @@ class Room:
     def draw_room(self, surf: pygame.Surface, x: float, y: float,
                   player: Player, room_changing: bool) -> None:
         """
-        Draw the room.
+        Update the room and then draw it.
         If the room is changing, the player should not move and the enemies
         should not be drawn.
         """
-        for obstacle in self.obstacles:
-            obstacle.draw(self.sprite)
+        if not room_changing:
+            self.update(player)
 
-        self.handle_deaths()
+        with profiler.phase('deaths'):
+            self.handle_deaths()
 
-        surf.blit(self.sprite, (x, y))
+        with profiler.phase('blits'):
+            self.draw(surf, x, y, player, room_changing)
 
-        if not room_changing:
-            player.update()
+    def update(self, player: Player) -> None:
+        """
+        Advance the player and the enemies in the room by one frame and
+        handle any collisions between them.
+        """
+        with profiler.phase('player'):
+            player.update(self.get_obstacle_grid())
+        with profiler.phase('collisions'):
             self.handle_collisions(player)
+        with profiler.phase('enemies'):
+            self.update_enemies(player)
+        with profiler.phase('projectiles'):
+            self.update_projectiles(player)
 
+    def update_enemies(self, player: Player) -> None:
+        """
+        Update the state of every enemy in the room.
+        """
+        self.flow_field.set_target(player)
+        # The enemies sweep through the grid, so it must be up to date.
+        self.get_obstacle_grid()
+        if self._store is not None:
+            self._store.update((player.x_pos, player.y_pos), self.flow_field,
+                               self.get_colliders(),
+                               self._get_obstacle_boxes())
+        elif self.scheduler is not None:
+            self.scheduler.update(self.enemies, player)
+        else:
             for enemy in self.enemies:
                 enemy.update((player.x_pos, player.y_pos))
-                enemy.draw(surf)
 
-        player.draw(surf)
+    def update_projectiles(self, player: Player) -> None:
+        """
+        Move every projectile in the room, and remove the ones that hit an
+        obstacle or <player>. <player> is struck by the ones that hit it.
+        """
+        if self.projectiles is not None and self.projectiles.size:
+            self.projectiles.update(self._get_obstacle_boxes(), player)
+
+    def get_projectiles(self) -> ProjectilePool:
+        """
+        Return the pool of projectiles of the room, making it first if the
+        room has never had any projectiles.
+
+        == Preconditions ==
+        NumPy is installed.
+        """
+        if self.projectiles is None:
+            self.projectiles = ProjectilePool(
+                Room.PROJECTILE_CAPACITY,
+                pygame.Rect(0, 0, Room.ROOM_SIZE, Room.ROOM_SIZE))
+
+        return self.projectiles
+
+    def draw(self, surf: pygame.Surface, x: float, y: float,
+             player: Player, room_changing: bool) -> None:
+        """
+        Draw the room, its enemies and <player> to <surf> with the top left
+        corner of the room at (<x>, <y>).
+        If the room is changing, the enemies should not be drawn.
+        """
+        surf.blit(self.get_static_layer(), (x, y))
+
+        if room_changing:
+            surf.blits(player.blit_items(), False)
+        else:
+            surf.blits(self.blit_items(player, surf.get_rect()), False)
+
+    def blit_items(self, player: Player, viewport: pygame.Rect) \
+            -> list[tuple[pygame.Surface, tuple[float, float]]]:
+        """
+        Return the items of the sequence given to Surface.blits that draw
+        every enemy and projectile in the room that is at least partly
+        inside <viewport>, and then <player> and its sword.
+        """
+        if self._store is not None:
+            items = self._store.blit_items(viewport)
+        else:
+            left, top = viewport.left, viewport.top
+            right, bottom = viewport.right, viewport.bottom
+            items = []
+            for enemy in self.enemies:
+                x, y = enemy._x_pos, enemy._y_pos
+                if x < right and y < bottom and x + enemy.size[0] > left \
+                        and y + enemy.size[1] > top:
+                    items.append((enemy.sprite[enemy._direction], (x, y)))
+
+        if self.projectiles is not None:
+            items += self.projectiles.blit_items(viewport)
+        items += player.blit_items()
+        return items
+
+    def _render_static_layer(self) -> None:
+        """
+        Render the floor and every obstacle onto the sprite of the room.
+        """
+        if self.sprite is None:
+            self.sprite = pygame.Surface((Room.ROOM_SIZE, Room.ROOM_SIZE))
+
+        # Set floor colour
+        self.sprite.fill(Room.FLOOR_COLOUR)
+        for obstacle in self.obstacles:
+            obstacle.draw(self.sprite)
+
+        self._static_dirty = False
+        self.static_version += 1
+
+    def get_static_layer(self) -> pygame.Surface:
+        """
+        Return the floor and the obstacles of the room rendered onto a single
+        surface, rendering them first if the obstacles have changed.
+        """
+        if self._static_dirty:
+            self._render_static_layer()
+
+        return self.sprite
 
     def get_obstacles(self) -> list[Obstacle]:
         """
@@ -136,11 +317,189 @@ class Room:
                                                x + Obstacle.SIZE * i,
                                                y + Obstacle.SIZE * j))
 
+        self._obstacles_changed()
+
+    def remove_obstacle(self, obstacle: Obstacle) -> None:
+        """
+        Remove <obstacle> from the room.
+
+        == Preconditions ==
+        obstacle is in the room.
+        """
+        self.obstacles.remove(obstacle)
+        self._obstacles_changed()
+
     def add_enemy(self, enemy: Enemy) -> None:
         """
         Add an enemy to the room
         """
-        self.enemies.append(enemy)
+        if isinstance(enemy, SupervisorEnemy):
+            enemy.flow_field = self.flow_field
+        enemy.obstacles = self._obstacle_grid
+        if self._store is not None:
+            self.enemies.append(self._store.add(enemy))
+        else:
+            self.enemies.append(enemy)
+            self._enemy_grid.insert(enemy)
+
+    def remove_enemy(self, enemy: Enemy) -> None:
+        """
+        Remove <enemy> from the room. <enemy> may be reused for an enemy
+        restored to the room later, so it must not be used afterwards.
+
+        == Preconditions ==
+        enemy is in the room.
+        """
+        self.enemies.remove(enemy)
+        if self._store is not None:
+            self._store.remove(enemy)
+        else:
+            self._enemy_grid.remove(enemy)
+        self._keep_free(enemy)
+
+    def _keep_free(self, enemy: Enemy) -> None:
+        """
+        Keep the removed <enemy> for reuse, unless FREE_CAPACITY enemies of
+        its kind are already kept.
+        """
+        free = self._free.setdefault(enemy.KIND, [])
+        if len(free) < Room.FREE_CAPACITY:
+            free.append(enemy)
+
+    def _release(self, enemies: list[Enemy]) -> None:
+        """
+        Take <enemies> out of the spatial index or the entity store at once
+        and keep them for reuse.
+
+        == Preconditions ==
+        enemies have just been removed from self.enemies.
+        """
+        if self._store is not None:
+            self._store.remove_many(enemies)
+        else:
+            for enemy in enemies:
+                self._enemy_grid.remove(enemy)
+        for enemy in enemies:
+            self._keep_free(enemy)
+
+    def share_free_list(self, free: dict[str: list[Enemy]]) -> None:
+        """
+        Keep the enemies removed from the room in <free>, by kind, and reuse
+        the enemies in it, so that enemies are reused across the rooms that
+        share <free>. Rooms whose enemies are in an entity store keep their
+        own free list, since their enemies cannot leave the store.
+        """
+        if self._store is None:
+            self._free = free
+
+    def release_enemies(self) -> None:
+        """
+        Remove every enemy from the room and keep them for reuse. The room
+        must not be used afterwards.
+        """
+        enemies, self.enemies = self.enemies, []
+        self._release(enemies)
+
+    def snapshot_enemies(self) -> list[tuple[int, tuple]]:
+        """
+        Return the spawn index and the state of every enemy in the room, as
+        returned by Enemy.get_state.
+        """
+        return [(enemy.spawn, enemy.get_state()) for enemy in self.enemies]
+
+    def restore_enemies(self, snapshot: list[tuple[int, tuple]]) -> None:
+        """
+        Add enemies to the room with the spawn indices and states in
+        <snapshot>, as returned by snapshot_enemies. Enemies in the free list
+        of the room are reused before new ones are made.
+        """
+        for spawn, state in snapshot:
+            free = self._free.get(state[0])
+            if free:
+                # The enemy must be back in the store before its state is set.
+                enemy = free.pop()
+                self.add_enemy(enemy)
+                enemy.set_state(state)
+                if self._store is None:
+                    self._enemy_grid.update(enemy)
+            else:
+                enemy = ENEMY_KINDS[state[0]](x=state[1], y=state[2],
+                                              init_direct=state[3])
+                enemy.set_state(state)
+                self.add_enemy(enemy)
+            enemy.spawn = spawn
+
+    def set_enemy_states(self, snapshot: list[tuple[int, tuple]]) -> None:
+        """
+        Make the enemies of the room those in <snapshot>, as returned by
+        snapshot_enemies. If the room has the same enemies as <snapshot>,
+        they keep their objects and only have their state set. Otherwise they
+        are all replaced by new enemies. The scheduler starts afresh; its
+        state is restored with set_scheduler_state.
+        """
+        if self.scheduler is not None:
+            self.scheduler.reset()
+        if [spawn for spawn, _ in snapshot] != \
+                [enemy.spawn for enemy in self.enemies]:
+            enemies, self.enemies = self.enemies, []
+            self._release(enemies)
+            self.restore_enemies(snapshot)
+            return
+
+        for enemy, (_, state) in zip(self.enemies, snapshot):
+            enemy.set_state(state)
+            if self._store is None:
+                self._enemy_grid.update(enemy)
+
+    def snapshot_scheduler(self) -> Optional[tuple]:
+        """
+        Return the state of the scheduler of the room, as returned by
+        LODScheduler.get_state, but with every enemy given by its spawn
+        index. Return None if the room has no scheduler, or if its
+        scheduler has not scheduled any tick since it started afresh.
+        """
+        if self.scheduler is None:
+            return None
+        tick, cursor, tiers = self.scheduler.get_state(self.enemies)
+        if tick == 0:
+            return None
+
+        return tick, cursor, [(self.enemies[i].spawn, period, phase)
+                              for i, period, phase in tiers]
+
+    def set_scheduler_state(self, state: Optional[tuple]) -> None:
+        """
+        Restore the scheduler of the room from <state>, as returned by
+        snapshot_scheduler. If <state> is None, the scheduler starts afresh.
+        Tiers of enemies that are not in the room are ignored.
+        """
+        if self.scheduler is None:
+            return
+        self.scheduler.reset()
+        if state is None:
+            return
+
+        tick, cursor, tiers = state
+        index = {enemy.spawn: i for i, enemy in enumerate(self.enemies)}
+        self.scheduler.set_state(
+            (tick, cursor, [(index[spawn], period, phase)
+                            for spawn, period, phase in tiers
+                            if spawn in index]), self.enemies)
+
+    def use_entity_store(self) -> None:
+        """
+        Keep the state of the enemies in the room in an array-backed entity
+        store so that they are updated and checked for collisions in batches.
+        The enemies of the room are replaced by views over the store.
+
+        == Preconditions ==
+        NumPy is installed.
+        """
+        if self._store is None:
+            self._store = EntityStore(max(len(self.enemies), 64))
+            self.enemies = [self._store.add(enemy) for enemy in self.enemies]
+            self._enemy_grid.clear()
+            self._free = {}
 
     def get_enemies(self) -> list[Enemy]:
         """
@@ -148,12 +507,13 @@ class Room:
         """
         return self.enemies
 
-    def set_neighbors(self, north: Optional['Room'],
-                      south: Optional['Room'],
-                      east: Optional['Room'],
-                      west: Optional['Room']) -> None:
+    def set_neighbors(self, north: Optional[int],
+                      south: Optional[int],
+                      east: Optional[int],
+                      west: Optional[int]) -> None:
         """
-        Set up the rooms connections to other rooms.
+        Set up the rooms connections to other rooms, given by the indices of
+        the rooms in the level.
         """
         if self.door['N'][0]:
             self.door['N'].append(north)
@@ -169,32 +529,116 @@ class Room:
 
     def handle_deaths(self) -> None:
         """
-        Remove any enemies that have died from the room
+        Remove any enemies that have died from the room, in a single pass
+        that keeps the order of the living enemies. It is called after the
+        update phase, so that dead enemies are never drawn.
+        """
+        enemies = self.enemies
+        dead = []
+        kept = 0
+        for enemy in enemies:
+            if enemy.hp > 0:
+                enemies[kept] = enemy
+                kept += 1
+            else:
+                dead.append(enemy)
+
+        if dead:
+            del enemies[kept:]
+            self._release(dead)
+
+    def _obstacles_changed(self) -> None:
+        """
+        Mark everything derived from the obstacles as out of date.
         """
-        for enemy in self.enemies:
-            if not enemy.is_alive():
-                self.enemies.remove(enemy)
+        self._static_dirty = True
+        self._colliders = None
+        self._grid_dirty = True
+        self._obstacle_boxes = None
+        self.flow_field.invalidate()
 
-    def handle_collisions(self, player: Player) -> None:
+    def get_colliders(self) -> list[Collider]:
         """
-        Handle any collisions in this room.
+        Return the collision geometry of the obstacles in the room, compiling
+        it first if the obstacles have changed. Contiguous obstacles of the
+        same type are covered by a single collider.
         """
-        for obstacle in self.obstacles:
+        if self._colliders is None:
+            self._colliders = merge_obstacles(self.obstacles)
+
+        return self._colliders
+
+    def get_obstacle_grid(self) -> SpatialHash:
+        """
+        Return the spatial index of the colliders, refilling it first if the
+        obstacles have changed.
+        """
+        if self._grid_dirty:
+            self._obstacle_grid.clear()
+            for collider in self.get_colliders():
+                self._obstacle_grid.insert(collider)
+            self._grid_dirty = False
+
+        return self._obstacle_grid
+
+    def _get_obstacle_boxes(self) -> 'np.ndarray':
+        """
+        Return the hit boxes of the colliders as an array, computing them
+        first if the obstacles have changed.
+        """
+        if self._obstacle_boxes is None:
+            self._obstacle_boxes = Entity.hit_box_array(self.get_colliders())
 
-            if player.check_collision(obstacle):
-                player.react_collision(obstacle)
+        return self._obstacle_boxes
 
+    def handle_collisions(self, player: Player) -> None:
+        """
+        Handle any collisions in this room between the player, its sword and
+        the enemies. Each entity is only checked against the entities that
+        share a cell of the spatial index with it. Collisions with obstacles
+        are resolved as the player and the enemies move.
+        """
+        if self._store is not None:
+            self._handle_stored_collisions(player)
+        else:
             for enemy in self.enemies:
+                self._enemy_grid.update(enemy)
+
+            self._handle_enemy_player_collisions(
+                player, self._enemy_grid.query_entity(player),
+                self._enemy_grid.query_entity(player.sword))
+
+    def _handle_stored_collisions(self, player: Player) -> None:
+        """
+        Handle the collisions of the enemies in the entity store of the room.
+        All the enemies are checked against the player and the sword at once.
+        """
+        self._handle_enemy_player_collisions(
+            player, [enemy for enemy, _ in self._store.collisions([player])],
+            [enemy for enemy, _ in self._store.collisions([player.sword])])
 
-                if enemy.check_collision(obstacle):
-                    enemy.react_collision(obstacle)
+    @staticmethod
+    def _handle_enemy_player_collisions(player: Player,
+                                        near_player: list[Enemy],
+                                        near_sword: list[Enemy]) -> None:
+        """
+        Handle the collisions between <player> and the enemies in
+        <near_player>, and between the sword of <player> and the enemies in
+        <near_sword>. All the touching pairs are found first and then
+        dispatched together.
+        """
+        pairs = []
+        for enemy in near_player:
+            if enemy.check_collision(player):
+                pairs.append((enemy, player))
+                pairs.append((player, enemy))
 
-                if enemy.check_collision(player):
-                    enemy.react_collision(player)
-                    player.react_collision(enemy)
+        if player.attacking:
+            for enemy in near_sword:
+                if enemy.check_collision(player.sword):
+                    pairs.append((enemy, player.sword))
 
-                if player.attacking and enemy.check_collision(player.sword):
-                    enemy.react_collision(player.sword)
+        Entity.dispatch(pairs)
 
     @staticmethod
     def change_room(player: Player) -> Optional[str]:
@@ -227,9 +671,27 @@ class Room:
                 (temp_s[0] <= player.x_pos <= temp_s[1]):
             return 'S'
 
-    def door_to_room(self, door_dir: str) -> 'Room':
+    def near_door(self, player: Player, distance: float) -> Optional[str]:
+        """
+        Return the position of a door of the room that <player> is within
+        <distance> of, or None if there is no such door.
         """
-        Return the room the door in direction <door_dir> leads to.
+        for door_dir, (x1, x2, y1, y2) in (('N', Room.N_DOOR),
+                                           ('S', Room.S_DOOR),
+                                           ('E', Room.E_DOOR),
+                                           ('W', Room.W_DOOR)):
+            if self.door[door_dir][0] and \
+                    x1 - distance < player.x_pos + player.size[0] and \
+                    player.x_pos < x2 + distance and \
+                    y1 - distance < player.y_pos + player.size[1] and \
+                    player.y_pos < y2 + distance:
+                return door_dir
+
+        return None
+
+    def door_to_room(self, door_dir: str) -> int:
+        """
+        Return the index of the room the door in direction <door_dir> leads to.
 
         == Preconditions ==
         door_dir is 'N', 'S', 'E', 'W'
@@ -239,76 +701,3 @@ class Room:
         """
         return self.door[door_dir][1]
 
-
-class Room1(Room):
-    """
-    The first room in Block Adventure.
-    """
-    def __init__(self):
-        super().__init__(north=False, south=False, west=True, east=True)
-
-        # Obstacles in Room 1.
-        super().add_obstacles(1, 4, 90, 50, Obstacle.STONE)
-        super().add_obstacles(1, 4, 480, 50, Obstacle.STONE)
-
-        super().add_obstacles(12, 1, 120, 50, Obstacle.STONE)
-        super().add_obstacles(1, 1, 123, 150, Obstacle.STONE)
-        super().add_obstacles(2, 1, 155, 175, Obstacle.STONE)
-
-        super().add_obstacles(2, 1, 383, 175, Obstacle.STONE)
-        super().add_obstacles(1, 1, 445, 150, Obstacle.STONE)
-
-        super().add_obstacles(1, 1, 285, 285, Obstacle.STONE)
-
-        super().add_obstacles(1, 2, 120, 80, Obstacle.BOX)
-        super().add_obstacles(1, 2, 450, 80, Obstacle.BOX)
-
-        super().add_obstacles(3, 2, 150, 80, Obstacle.PUDDLE)
-        super().add_obstacles(3, 2, 360, 80, Obstacle.PUDDLE)
-
-        super().add_obstacles(1, 2, 240, 80, Obstacle.BOX)
-        super().add_obstacles(1, 2, 330, 80, Obstacle.BOX)
-
-        super().add_obstacles(1, 3, 50, 450, Obstacle.STONE)
-        super().add_obstacles(1, 3, 520, 450, Obstacle.STONE)
-        super().add_obstacles(2, 1, 80, 510, Obstacle.STONE)
-        super().add_obstacles(2, 1, 460, 510, Obstacle.STONE)
-
-        super().add_obstacles(1, 1, 85, 475, Obstacle.BOX)
-        super().add_obstacles(1, 1, 485, 475, Obstacle.BOX)
-
-        super().add_enemy(MindlessEnemy(init_direct="u", x=50, y=250))
-        super().add_enemy(SupervisorEnemy(init_direct='l', x=400, y=300))
-
-
-class Room2(Room):
-    """
-    Room number 2 in Block Adventure.
-    """
-    def __init__(self):
-        super().__init__(north=False, south=False, west=False, east=True)
-
-        # Obstacles in room 2
-
-        super().add_obstacles(3, 1, 60, 60, Obstacle.BOX)
-        super().add_obstacles(2, 1, 60, 100, Obstacle.BOX)
-
-        super().add_enemy(MindlessEnemy(init_direct="l", x=50, y=150))
-        super().add_enemy(MindlessEnemy(init_direct="d", x=530, y=35))
-
-
-class Room3(Room):
-    """
-    Room number 3 in Block Adventure.
-    """
-    def __init__(self):
-        super().__init__(north=False, south=False, west=True, east=False)
-
-        # Obstacles in room 2
-
-        super().add_obstacles(3, 1, 60, 60, Obstacle.BOX)
-        super().add_obstacles(2, 1, 60, 100, Obstacle.BOX)
-
-        super().add_enemy(MindlessEnemy(init_direct="u", x=50, y=150))
-        super().add_enemy(MindlessEnemy(init_direct="l", x=50, y=150))
-        super().add_enemy(MindlessEnemy(init_direct="d", x=50, y=150))
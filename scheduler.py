@@ -0,0 +1,137 @@
+"""
+Contains the level-of-detail scheduler that decides how often each enemy
+in a room is updated. Enemies close to the player are updated on every
+tick. Enemies further away are updated on fewer ticks, moving further each
+time, so that a dense room costs less to update without changing the
+behaviour of the enemies near the player.
+"""
+
+from enemy import Enemy
+from entity import Entity
+
+# The default tiers of a scheduler, as (squared distance, period) pairs.
+# An enemy is in the first tier whose squared distance to the player is
+# larger than its own, and is updated once every period ticks.
+# The nearest tier must cover SupervisorEnemy.PURSUIT_RANGE.
+TIERS = ((250 ** 2, 1), (400 ** 2, 2), (float('inf'), 4))
+
+
+class LODScheduler:
+    """
+    Updates the enemies of a room at a rate that depends on their distance
+    to the player. The tier of each enemy is only reassigned every few ticks,
+    a fixed number of enemies at a time.
+
+    == Attributes ==
+    tiers: The tiers that enemies are assigned to, as (squared distance,
+    period) pairs sorted by squared distance.
+    budget: The number of enemies whose tier is reassigned on each tick.
+
+    == Representation Invariants ==
+    budget > 0
+    The period of every tier is at least 1.
+    The squared distance of the last tier is float('inf').
+    """
+    # Private Attributes
+    # _tick: The number of ticks scheduled so far.
+    # _cursor: The index of the next enemy whose tier is reassigned.
+    # _schedule: The period of each enemy with a tier, and the tick modulo
+    # the period on which it is updated. Enemies without one are updated on
+    # every tick.
+    tiers: tuple[tuple[float, int], ...]
+    budget: int
+    _tick: int
+    _cursor: int
+    _schedule: dict[Enemy: tuple[int, int]]
+
+    def __init__(self, tiers: tuple[tuple[float, int], ...] = TIERS,
+                 budget: int = 32) -> None:
+        """
+        Initialize a scheduler with the tiers <tiers> that reassigns the
+        tiers of <budget> enemies on each tick.
+
+        == Preconditions ==
+        budget > 0
+        """
+        self.tiers = tiers
+        self.budget = budget
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forget the tiers of all enemies, so that they are all updated on the
+        next tick and scheduled afresh.
+        """
+        self._tick = 0
+        self._cursor = 0
+        self._schedule = {}
+
+    def get_state(self, enemies: list[Enemy]) \
+            -> tuple[int, int, list[tuple[int, int, int]]]:
+        """
+        Return the number of ticks scheduled so far, the index of the next
+        enemy in <enemies> whose tier is reassigned, and the index, period
+        and phase of every enemy in <enemies> that has a tier.
+        """
+        tiers = [(i, *self._schedule[enemy]) for i, enemy in enumerate(enemies)
+                 if enemy in self._schedule]
+        return self._tick, self._cursor, tiers
+
+    def set_state(self, state: tuple[int, int, list[tuple[int, int, int]]],
+                  enemies: list[Enemy]) -> None:
+        """
+        Restore the schedule of <enemies> from <state>, as returned by
+        get_state.
+        """
+        self._tick, self._cursor, tiers = state
+        self._schedule = {enemies[i]: (period, phase)
+                          for i, period, phase in tiers}
+
+    def period(self, sq_dist: float) -> int:
+        """
+        Return the period of the tier of an enemy at the squared distance
+        <sq_dist> from the player.
+        """
+        for limit, period in self.tiers:
+            if sq_dist < limit:
+                return period
+
+        return self.tiers[-1][1]
+
+    def _reassign(self, enemies: list[Enemy], player: Entity) -> None:
+        """
+        Reassign the tiers of the next <budget> enemies in <enemies>. The
+        updates of the enemies in a tier are spread evenly over its period.
+        """
+        if self._cursor >= len(enemies):
+            self._cursor = 0
+            # Forget the enemies that are no longer in the room.
+            present = set(enemies)
+            self._schedule = {enemy: tier for enemy, tier in
+                              self._schedule.items() if enemy in present}
+
+        end = min(self._cursor + self.budget, len(enemies))
+        for i in range(self._cursor, end):
+            enemy = enemies[i]
+            dx = player.x_pos - enemy.x_pos
+            dy = player.y_pos - enemy.y_pos
+            period = self.period(dx * dx + dy * dy)
+            self._schedule[enemy] = (period, i % period)
+        self._cursor = end
+
+    def update(self, enemies: list[Enemy], player: Entity) -> None:
+        """
+        Update the enemies in <enemies> that are due on this tick, scaling
+        the step of each by its period.
+        """
+        self._reassign(enemies, player)
+
+        player_coord = (player.x_pos, player.y_pos)
+        for enemy in enemies:
+            period, phase = self._schedule.get(enemy, (1, 0))
+            if period == 1:
+                enemy.update(player_coord)
+            elif self._tick % period == phase:
+                enemy.update(player_coord, period)
+
+        self._tick += 1
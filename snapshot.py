@@ -0,0 +1,186 @@
+"""
+Saves and restores the mutable state of a game of Block Adventure, for
+checkpoints, rewinding and simulation workers.
+
+Only what changes during play is stored: the current room, the player and
+its sword, and the enemies and level-of-detail scheduler of every room
+that has been built. Obstacles, doors and surfaces come from the level and
+are never stored. The enemies of
+a room are stored as a delta against the enemies spawned in it by the
+level, so rooms whose enemies are as spawned take no space at all.
+
+A snapshot is a sequence of fixed-layout little-endian records:
+    header, player, room sections
+where every room section is a _ROOM record, a bitmask with one bit per
+spawned enemy that is set if the enemy is alive, an _ENEMY record for
+every living enemy whose state differs from its spawn state, and a _TIER
+record for every enemy that the scheduler of the room has assigned a tier
+to. Timers are stored as the number of milliseconds left on them, which
+the clock keeps exact, so a restored game plays out the same way as the
+game it was saved from.
+
+Restoring a snapshot keeps the rooms in memory, and their surfaces, and
+only sets the state of their enemies and schedulers. Projectiles are too
+short-lived to be stored, so restoring a snapshot removes them. Which rooms
+are in memory is not stored. The enemies and scheduler of a room that is
+not in memory are restored when the room is built.
+"""
+
+import struct
+from typing import Optional
+
+from map import GameMap
+from player import Player
+
+# The version of the snapshot format.
+FORMAT_VERSION = 2
+
+DIRECTIONS = 'udrl'
+
+# The header: magic, version, index of the current room and number of room
+# sections.
+_HEADER = struct.Struct('<4sHHH')
+_MAGIC = b'BASN'
+# The player: x, y, direction, speed, hp, attacked, attacking, milliseconds
+# left on the attack and on the invulnerability, and level of the sword.
+_PLAYER = struct.Struct('<ddBdh??ddB')
+# A room section: index of the room, number of spawned enemies, number of
+# enemy records, number of ticks and cursor of the scheduler, and number of
+# tier records.
+_ROOM = struct.Struct('<HHHIHH')
+# An enemy: spawn index, x, y, direction, hp, milliseconds left on the
+# invulnerability, distance patrolled and whether it is pursuing. The last
+# two are only used by Supervisors.
+_ENEMY = struct.Struct('<HddBhdd?')
+# A tier assigned by a scheduler: spawn index of the enemy, period and
+# phase.
+_TIER = struct.Struct('<HBB')
+
+
+class SnapshotError(Exception):
+    """
+    Raised when a snapshot cannot be taken or is invalid.
+    """
+    pass
+
+
+def _encode_room(index: int, spawned: list[tuple],
+                 enemies: list[tuple[int, tuple]],
+                 schedule: Optional[tuple]) -> bytes:
+    """
+    Return the room section of room <index> whose enemies have the spawn
+    states <spawned> and the current spawn indices and states <enemies>,
+    and whose scheduler has the state <schedule>, as returned by
+    Room.snapshot_scheduler. Return an empty string if the enemies are as
+    spawned and the scheduler has no state.
+    """
+    alive = bytearray((len(spawned) + 7) // 8)
+    records = []
+    for spawn, state in enemies:
+        if not 0 <= spawn < len(spawned):
+            raise SnapshotError(f'enemy in room {index} was not spawned '
+                                f'from the level')
+        alive[spawn // 8] |= 1 << spawn % 8
+        if state != spawned[spawn]:
+            distance, pursuing = state[6:] or (0.0, False)
+            records.append(_ENEMY.pack(spawn, state[1], state[2],
+                                       DIRECTIONS.index(state[3]), state[4],
+                                       state[5], distance, pursuing))
+
+    tick, cursor, tiers = schedule or (0, 0, [])
+    if not records and len(enemies) == len(spawned) and schedule is None:
+        return b''
+    return b''.join([_ROOM.pack(index, len(spawned), len(records), tick,
+                                cursor, len(tiers)),
+                     bytes(alive)] + records +
+                    [_TIER.pack(*tier) for tier in tiers])
+
+
+def save(game_map: GameMap, player: Player) -> bytes:
+    """
+    Return a snapshot of the game played on <game_map> by <player>.
+    Raise SnapshotError if a transition is in progress.
+    """
+    if game_map.transition is not None:
+        raise SnapshotError('cannot take a snapshot during a transition')
+
+    x, y, direction, speed, hp, attacked, attacking, attack, invulnerable, \
+        level = player.get_state()
+    states = game_map.enemy_states()
+    schedules = game_map.scheduler_states()
+    sections = []
+    for index in sorted(states.keys() | schedules.keys()):
+        spawned = game_map.level.spawn_states(index)
+        section = _encode_room(index, spawned,
+                               states.get(index, list(enumerate(spawned))),
+                               schedules.get(index))
+        if section:
+            sections.append(section)
+
+    return b''.join([_HEADER.pack(_MAGIC, FORMAT_VERSION,
+                                  game_map.current_index(), len(sections)),
+                     _PLAYER.pack(x, y, DIRECTIONS.index(direction), speed,
+                                  hp, attacked, attacking, attack,
+                                  invulnerable, level)] + sections)
+
+
+def restore(data: bytes, game_map: GameMap, player: Player) -> None:
+    """
+    Restore the game played on <game_map> by <player> to the snapshot
+    <data>, as returned by save.
+    Raise SnapshotError if <data> is not a valid snapshot of the level of
+    <game_map>.
+
+    == Preconditions ==
+    No transition is in progress.
+    """
+    try:
+        magic, version, current, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != FORMAT_VERSION:
+            raise SnapshotError('not a snapshot of this version of the game')
+        offset = _HEADER.size
+
+        x, y, direction, speed, hp, attacked, attacking, attack, \
+            invulnerable, level = _PLAYER.unpack_from(data, offset)
+        offset += _PLAYER.size
+
+        states = {}
+        schedules = {}
+        for _ in range(count):
+            index, n_spawned, n_records, tick, cursor, n_tiers = \
+                _ROOM.unpack_from(data, offset)
+            offset += _ROOM.size
+            if index >= game_map.level.room_count:
+                raise SnapshotError(f'room {index} is not in the level')
+            spawned = game_map.level.spawn_states(index)
+            if n_spawned != len(spawned):
+                raise SnapshotError(f'room {index} does not match the level')
+            alive = data[offset:offset + (n_spawned + 7) // 8]
+            offset += (n_spawned + 7) // 8
+
+            enemies = {spawn: spawned[spawn] for spawn in range(n_spawned)
+                       if alive[spawn // 8] >> spawn % 8 & 1}
+            for _ in range(n_records):
+                spawn, e_x, e_y, e_dir, e_hp, e_invulnerable, distance, \
+                    pursuing = _ENEMY.unpack_from(data, offset)
+                offset += _ENEMY.size
+                state = (spawned[spawn][0], e_x, e_y, DIRECTIONS[e_dir], e_hp,
+                         e_invulnerable)
+                if len(spawned[spawn]) > 6:
+                    state += (distance, pursuing)
+                enemies[spawn] = state
+            states[index] = sorted(enemies.items())
+
+            tiers = [_TIER.unpack_from(data, offset + _TIER.size * i)
+                     for i in range(n_tiers)]
+            offset += _TIER.size * n_tiers
+            if tick > 0:
+                schedules[index] = (tick, cursor, tiers)
+    except (struct.error, IndexError) as error:
+        raise SnapshotError(f'invalid snapshot: {error}')
+    if current >= game_map.level.room_count:
+        raise SnapshotError(f'room {current} is not in the level')
+
+    game_map.restore(current, states, schedules)
+    player.set_state((x, y, DIRECTIONS[direction], speed, hp, attacked,
+                      attacking, attack, invulnerable, level))
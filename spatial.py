@@ -0,0 +1,109 @@
+from entity import Entity
+
+
+class SpatialHash:
+    """
+    A uniform grid that indexes entities by the cells that their hit boxes
+    overlap. It is used as a broad-phase for collision detection so that
+    an entity is only tested against the entities that share a cell with it.
+
+    == Attributes ==
+    cell_size: The width and height of a single cell.
+
+    == Representation Invariants ==
+    cell_size > 0
+    """
+    # Private Attributes
+    # _cells: The entities in each non-empty cell, keyed by (column, row).
+    # _keys: The cells that each entity in the grid was last inserted into.
+    cell_size: float
+    _cells: dict[tuple[int, int]: list[Entity]]
+    _keys: dict[Entity: tuple[tuple[int, int], ...]]
+
+    def __init__(self, cell_size: float) -> None:
+        """
+        Initialize an empty grid of cells of size <cell_size>.
+        """
+        self.cell_size = cell_size
+        self._cells = {}
+        self._keys = {}
+
+    def _cells_in(self, x: float, y: float, w: float, h: float) \
+            -> tuple[tuple[int, int], ...]:
+        """
+        Return the cells overlapped by the rectangle at (<x>, <y>) of size
+        (<w>, <h>).
+        """
+        c1, c2 = int(x // self.cell_size), int((x + w) // self.cell_size)
+        r1, r2 = int(y // self.cell_size), int((y + h) // self.cell_size)
+
+        return tuple((c, r) for c in range(c1, c2 + 1)
+                     for r in range(r1, r2 + 1))
+
+    def _cells_of(self, ent: Entity) -> tuple[tuple[int, int], ...]:
+        """
+        Return the cells overlapped by the current hit box of <ent>.
+        """
+        box = ent.hit_box[ent._direction]
+        return self._cells_in(box.x_pos, box.y_pos, box.size[0], box.size[1])
+
+    def insert(self, ent: Entity) -> None:
+        """
+        Add <ent> to the grid.
+
+        == Preconditions ==
+        ent is not in the grid.
+        """
+        keys = self._cells_of(ent)
+        for key in keys:
+            self._cells.setdefault(key, []).append(ent)
+        self._keys[ent] = keys
+
+    def remove(self, ent: Entity) -> None:
+        """
+        Remove <ent> from the grid. Do nothing if it is not in the grid.
+        """
+        for key in self._keys.pop(ent, ()):
+            cell = self._cells[key]
+            cell.remove(ent)
+            if not cell:
+                del self._cells[key]
+
+    def update(self, ent: Entity) -> None:
+        """
+        Move <ent> to the cells that it currently overlaps. Nothing is done
+        if <ent> is still in the same cells.
+        """
+        if self._keys.get(ent) != self._cells_of(ent):
+            self.remove(ent)
+            self.insert(ent)
+
+    def clear(self) -> None:
+        """
+        Remove every entity from the grid.
+        """
+        self._cells.clear()
+        self._keys.clear()
+
+    def query(self, x: float, y: float, w: float, h: float) -> list[Entity]:
+        """
+        Return the entities that share a cell with the rectangle at
+        (<x>, <y>) of size (<w>, <h>). Each entity is returned once, in
+        the order in which they were found.
+        """
+        found = {}
+        for key in self._cells_in(x, y, w, h):
+            for ent in self._cells.get(key, ()):
+                found[ent] = None
+
+        return list(found)
+
+    def query_entity(self, ent: Entity) -> list[Entity]:
+        """
+        Return the entities that share a cell with the current hit box of
+        <ent>, excluding <ent> itself.
+        """
+        box = ent.hit_box[ent._direction]
+        return [other for other in self.query(box.x_pos, box.y_pos,
+                                              box.size[0], box.size[1])
+                if other is not ent]
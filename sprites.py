@@ -1,81 +1,183 @@
-import pygame
-
 """
 Contains the sprites for all entities in tbe game.
-"""
 
-# Player Sprites
-PLAYER_SIZE = 30
-
-player_up = pygame.Surface((PLAYER_SIZE, PLAYER_SIZE))
-player_up.fill((200, 0, 0))
+The sprites are a lazily loaded registry: importing this module draws and
+loads nothing, and each group of sprites is only drawn, or loaded from the
+images directory next to this module, when one of its names is first
+looked up. The sprites of a group are then packed into atlases in the pixel
+format of the display, and the names hold subsurfaces of the atlases, so
+a display mode must be set before a sprite is looked up.
 
-player_down = pygame.Surface((PLAYER_SIZE, PLAYER_SIZE))
-player_down.fill((200, 0, 0))
-pygame.draw.rect(player_down, (0, 0, 255),
-                 (5, 3, 20, 15))
+In null mode, set with set_null_mode, every sprite is a blank surface of
+the right size instead, so headless runs never touch the image files.
+"""
 
-player_right = pygame.Surface((PLAYER_SIZE, PLAYER_SIZE))
-player_right.fill((200, 0, 0))
-pygame.draw.rect(player_right, (0, 0, 255),
-                 (20, 3, 10, 15))
+import os
+from typing import Callable, Optional
 
-player_left = pygame.Surface((PLAYER_SIZE, PLAYER_SIZE))
-player_left.fill((200, 0, 0))
-pygame.draw.rect(player_left, (0, 0, 255),
-                 (0, 3, 10, 15))
+import pygame
 
-# Dictionary of player sprites for all directions.
-player_sprites = {'u': player_up, 'd': player_down, 'r': player_right,
-                  'l': player_left}
+from assets import load_scaled, pack_sprites
 
-# Sword sprites
+# The directory that the images of the sprites are loaded from.
+IMAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
 
+PLAYER_SIZE = 30
 SWORD_SIZE = 32
-
-sword_up = pygame.transform.scale(pygame.image.load('images/Sword_Up.png'),
-                                  (SWORD_SIZE, SWORD_SIZE))
-sword_down = pygame.transform.scale(pygame.image.load('images/Sword_Down.png'),
-                                    (SWORD_SIZE, SWORD_SIZE))
-sword_right = pygame.transform.scale(pygame.image.load('images/Sword_Right.png')
-                                     , (SWORD_SIZE, SWORD_SIZE))
-sword_left = pygame.transform.scale(pygame.image.load('images/Sword_Left.png'),
-                                    (SWORD_SIZE, SWORD_SIZE))
-
-# Dictionary of sword sprites for all directions.
-sword_sprites = {'u': sword_up, 'd': sword_down, 'r': sword_right,
-                 'l': sword_left}
-
-
-# Mindless Enemy Sprites
-
 MINDLESS_SIZE = 25
-
-mindless_sprite = pygame.Surface((MINDLESS_SIZE, MINDLESS_SIZE))
-mindless_sprite.fill((0, 175, 0))
-pygame.draw.rect(mindless_sprite, (0, 100, 0),
-                 (5, 5, 15, 15))
-
 SUPERVISOR_SIZE = 28
-
-supervisor_sprite_l = pygame.Surface((SUPERVISOR_SIZE, SUPERVISOR_SIZE))
-supervisor_sprite_l.fill((0, 0, 255))
-pygame.draw.rect(supervisor_sprite_l, (0, 0, 0),
-                 (0, 0, 8, 16))
-
-supervisor_sprite_r = pygame.Surface((SUPERVISOR_SIZE, SUPERVISOR_SIZE))
-supervisor_sprite_r.fill((0, 0, 255))
-pygame.draw.rect(supervisor_sprite_r, (0, 0, 0),
-                 (20, 0, 8, 16))
-
-supervisor_sprite_d = pygame.Surface((SUPERVISOR_SIZE, SUPERVISOR_SIZE))
-supervisor_sprite_d.fill((0, 0, 255))
-pygame.draw.rect(supervisor_sprite_d, (0, 0, 0),
-                 (10, 0, 8, 16))
-
-supervisor_sprite_u = pygame.Surface((SUPERVISOR_SIZE, SUPERVISOR_SIZE))
-supervisor_sprite_u.fill((0, 0, 255))
-
-supervisor_sprites = {'u': supervisor_sprite_u, 'd': supervisor_sprite_d,
-                      'l': supervisor_sprite_l, 'r': supervisor_sprite_r}
-
+PROJECTILE_SIZE = 6
+
+
+def _draw_player() -> list[pygame.Surface]:
+    """
+    Return the player sprites facing up, down, right and left.
+    """
+    player_up = pygame.Surface((PLAYER_SIZE, PLAYER_SIZE))
+    player_up.fill((200, 0, 0))
+
+    player_down = pygame.Surface((PLAYER_SIZE, PLAYER_SIZE))
+    player_down.fill((200, 0, 0))
+    pygame.draw.rect(player_down, (0, 0, 255),
+                     (5, 3, 20, 15))
+
+    player_right = pygame.Surface((PLAYER_SIZE, PLAYER_SIZE))
+    player_right.fill((200, 0, 0))
+    pygame.draw.rect(player_right, (0, 0, 255),
+                     (20, 3, 10, 15))
+
+    player_left = pygame.Surface((PLAYER_SIZE, PLAYER_SIZE))
+    player_left.fill((200, 0, 0))
+    pygame.draw.rect(player_left, (0, 0, 255),
+                     (0, 3, 10, 15))
+
+    return [player_up, player_down, player_right, player_left]
+
+
+def _load_sword() -> list[pygame.Surface]:
+    """
+    Return the sword sprites facing up, down, right and left.
+    """
+    return [load_scaled(os.path.join(IMAGES, f'Sword_{name}.png'),
+                        (SWORD_SIZE, SWORD_SIZE))
+            for name in ('Up', 'Down', 'Right', 'Left')]
+
+
+def _draw_mindless() -> list[pygame.Surface]:
+    """
+    Return the sprite of the mindless enemy.
+    """
+    mindless_sprite = pygame.Surface((MINDLESS_SIZE, MINDLESS_SIZE))
+    mindless_sprite.fill((0, 175, 0))
+    pygame.draw.rect(mindless_sprite, (0, 100, 0),
+                     (5, 5, 15, 15))
+
+    return [mindless_sprite]
+
+
+def _draw_supervisor() -> list[pygame.Surface]:
+    """
+    Return the Supervisor sprites facing up, down, right and left.
+    """
+    supervisor_sprite_l = pygame.Surface((SUPERVISOR_SIZE, SUPERVISOR_SIZE))
+    supervisor_sprite_l.fill((0, 0, 255))
+    pygame.draw.rect(supervisor_sprite_l, (0, 0, 0),
+                     (0, 0, 8, 16))
+
+    supervisor_sprite_r = pygame.Surface((SUPERVISOR_SIZE, SUPERVISOR_SIZE))
+    supervisor_sprite_r.fill((0, 0, 255))
+    pygame.draw.rect(supervisor_sprite_r, (0, 0, 0),
+                     (20, 0, 8, 16))
+
+    supervisor_sprite_d = pygame.Surface((SUPERVISOR_SIZE, SUPERVISOR_SIZE))
+    supervisor_sprite_d.fill((0, 0, 255))
+    pygame.draw.rect(supervisor_sprite_d, (0, 0, 0),
+                     (10, 0, 8, 16))
+
+    supervisor_sprite_u = pygame.Surface((SUPERVISOR_SIZE, SUPERVISOR_SIZE))
+    supervisor_sprite_u.fill((0, 0, 255))
+
+    return [supervisor_sprite_u, supervisor_sprite_d, supervisor_sprite_r,
+            supervisor_sprite_l]
+
+
+def _draw_projectile() -> list[pygame.Surface]:
+    """
+    Return the sprite of a projectile.
+    """
+    projectile_sprite = pygame.Surface((PROJECTILE_SIZE, PROJECTILE_SIZE))
+    projectile_sprite.fill((255, 255, 255))
+
+    return [projectile_sprite]
+
+
+# The groups of sprites that are materialized together, as (size, function
+# that returns the sprites, names of the sprites, name of the dictionary
+# of the sprites by direction) tuples. The dictionary is None for sprites
+# that face every direction.
+_GROUPS: list[tuple[int, Callable[[], list[pygame.Surface]],
+                    tuple[str, ...], Optional[str]]] = [
+    (PLAYER_SIZE, _draw_player,
+     ('player_up', 'player_down', 'player_right', 'player_left'),
+     'player_sprites'),
+    (SWORD_SIZE, _load_sword,
+     ('sword_up', 'sword_down', 'sword_right', 'sword_left'),
+     'sword_sprites'),
+    (MINDLESS_SIZE, _draw_mindless, ('mindless_sprite',), None),
+    (SUPERVISOR_SIZE, _draw_supervisor,
+     ('supervisor_sprite_u', 'supervisor_sprite_d', 'supervisor_sprite_r',
+      'supervisor_sprite_l'),
+     'supervisor_sprites'),
+    (PROJECTILE_SIZE, _draw_projectile, ('projectile_sprite',), None),
+]
+
+# The group of every name in the registry.
+_GROUP_OF = {name: group for group in _GROUPS
+             for name in group[2] + ((group[3],) if group[3] else ())}
+
+# The sprites materialized so far, by name.
+_materialized: dict[str: object] = {}
+
+# Whether blank surfaces are handed out instead of the sprites.
+_null_mode = False
+
+
+def set_null_mode(enabled: bool) -> None:
+    """
+    Hand out blank surfaces of the right size instead of the sprites if
+    <enabled> is True, and the sprites otherwise. The sprites materialized
+    so far are forgotten, but entities keep the sprites they were given.
+    """
+    global _null_mode
+    _null_mode = enabled
+    _materialized.clear()
+
+
+def _materialize(group: tuple) -> None:
+    """
+    Draw or load the sprites of <group> and add them to the registry.
+    """
+    size, make, names, by_direction = group
+    if _null_mode:
+        blank = pygame.Surface((size, size))
+        sprites = [blank for _ in names]
+    else:
+        sprites = pack_sprites(make())
+
+    _materialized.update(zip(names, sprites))
+    if by_direction is not None:
+        _materialized[by_direction] = dict(zip('udrl', sprites))
+
+
+def __getattr__(name: str) -> object:
+    """
+    Return the sprite, or the dictionary of sprites, named <name>,
+    materializing its group first if it has not been.
+    """
+    if name not in _materialized:
+        if name not in _GROUP_OF:
+            raise AttributeError(f'module {__name__!r} has no attribute '
+                                 f'{name!r}')
+        _materialize(_GROUP_OF[name])
+
+    return _materialized[name]
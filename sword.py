@@ -1,4 +1,4 @@
-from entity import Entity
+from entity import Entity, TAG_SWORD
 from pygame import Surface
 
 
@@ -17,10 +17,14 @@ class Sword(Entity):
     The keys of sword_sprite are 'U', 'D', 'L', and 'R'
     """
 
+    __slots__ = ('level', 'abilities')
+
     sword_sprite: dict[str: Surface]
     level: int
     abilities: list[str]
 
+    TAG = TAG_SWORD
+
     def __init__(self) -> None:
         """
         Initialize sword. level starts at 1. Initially there are no abilities.
@@ -45,7 +49,4 @@ class Sword(Entity):
 
                          )
 
-    def react_collision(self, ent: 'Entity') -> None:
-        pass
-
 
@@ -0,0 +1,150 @@
+"""
+Tests that level files survive the round trip through their binary cache.
+"""
+
+import json
+import os
+
+import pytest
+
+import sprites
+from level import LevelError, compile_level, load_level
+from obstacle import Obstacle
+
+LEVEL = {
+    'version': 1,
+    'start': 'hall',
+    'rooms': {
+        'cellar': {
+            'doors': {'N': 'hall'},
+            'obstacles': [[2, 3, 90, 120, 'box']],
+            'enemies': [['mindless', 50.5, 250, 'u']]
+        },
+        'hall': {
+            'doors': {'S': 'cellar', 'E': 'yard'},
+            'tiles': ['', '', '', '', '', '  ##~~B']
+        },
+        'yard': {
+            'doors': {'W': 'hall'},
+            'enemies': [['supervisor', 400, 300, 'l'],
+                        ['mindless', 530, 35, 'd']]
+        }
+    }
+}
+
+
+@pytest.fixture(autouse=True)
+def null_sprites() -> None:
+    """
+    Build enemies with blank sprites, so that no display is needed.
+    """
+    sprites.set_null_mode(True)
+    yield
+    sprites.set_null_mode(False)
+
+
+def _write(path: str, source: dict) -> str:
+    """
+    Write the level <source> to the level file at <path>, and return <path>.
+    """
+    with open(path, 'w') as f:
+        json.dump(source, f)
+
+    return path
+
+
+def _contents(level) -> list[tuple]:
+    """
+    Return the name, the neighbours, the obstacles and the spawn states of
+    every room of <level>.
+    """
+    rooms = []
+    for index in range(level.room_count):
+        room = level.build_room(index, spawn=False)
+        rooms.append((level.room_name(index), level.neighbours(index),
+                      sorted((o.x_pos, o.y_pos, o.colour)
+                             for o in room.obstacles),
+                      level.spawn_states(index)))
+
+    return rooms
+
+
+def test_level_round_trip(tmp_path) -> None:
+    level = load_level(_write(str(tmp_path / 'level.json'), LEVEL))
+
+    assert level.room_count == 3
+    assert level.room_name(level.start) == 'hall'
+    assert level.neighbours(1) == {'S': 0, 'E': 2}
+    assert level.neighbours(0) == {'N': 1}
+
+    cellar = level.build_room(0)
+    assert len(cellar.enemies) == 1
+    assert (cellar.enemies[0].x_pos, cellar.enemies[0].y_pos) == (50.5, 250)
+    assert {(o.x_pos, o.y_pos) for o in cellar.obstacles
+            if o.colour == Obstacle.BOX} == \
+        {(90 + 30 * i, 120 + 30 * j) for i in range(2) for j in range(3)}
+
+    hall = level.build_room(1)
+    # The walls are at the edges of the room.
+    assert sorted((o.x_pos, o.colour) for o in hall.obstacles
+                  if o.y_pos == 150 and 0 < o.x_pos < 570) == \
+        [(60, Obstacle.STONE), (90, Obstacle.STONE), (120, Obstacle.PUDDLE),
+         (150, Obstacle.PUDDLE), (180, Obstacle.BOX)]
+
+    assert [state[:4] for state in level.spawn_states(2)] == \
+        [('supervisor', 400, 300, 'l'), ('mindless', 530, 35, 'd')]
+
+
+def test_cache_is_reused(tmp_path) -> None:
+    path = _write(str(tmp_path / 'level.json'), LEVEL)
+    compiled = _contents(load_level(path))
+    cache = str(tmp_path / 'level.lvl')
+    with open(cache, 'rb') as f:
+        data = f.read()
+    assert data == compile_level(path)
+
+    mtime = os.stat(cache).st_mtime_ns
+    assert _contents(load_level(path)) == compiled
+    assert os.stat(cache).st_mtime_ns == mtime
+
+
+def test_stale_cache_is_recompiled(tmp_path) -> None:
+    path = _write(str(tmp_path / 'level.json'), LEVEL)
+    load_level(path)
+
+    changed = json.loads(json.dumps(LEVEL))
+    changed['rooms']['yard']['enemies'].pop()
+    _write(path, changed)
+    assert len(load_level(path).spawn_states(2)) == 1
+
+
+def test_corrupt_cache_is_recompiled(tmp_path) -> None:
+    path = _write(str(tmp_path / 'level.json'), LEVEL)
+    compiled = _contents(load_level(path))
+    with open(str(tmp_path / 'level.lvl'), 'wb') as f:
+        f.write(b'garbage')
+
+    assert _contents(load_level(path)) == compiled
+
+
+@pytest.mark.parametrize('change', [
+    {'version': 2},
+    {'start': 'attic'},
+    {'rooms': {'hall': {'doors': {'N': 'attic'}}}},
+    {'rooms': {'hall': {'enemies': [['dragon', 0, 0, 'u']]}}},
+    {'rooms': {'hall': {'enemies': [['mindless', 'x', 0, 'u']]}}},
+    {'rooms': {'hall': {'obstacles': [[-1, 1, 0, 0, 'box']]}}},
+    {'rooms': {'hall': {'obstacles': [[1, 1, 0, 'box']]}}},
+    {'rooms': {'hall': []}},
+])
+def test_invalid_level(tmp_path, change: dict) -> None:
+    source = {**LEVEL, **change}
+    with pytest.raises(LevelError):
+        load_level(_write(str(tmp_path / 'level.json'), source))
+
+
+@pytest.mark.parametrize('key', ['rooms', 'start'])
+def test_missing_key(tmp_path, key: str) -> None:
+    source = {k: v for k, v in LEVEL.items() if k != key}
+    with pytest.raises(LevelError):
+        load_level(_write(str(tmp_path / 'level.json'), source))
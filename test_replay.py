@@ -0,0 +1,133 @@
+"""
+Tests that recordings survive the round trip through the recording format,
+and that a replay always plays out the same way.
+"""
+
+import random
+
+import pygame
+import pytest
+from pygame.locals import *
+
+import snapshot
+from batch import random_script
+from headless import Simulation
+from replay import Recording, ReplayError, _HEADER, _LENGTH, _read_varint, \
+    _write_varint, play
+
+TICKS = 400
+
+
+def _record(seed: int) -> Recording:
+    """
+    Return a recording of TICKS ticks of random input with uneven tick
+    durations.
+    """
+    rng = random.Random(seed)
+    script = random_script(TICKS, seed)
+    recording = Recording(seed=seed)
+    for tick in range(TICKS):
+        recording.record_tick(rng.choice([16, 17, 17, 33, 250]))
+        for event in script.get(tick, []):
+            recording.record_event(event)
+
+    return recording
+
+
+@pytest.mark.parametrize('value', [0, 1, 127, 128, 300, 16383, 16384,
+                                   2 ** 35 + 5])
+def test_varint_round_trip(value: int) -> None:
+    out = bytearray(b'x')
+    _write_varint(out, value)
+    assert len(out) - 1 == max(1, -(-value.bit_length() // 7))
+    assert _read_varint(bytes(out) + b'y', 1) == (value, len(out))
+
+
+def test_truncated_varint() -> None:
+    out = bytearray()
+    _write_varint(out, 300)
+    with pytest.raises(ReplayError):
+        _read_varint(bytes(out[:-1]), 0)
+
+
+def test_recording_round_trip(tmp_path) -> None:
+    recording = _record(3)
+    assert recording.events
+    path = str(tmp_path / 'session.rep')
+    recording.save(path)
+    loaded = Recording.load(path)
+
+    assert loaded.level == recording.level
+    assert loaded.seed == recording.seed
+    assert loaded.start == recording.start
+    assert loaded.durations == recording.durations
+    assert loaded.events == recording.events
+    assert loaded.to_bytes() == recording.to_bytes()
+    loaded.check_level()
+
+
+def test_key_events_only() -> None:
+    recording = Recording()
+    recording.record_tick(16)
+    recording.record_event(pygame.event.Event(MOUSEMOTION, pos=(0, 0)))
+    recording.record_event(pygame.event.Event(KEYDOWN, key=K_SPACE))
+    assert recording.events == [(0, KEYDOWN, K_SPACE)]
+
+
+@pytest.mark.parametrize('cut', [0, 10, -1])
+def test_truncated_recording(cut: int) -> None:
+    data = _record(4).to_bytes()
+    with pytest.raises(ReplayError):
+        Recording.from_bytes(data[:cut])
+
+
+def test_invalid_recording() -> None:
+    with pytest.raises(ReplayError):
+        Recording.from_bytes(b'XXXX' + _record(4).to_bytes()[4:])
+
+
+@pytest.mark.parametrize('cut', [2, -1])
+def test_truncated_header(cut: int) -> None:
+    data = Recording().to_bytes()
+    with pytest.raises(ReplayError):
+        Recording.from_bytes(data[:_HEADER.size + _LENGTH.size + cut]
+                             if cut > 0 else data[:cut])
+
+
+def test_undecodable_level_path() -> None:
+    data = bytearray(_record(4).to_bytes())
+    data[_HEADER.size + _LENGTH.size] = 0xff
+    with pytest.raises(ReplayError):
+        Recording.from_bytes(bytes(data))
+
+
+def test_replay_is_deterministic(tmp_path) -> None:
+    recording = _record(5)
+    path = str(tmp_path / 'session.rep')
+    recording.save(path)
+
+    first = play(recording)
+    second = play(Recording.load(path))
+    assert second.tick == first.tick == TICKS
+    assert second.clock.units == first.clock.units
+    assert snapshot.save(second.game_map, second.player) == \
+        snapshot.save(first.game_map, first.player)
+
+
+def test_replay_checks_final_state() -> None:
+    recording = _record(6)
+    random.seed(recording.seed)
+    sim = Simulation(recording.script(), recording.level, recording.start)
+    for dt in recording.durations:
+        sim.step(dt)
+    recording.finish(sim.game_map, sim.player)
+    sim.close()
+    assert recording.checksum is not None
+
+    loaded = Recording.from_bytes(recording.to_bytes())
+    assert loaded.checksum == recording.checksum
+    play(loaded)
+
+    loaded.checksum = bytes(len(recording.checksum))
+    with pytest.raises(ReplayError):
+        play(loaded)
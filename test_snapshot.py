@@ -0,0 +1,202 @@
+"""
+Tests that snapshots survive the round trip through the snapshot format,
+and that a game restored from a snapshot plays out the same way as the game
+it was saved from.
+"""
+
+import pytest
+
+import snapshot
+from batch import random_script
+from headless import Simulation
+from room import Room
+
+# The tick on which the snapshot is taken, and the number of ticks played
+# after it.
+SAVE_TICK = 97
+TICKS = 300
+
+
+def _play(sim: Simulation, ticks: int) -> list[bytes]:
+    """
+    Play <ticks> ticks of <sim> and return a snapshot of every tick on which
+    no transition is in progress.
+    """
+    trace = []
+    for _ in range(ticks):
+        sim.step()
+        if sim.game_map.transition is None:
+            trace.append(snapshot.save(sim.game_map, sim.player))
+
+    return trace
+
+
+def _restore(sim: Simulation, data: bytes) -> None:
+    """
+    Restore <sim> to the snapshot <data> taken on SAVE_TICK.
+    """
+    snapshot.restore(data, sim.game_map, sim.player)
+    sim.tick = SAVE_TICK
+
+
+@pytest.fixture(params=[0, 1, 2])
+def sim(request) -> Simulation:
+    """
+    Return a simulation of a game played randomly, which is closed after
+    the test.
+    """
+    sim = Simulation(random_script(SAVE_TICK + TICKS, request.param))
+    yield sim
+    sim.close()
+
+
+def test_restore_plays_out_like_original(sim: Simulation) -> None:
+    sim.run(SAVE_TICK)
+    data = snapshot.save(sim.game_map, sim.player)
+    original = _play(sim, TICKS)
+
+    _restore(sim, data)
+    assert _play(sim, TICKS) == original
+
+
+def test_restores_play_out_the_same_without_lod(sim: Simulation) -> None:
+    sim.game_map.current_room.scheduler = None
+    sim.run(SAVE_TICK)
+    data = snapshot.save(sim.game_map, sim.player)
+
+    _restore(sim, data)
+    first = _play(sim, TICKS)
+    _restore(sim, data)
+    assert _play(sim, TICKS) == first
+
+
+def test_restore_into_new_game(sim: Simulation) -> None:
+    sim.run(SAVE_TICK)
+    data = snapshot.save(sim.game_map, sim.player)
+    original = _play(sim, TICKS)
+    script = sim.script
+    sim.close()
+
+    other = Simulation(script)
+    try:
+        _restore(other, data)
+        assert _play(other, TICKS) == original
+    finally:
+        other.close()
+
+
+@pytest.fixture
+def game() -> Simulation:
+    """
+    Return a simulation of a game played randomly for SAVE_TICK ticks,
+    which is closed after the test.
+    """
+    sim = Simulation(random_script(SAVE_TICK, 0))
+    sim.run(SAVE_TICK)
+    yield sim
+    sim.close()
+
+
+def test_new_game_takes_no_room_sections() -> None:
+    sim = Simulation()
+    try:
+        data = snapshot.save(sim.game_map, sim.player)
+    finally:
+        sim.close()
+    assert len(data) == snapshot._HEADER.size + snapshot._PLAYER.size
+
+
+def test_snapshot_round_trip(game: Simulation) -> None:
+    data = snapshot.save(game.game_map, game.player)
+    assert len(data) > snapshot._HEADER.size + snapshot._PLAYER.size
+
+    other = Simulation()
+    try:
+        snapshot.restore(data, other.game_map, other.player)
+        assert snapshot.save(other.game_map, other.player) == data
+        assert other.player.get_state() == game.player.get_state()
+        assert other.game_map.enemy_states()[0] == \
+            game.game_map.enemy_states()[0]
+    finally:
+        other.close()
+
+
+def test_dead_enemies_stay_dead(game: Simulation) -> None:
+    room = game.game_map.current_room
+    room.remove_enemy(room.enemies[0])
+    data = snapshot.save(game.game_map, game.player)
+    states = game.game_map.enemy_states()
+
+    other = Simulation()
+    try:
+        snapshot.restore(data, other.game_map, other.player)
+        assert other.game_map.enemy_states()[0] == states[0]
+        assert len(other.game_map.current_room.enemies) == len(room.enemies)
+    finally:
+        other.close()
+
+
+@pytest.mark.parametrize('corrupt', [
+    lambda data: b'XXXX' + data[4:],
+    lambda data: data[:snapshot._HEADER.size + 3],
+    lambda data: data[:-1],
+    lambda data: data[:4] + b'\xff\xff' + data[6:],
+])
+def test_invalid_snapshot(game: Simulation, corrupt) -> None:
+    data = snapshot.save(game.game_map, game.player)
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.restore(corrupt(data), game.game_map, game.player)
+
+
+def test_no_snapshot_during_transition(game: Simulation) -> None:
+    game.game_map.change_room('E', game.player)
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.save(game.game_map, game.player)
+
+
+def test_evicted_room_keeps_its_schedule(game: Simulation) -> None:
+    game_map = game.game_map
+    schedule = game_map.current_room.snapshot_scheduler()
+    assert schedule is not None
+
+    game_map.capacity = 2
+    game_map.change_room('E', game.player)
+    while game_map.transition is not None:
+        game_map.update_transition(Simulation.TICK_MS, game.player)
+    game_map.get_room(1)
+    assert not game_map.is_resident(0)
+    assert game_map.scheduler_states()[0] == schedule
+    assert game_map.get_room(0).snapshot_scheduler() == schedule
+
+
+def test_restore_removes_projectiles(game: Simulation) -> None:
+    data = snapshot.save(game.game_map, game.player)
+    original = _play(game, TICKS)
+
+    projectiles = game.game_map.current_room.get_projectiles()
+    assert projectiles.spawn(300, 300, 1, 0)
+    _restore(game, data)
+    assert projectiles.size == 0
+    assert _play(game, TICKS) == original
+
+
+def test_evicted_enemies_are_reused(game: Simulation) -> None:
+    game_map = game.game_map
+    evicted = list(game_map.current_room.enemies)
+
+    game_map.capacity = 2
+    game_map.change_room('E', game.player)
+    while game_map.transition is not None:
+        game_map.update_transition(Simulation.TICK_MS, game.player)
+    room = game_map.get_room(1)
+    assert not game_map.is_resident(0)
+    assert any(enemy in evicted for enemy in room.enemies)
+    assert [(enemy.spawn, enemy.get_state()) for enemy in room.enemies] == \
+        list(enumerate(game_map.level.spawn_states(1)))
+
+
+def test_free_list_is_capped(game: Simulation, monkeypatch) -> None:
+    monkeypatch.setattr(Room, 'FREE_CAPACITY', 1)
+    room = game.game_map.current_room
+    room.release_enemies()
+    assert all(len(free) <= 1 for free in room._free.values())
@@ -0,0 +1,251 @@
+"""
+Contains the clock that all the timers in Block Adventure are measured with,
+and the timers themselves. By default the wall clock of pygame is used.
+A simulation clock can be injected so that the game can be stepped
+independently of real time.
+
+Entities do not poll the clock for expirations. They schedule a callback
+with schedule, and the main loop calls run_due once per frame to run every
+callback that is due.
+
+Times are given in milliseconds, but clocks and deadlines are kept in whole
+units of 1 / UNITS_PER_MS milliseconds. Both whole milliseconds and the
+ticks of a 60 Hz simulation are whole numbers of units, so deadlines are
+exact, and a timer with the same time left on it expires on the same tick
+no matter what the clock reads.
+"""
+
+import heapq
+import pygame
+from typing import Callable, Optional
+
+# The number of units of time in a millisecond.
+UNITS_PER_MS = 60
+
+
+def to_units(ms: float) -> int:
+    """
+    Return the number of whole units of time closest to <ms> milliseconds.
+    """
+    return round(ms * UNITS_PER_MS)
+
+
+class SimClock:
+    """
+    A clock that only advances when it is told to.
+
+    == Attributes ==
+    units: The number of units of time elapsed on this clock.
+    """
+    units: int
+
+    def __init__(self, start: float = 0.0) -> None:
+        """
+        Initialize a simulation clock at <start> milliseconds.
+        """
+        self.units = to_units(start)
+
+    @property
+    def ticks(self) -> float:
+        """
+        The number of milliseconds elapsed on this clock.
+        """
+        return self.units / UNITS_PER_MS
+
+    def get_ticks(self) -> float:
+        """
+        Return the number of milliseconds elapsed on this clock.
+        """
+        return self.ticks
+
+    def advance(self, ms: float) -> None:
+        """
+        Advance the clock by <ms> milliseconds, rounded to whole units.
+
+        == Preconditions ==
+        ms >= 0
+        """
+        self.units += to_units(ms)
+
+
+# The simulation clock in use. None if the wall clock is used.
+_clock: Optional[SimClock] = None
+
+
+def set_clock(clock: Optional[SimClock]) -> None:
+    """
+    Measure all timers with <clock>. If <clock> is None, the wall clock
+    of pygame is used. The pending timers were measured with the previous
+    clock, so they are expired at once: their callbacks are run, in order of
+    deadline, so that no entity is left in a timed state that never ends.
+    """
+    global _clock, _timers
+    pending = _timers
+    _clock = clock
+    _timers = TimerQueue()
+    pending.run_due(float('inf'))
+
+
+def _now() -> int:
+    """
+    Return the number of units of time elapsed on the clock in use.
+    """
+    if _clock is None:
+        return pygame.time.get_ticks() * UNITS_PER_MS
+    return _clock.units
+
+
+def get_ticks() -> float:
+    """
+    Return the number of milliseconds elapsed on the clock in use.
+    """
+    return _now() / UNITS_PER_MS
+
+
+class Timer:
+    """
+    A callback scheduled to run once at a deadline.
+
+    == Attributes ==
+    deadline: The time on the clock in use at which the callback is due, in
+    units.
+    callback: The function called when the timer expires.
+    active: Whether the timer has neither expired nor been cancelled.
+    """
+    __slots__ = ('deadline', 'callback', 'active')
+
+    deadline: int
+    callback: Callable[[], None]
+    active: bool
+
+    def __init__(self, deadline: int, callback: Callable[[], None]) -> None:
+        """
+        Initialize an active timer that calls <callback> at <deadline>.
+        """
+        self.deadline = deadline
+        self.callback = callback
+        self.active = True
+
+
+class TimerQueue:
+    """
+    The pending timers of the game, kept in a heap ordered by deadline.
+    Cancelled timers are left in the heap and skipped when they reach the
+    top.
+    """
+    # Private Attributes
+    # _heap: The timers as (deadline, sequence number, timer) entries. The
+    # sequence number runs timers with the same deadline in the order in
+    # which they were scheduled.
+    # _count: The number of timers ever scheduled.
+    _heap: list[tuple[int, int, Timer]]
+    _count: int
+
+    def __init__(self) -> None:
+        """
+        Initialize a queue without timers.
+        """
+        self._heap = []
+        self._count = 0
+
+    def __len__(self) -> int:
+        """
+        Return the number of entries in the queue, including cancelled
+        timers that have not been discarded yet.
+        """
+        return len(self._heap)
+
+    def push(self, timer: Timer) -> None:
+        """
+        Add <timer> to the queue.
+        """
+        heapq.heappush(self._heap, (timer.deadline, self._count, timer))
+        self._count += 1
+
+    def next_deadline(self) -> Optional[int]:
+        """
+        Return the earliest deadline of an active timer in the queue, in
+        units, or None if there are no active timers.
+        """
+        while self._heap and not self._heap[0][2].active:
+            heapq.heappop(self._heap)
+
+        return self._heap[0][0] if self._heap else None
+
+    def run_due(self, now: float) -> None:
+        """
+        Run the callback of every active timer whose deadline is at most
+        <now> units, in order of deadline. Timers scheduled by the callbacks
+        are run too if they are already due.
+        """
+        while self._heap and self._heap[0][0] <= now:
+            timer = heapq.heappop(self._heap)[2]
+            if timer.active:
+                timer.active = False
+                timer.callback()
+
+
+# The timers measured with the clock in use.
+_timers = TimerQueue()
+
+
+def schedule(delay: float, callback: Callable[[], None]) -> Timer:
+    """
+    Call <callback> once <delay> milliseconds have elapsed on the clock in
+    use, and return the timer that does so.
+
+    == Preconditions ==
+    delay >= 0
+    """
+    timer = Timer(_now() + to_units(delay), callback)
+    _timers.push(timer)
+
+    return timer
+
+
+def cancel(timer: Optional[Timer]) -> None:
+    """
+    Stop <timer> from running its callback. Nothing happens if <timer> is
+    None or no longer active.
+    """
+    if timer is not None:
+        timer.active = False
+
+
+def remaining(timer: Optional[Timer]) -> float:
+    """
+    Return the number of milliseconds until <timer> expires, or 0 if it is
+    None or no longer active.
+    """
+    if timer is None or not timer.active:
+        return 0.0
+    return max(timer.deadline - _now(), 0) / UNITS_PER_MS
+
+
+def run_due() -> None:
+    """
+    Run every timer that is due on the clock in use.
+    """
+    _timers.run_due(_now())
+
+
+def fast_forward(ms: float) -> None:
+    """
+    Advance the simulation clock in use by <ms> milliseconds without
+    stepping the game. Every timer that falls due runs with the clock set to
+    its deadline, in order of deadline.
+    Raise RuntimeError if the wall clock is in use.
+
+    == Preconditions ==
+    ms >= 0
+    """
+    if _clock is None:
+        raise RuntimeError('only a simulation clock can be fast-forwarded')
+
+    end = _clock.units + to_units(ms)
+    deadline = _timers.next_deadline()
+    while deadline is not None and deadline <= end:
+        _clock.units = max(_clock.units, deadline)
+        _timers.run_due(_clock.units)
+        deadline = _timers.next_deadline()
+    _clock.units = end
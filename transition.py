@@ -0,0 +1,88 @@
+from player import Player
+from room import Room
+import pygame
+
+
+class RoomTransition:
+    """
+    The animation that shifts the camera from one room to the next when the
+    player goes through a door. It advances by the time elapsed, so it takes
+    the same time on every machine. Only the static layers of the two rooms
+    are drawn, so each frame costs two blits.
+
+    == Attributes ==
+    next_room: The room that the player is moving to.
+    next_index: The index of next_room in the level.
+    elapsed: The number of milliseconds since the animation began.
+    """
+    # Private Attributes
+    # _old_layer, _new_layer: The static layers of the room being left and
+    # of next_room.
+    # _start: The position of the player when the animation began.
+    # _shift: The direction in which the rooms shift, as (x, y).
+    next_room: Room
+    next_index: int
+    elapsed: float
+    _old_layer: pygame.Surface
+    _new_layer: pygame.Surface
+    _start: tuple[float, float]
+    _shift: tuple[int, int]
+
+    DURATION = 600  # milliseconds
+
+    # The direction in which the rooms shift for each door.
+    SHIFTS = {'W': (1, 0), 'E': (-1, 0), 'N': (0, 1), 'S': (0, -1)}
+
+    def __init__(self, room: Room, next_room: Room, next_index: int,
+                 door_dir: str, player: Player) -> None:
+        """
+        Initialize the animation of <player> leaving <room> through the door
+        in direction <door_dir>, which leads to <next_room>.
+
+        == Preconditions ==
+        door_dir is 'N', 'S', 'E', or 'W'
+        """
+        self.next_room = next_room
+        self.next_index = next_index
+        self.elapsed = 0.0
+        self._old_layer = room.get_static_layer()
+        self._new_layer = next_room.get_static_layer()
+        self._start = (player.x_pos, player.y_pos)
+        self._shift = RoomTransition.SHIFTS[door_dir]
+
+    def _offset(self) -> float:
+        """
+        Return the number of pixels that the rooms have shifted by.
+        """
+        return Room.ROOM_SIZE * self.elapsed / RoomTransition.DURATION
+
+    def is_done(self) -> bool:
+        """
+        Return whether the animation has finished.
+        """
+        return self.elapsed >= RoomTransition.DURATION
+
+    def advance(self, dt: float, player: Player) -> None:
+        """
+        Advance the animation by <dt> milliseconds. <player> is carried along
+        with the rooms.
+        """
+        self.elapsed = min(self.elapsed + dt, RoomTransition.DURATION)
+        offset = self._offset()
+        player.set_position((self._start[0] + self._shift[0] * offset,
+                             self._start[1] + self._shift[1] * offset))
+
+    def draw(self, surf: pygame.Surface, player: Player) -> None:
+        """
+        Draw the current frame of the animation to <surf>. Nothing is drawn
+        outside the area of a room, so the HUD below it is left as it is.
+        """
+        offset = self._offset()
+        dx, dy = self._shift
+        clip = surf.get_clip()
+        surf.set_clip(pygame.Rect(0, 0, Room.ROOM_SIZE, Room.ROOM_SIZE))
+        surf.blit(self._new_layer, (dx * (offset - Room.ROOM_SIZE),
+                                    dy * (offset - Room.ROOM_SIZE)))
+        surf.blit(self._old_layer, (dx * offset, dy * offset))
+        player.draw(surf)
+        surf.set_clip(clip)